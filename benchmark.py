@@ -0,0 +1,431 @@
+"""Banc d'essai des performances de la gestion des clients BURIDA
+
+Génère des clients synthétiques déterministes puis mesure le chargement,
+l'enregistrement, les paiements, la recherche, les statistiques (moteur,
+colonnes et instantané), la détection des doublons et, si un affichage
+(ou Xvfb) est disponible, le rafraîchissement du tableau de BuridaApp.
+
+    python benchmark.py --tailles 1000 100000 --sortie resultats.json
+    python benchmark.py --reference reference.json          # échoue en cas de régression
+    python benchmark.py --enregistrer-reference reference.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+import doublons
+import moteur
+import statistiques
+from moteur import Client, GestionClients
+
+TAILLES = [1000, 100000, 1000000]
+
+AGENTS = [
+    "Kouassi Yao", "Traoré Aminata", "Koné Ibrahim", "Bamba Mariam", "Ouattara Seydou",
+    "N'Guessan Affoué", "Diabaté Moussa", "Coulibaly Awa", "Kouamé Serge", "Yapi Christelle"
+]
+
+LOCALISATIONS = [
+    "Abidjan-Cocody", "Abidjan-Yopougon", "Abidjan-Treichville", "Abidjan-Marcory",
+    "Abidjan-Plateau", "Bouaké", "Yamoussoukro", "San-Pédro", "Korhogo", "Daloa", "Man", "Gagnoa"
+]
+
+TYPES_ETABLISSEMENT = ["Maquis", "Bar", "Hôtel", "Restaurant", "Boîte de nuit", "Salle des fêtes", "Cave"]
+
+NOMS = ["Le Baobab", "La Terrasse", "Chez Tantie", "Le Palmier", "L'Escale", "Le Refuge",
+        "Les Cocotiers", "La Lagune", "Le Bon Coin", "Espace Prestige", "Le Maracana", "Étoile"]
+
+MENSUALITES = [5000, 7500, 10000, 15000, 25000, 50000]
+
+# Recherches représentatives d'une saisie au clavier
+RECHERCHES = ["k", "ko", "kou", "kouassi", "abidjan", "maquis le", "07 4", "bouak", "c00012", "zzz"]
+
+# Colonnes triées tour à tour, comme par des clics sur les en-têtes
+COLONNES_TRI = ["montant_paye", "date_ajout", "nom", "agent"]
+
+# Filtres multicritères typiques (agent, localisation, montants, date, retard)
+FILTRES = [
+    {"agent": "Koné Ibrahim", "localisation": "Bouaké", "en_retard": True, "date_ajout_min": "2024-03-01"},
+    {"montant_paye_max": "5000", "mensualite_min": "25000"},
+    {"periode": "2024-06", "en_retard": False},
+    {"date_ajout_min": "2024-01-01", "date_ajout_max": "2024-01-31"}
+]
+
+def generer_clients(nombre, graine=42):
+    """Génère des clients synthétiques, toujours les mêmes pour une graine donnée"""
+    hasard = random.Random(graine)
+    debut = date(2023, 1, 1).toordinal()
+    for i in range(nombre):
+        mensualite = hasard.choice(MENSUALITES)
+        # Environ un tiers des clients en retard : sans paiement au grand livre, un client
+        # est à jour si le montant payé atteint la mensualité
+        montant_paye = mensualite * hasard.choice([0, 0.5, 1, 1, 2, 3])
+        client = Client(
+            f"C{i:07d}",
+            f"{hasard.choice(TYPES_ETABLISSEMENT)} {hasard.choice(NOMS)}",
+            hasard.choice(NOMS).replace("Le ", "").replace("La ", ""),
+            hasard.choice(LOCALISATIONS),
+            f"07 {hasard.randint(0, 99):02d} {hasard.randint(0, 99):02d} {hasard.randint(0, 99):02d} "
+            f"{hasard.randint(0, 99):02d}",
+            str(mensualite),
+            f"{montant_paye:.0f}",
+            f"{hasard.randint(2023, 2025)}-{hasard.randint(1, 12):02d}",
+            hasard.choice(AGENTS),
+            ""
+        )
+        client.date_ordinal = debut + hasard.randint(0, 730)
+        yield client
+
+# Syllabes des noms propres synthétiques (établissements distincts pour la recherche des doublons)
+SYLLABES = ["ka", "kou", "lo", "ma", "ni", "sa", "to", "ya", "ba", "di", "fo", "gue", "an", "zi", "re", "bla"]
+
+# Part des fiches recopiées en doublon, et rappel minimal attendu de la détection
+PART_DOUBLONS = 0.01
+RAPPEL_MIN = 0.95
+
+def generer_fiches_doublons(nombre, graine=42):
+    """Génère des fiches (voir doublons.fiche_client) aux noms distincts, avec des doublons injectés
+    
+    Retourne les fiches et la liste des paires (code original, code du doublon).
+    Les doublons, au même lieu, sont une copie avec un autre numéro, une graphie
+    en capitales accentuées, un suffixe ajouté au nom ou une faute de frappe au
+    même contact.
+    """
+    hasard = random.Random(graine)
+    
+    def mot():
+        return "".join(hasard.choice(SYLLABES) for i in range(hasard.randint(2, 3))).capitalize()
+    
+    def numero():
+        return "07 " + " ".join(f"{hasard.randint(0, 99):02d}" for i in range(4))
+    
+    fiches = [(f"C{i:07d}", f"{hasard.choice(TYPES_ETABLISSEMENT)} {mot()} {hasard.choice(NOMS)}", 
+               f"{mot()} {mot()}", numero(), hasard.choice(LOCALISATIONS)) for i in range(nombre)]
+    paires = []
+    for rang in hasard.sample(range(nombre), int(nombre * PART_DOUBLONS)):
+        code, etablissement, nom, contact, localisation = fiches[rang]
+        variante = len(paires) % 4
+        if variante == 0:
+            doublon = (etablissement, nom, numero(), localisation)
+        elif variante == 1:
+            doublon = (etablissement.replace("e", "é", 1).upper(), nom, numero(), localisation)
+        elif variante == 2:
+            doublon = (etablissement + " 2", nom, numero(), localisation)
+        else:
+            position = hasard.randrange(len(nom))
+            doublon = (etablissement, nom[:position] + nom[position + 1:], contact, localisation)
+        fiches.append((code + "D", *doublon))
+        paires.append((code, code + "D"))
+    return fiches, paires
+
+def rappel_doublons(groupes, paires):
+    """Part des doublons injectés que la détection range dans le groupe de leur original"""
+    groupe_du_code = {code: numero for numero, (score, codes) in enumerate(groupes) for code in codes}
+    trouves = sum(1 for original, doublon in paires
+                  if original in groupe_du_code and groupe_du_code.get(doublon) == groupe_du_code[original])
+    return trouves / len(paires) if paires else 1.0
+
+def percentile(durees, p):
+    """Percentile au rang le plus proche d'une liste de durées triée"""
+    rang = max(0, min(len(durees) - 1, round(p / 100 * len(durees) + 0.5) - 1))
+    return durees[rang]
+
+def mesurer(operation, repetitions, elements=1):
+    """Chronomètre une opération puis mesure son pic mémoire sur un passage à part"""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        operation()
+        durees.append(time.perf_counter() - debut)
+
+    # Pic mémoire mesuré séparément : tracemalloc fausserait les durées
+    tracemalloc.start()
+    operation()
+    pic = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    durees.sort()
+    moyenne = sum(durees) / len(durees)
+    return {
+        "repetitions": repetitions,
+        "moyenne_s": moyenne,
+        "p50_s": percentile(durees, 50),
+        "p95_s": percentile(durees, 95),
+        "p99_s": percentile(durees, 99),
+        "debit_par_s": elements / moyenne if moyenne > 0 else None,
+        "memoire_pic_octets": pic
+    }
+
+def preparer_donnees(dossier, taille):
+    """Écrit un fichier de données de la taille demandée et retourne son chemin"""
+    chemin = os.path.join(dossier, "burida_clients.pkl")
+    gestion = GestionClients(chemin)
+    gestion.charger()
+    gestion.ajouter_lot(list(generer_clients(taille)))
+    gestion.sauvegarder()
+    gestion.fermer()
+    return chemin
+
+def mesurer_moteur(chemin, taille, repetitions):
+    """Mesures sans affichage, au travers du moteur"""
+    resultats = {}
+
+    def charger():
+        gestion = GestionClients(chemin)
+        gestion.charger()
+        gestion.fermer()
+
+    resultats["charger_donnees"] = mesurer(charger, repetitions, taille)
+
+    gestion = GestionClients(chemin)
+    gestion.charger()
+
+    def sauvegarder():
+        gestion.sauvegarder()
+        gestion.stockage.compactage.join()
+
+    resultats["sauvegarder_donnees"] = mesurer(sauvegarder, repetitions, taille)
+
+    # Modification d'un client : un ajout au journal
+    hasard = random.Random(7)
+
+    def modifier():
+        code = gestion.clients[hasard.randrange(len(gestion.clients))].code
+        gestion.modifier(code, {"montant_paye": str(hasard.choice(MENSUALITES))})
+
+    resultats["modifier_client"] = mesurer(modifier, max(repetitions, 50))
+
+    # Annulation puis rétablissement d'une modification : deux différences rejouées
+    def annuler_retablir():
+        gestion.annuler()
+        gestion.retablir()
+
+    resultats["annuler_retablir"] = mesurer(annuler_retablir, max(repetitions, 50))
+
+    # Paiement : une ligne au grand livre, un ajout au journal, le solde et les retards mis à jour
+    def enregistrer_paiement():
+        code = gestion.clients[hasard.randrange(len(gestion.clients))].code
+        gestion.enregistrer_paiement(code, str(hasard.choice(MENSUALITES)))
+
+    resultats["enregistrer_paiement"] = mesurer(enregistrer_paiement, max(repetitions, 50))
+
+    def rechercher():
+        # Chaque recherche part d'une saisie nouvelle (pas de réutilisation du résultat précédent)
+        for recherche in RECHERCHES:
+            gestion.index_recherche.derniers_rangs = None
+            gestion.rechercher(recherche)
+
+    resultats["rechercher"] = mesurer(rechercher, repetitions, len(RECHERCHES))
+
+    def trier():
+        # Après le premier passage, changer de colonne ou de sens ne retrie rien
+        for colonne in COLONNES_TRI:
+            gestion.trier(gestion.clients, colonne, decroissant=True)
+
+    resultats["trier"] = mesurer(trier, repetitions, len(COLONNES_TRI))
+
+    filtres = [moteur.analyser_filtre(valeurs) for valeurs in FILTRES]
+
+    def filtrer():
+        for filtre in filtres:
+            gestion.rechercher("", filtre)
+
+    resultats["filtrer"] = mesurer(filtrer, repetitions, len(FILTRES))
+
+    def tendances():
+        # 24 points par axe, tous agents confondus, lus dans les cumuls
+        for axe in moteur.AXES_TENDANCE:
+            gestion.tendance(axe)
+
+    resultats["tendances"] = mesurer(tendances, repetitions, len(moteur.AXES_TENDANCE))
+
+    def calculer_statistiques():
+        gestion.statistiques.reconstruire(gestion.clients)
+        gestion.resume_statistiques()
+
+    resultats["calculer_statistiques"] = mesurer(calculer_statistiques, repetitions, taille)
+
+    # Même calcul en colonnes, en mémoire puis sur l'instantané (par processus au-delà de
+    # statistiques.SEUIL_PAGES_PARALLELES pages) : les résultats doivent être identiques
+    attendu = gestion.resume_statistiques()
+    if statistiques.statistiques_clients(gestion.clients) != attendu:
+        raise RuntimeError("les statistiques en colonnes diffèrent de celles du moteur")
+    # Les filtres par situation n'ont de sens que sur un mélange de clients à jour et en retard
+    if not 0 < attendu["clients_retard"] < attendu["total_clients"]:
+        raise RuntimeError("les clients synthétiques sont tous à jour ou tous en retard")
+
+    def statistiques_colonnes():
+        statistiques.statistiques_clients(gestion.clients)
+
+    resultats["statistiques_colonnes"] = mesurer(statistiques_colonnes, repetitions, taille)
+
+    # Fiches aux noms distincts (ceux des clients synthétiques se répètent) avec des doublons injectés
+    fiches, paires = generer_fiches_doublons(taille)
+
+    def detecter_doublons():
+        # Caches vidés : chaque passage normalise toutes les fiches
+        for fonction in (doublons.normaliser_nom, doublons.cle_phonetique, doublons.trigrammes_mot):
+            fonction.cache_clear()
+        return doublons.detecter_doublons(fiches)
+
+    resultats["detecter_doublons"] = mesurer(detecter_doublons, repetitions, len(fiches))
+    rappel = rappel_doublons(detecter_doublons(), paires)
+    resultats["detecter_doublons"]["rappel"] = rappel
+    if rappel < RAPPEL_MIN:
+        raise RuntimeError(f"la détection ne retrouve que {rappel:.0%} des doublons injectés")
+
+    gestion.sauvegarder()
+    gestion.fermer()
+    if statistiques.statistiques_instantane(chemin) != attendu:
+        raise RuntimeError("les statistiques de l'instantané diffèrent de celles du moteur")
+
+    def statistiques_instantane():
+        statistiques.statistiques_instantane(chemin)
+
+    resultats["statistiques_instantane"] = mesurer(statistiques_instantane, repetitions, taille)
+    return resultats
+
+def demarrer_affichage():
+    """Retourne un processus Xvfb si aucun affichage n'est disponible (None sinon)"""
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        return None
+    if not shutil.which("Xvfb"):
+        return None
+    processus = subprocess.Popen(["Xvfb", ":99", "-screen", "0", "1280x800x24"],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = ":99"
+    time.sleep(1)
+    return processus
+
+def mesurer_interface(dossier, taille, repetitions):
+    """Mesures de BuridaApp ; None si aucun affichage n'est disponible"""
+    try:
+        import tkinter as tk
+        import gestion as application
+        root = tk.Tk()
+    except Exception:
+        return None
+
+    repertoire = os.getcwd()
+    os.chdir(dossier)
+    try:
+        app = application.BuridaApp(root)
+        # Attendre la fin du chargement progressif
+        while not app.gestion.charge:
+            root.update()
+
+        def rafraichir():
+            app.rafraichir_tableau()
+            root.update_idletasks()
+
+        def defiler():
+            app.vue.defiler("moveto", random.random())
+            root.update_idletasks()
+
+        def calculer_statistiques():
+            app.gestion.statistiques.reconstruire(app.gestion.clients)
+            app.calculer_statistiques()
+            root.update_idletasks()
+
+        hasard = random.Random(11)
+
+        def modifier():
+            # Modification puis affichage groupé des changements (after_idle)
+            client = app.gestion.clients[hasard.randrange(len(app.gestion.clients))]
+            app.gestion.modifier(client.code, {"montant_paye": str(hasard.choice(MENSUALITES))})
+            root.update_idletasks()
+
+        resultats = {
+            "temps_premiere_ligne_s": app.temps_premiere_ligne,
+            "rafraichir_tableau": mesurer(rafraichir, repetitions, taille),
+            "defiler_tableau": mesurer(defiler, max(repetitions, 20)),
+            "modifier_client_affichage": mesurer(modifier, max(repetitions, 50)),
+            "calculer_statistiques_affichage": mesurer(calculer_statistiques, repetitions, taille)
+        }
+        app.quitter()
+        return resultats
+    finally:
+        os.chdir(repertoire)
+
+def comparer(resultats, reference, tolerance):
+    """Retourne les régressions de p50 au-delà de la tolérance par rapport à la référence"""
+    regressions = []
+    for taille, operations in resultats["resultats"].items():
+        for operation, mesure in operations.items():
+            attendu = reference.get("resultats", {}).get(taille, {}).get(operation)
+            if not isinstance(mesure, dict) or not isinstance(attendu, dict):
+                continue
+            if mesure["p50_s"] > attendu["p50_s"] * (1 + tolerance):
+                regressions.append(f"{operation} ({taille} clients): p50 {mesure['p50_s']:.6f} s "
+                                   f"contre {attendu['p50_s']:.6f} s en référence")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai de la gestion des clients BURIDA")
+    parser.add_argument("--tailles", type=int, nargs="+", default=TAILLES)
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--sortie", help="fichier JSON des résultats (sortie standard par défaut)")
+    parser.add_argument("--reference", help="résultats de référence à ne pas dépasser")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="dépassement toléré du p50 par rapport à la référence (0.25 = 25%%)")
+    parser.add_argument("--enregistrer-reference", help="écrit les résultats comme nouvelle référence")
+    parser.add_argument("--sans-interface", action="store_true", help="ne pas mesurer BuridaApp")
+    args = parser.parse_args()
+
+    xvfb = None if args.sans_interface else demarrer_affichage()
+    resultats = {
+        "environnement": {
+            "python": platform.python_version(),
+            "plateforme": platform.platform(),
+            "seuil_compactage": moteur.SEUIL_COMPACTAGE
+        },
+        "resultats": {}
+    }
+
+    try:
+        for taille in args.tailles:
+            with tempfile.TemporaryDirectory() as dossier:
+                chemin = preparer_donnees(dossier, taille)
+                mesures = mesurer_moteur(chemin, taille, args.repetitions)
+                if not args.sans_interface:
+                    interface = mesurer_interface(dossier, taille, args.repetitions)
+                    if interface is not None:
+                        mesures.update(interface)
+                resultats["resultats"][str(taille)] = mesures
+            print(f"{taille} clients mesurés", file=sys.stderr)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    texte = json.dumps(resultats, indent=2, ensure_ascii=False)
+    if args.sortie:
+        with open(args.sortie, 'w', encoding="utf-8") as fichier:
+            fichier.write(texte)
+    else:
+        print(texte)
+
+    if args.enregistrer_reference:
+        with open(args.enregistrer_reference, 'w', encoding="utf-8") as fichier:
+            fichier.write(texte)
+
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as fichier:
+            reference = json.load(fichier)
+        regressions = comparer(resultats, reference, args.tolerance)
+        for regression in regressions:
+            print(f"RÉGRESSION: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+"""Détection des clients en double (même établissement saisi plusieurs fois)
+
+Comparer chaque client à tous les autres est impossible sur des centaines
+de milliers de fiches. Les fiches aux noms identiques (mêmes trigrammes)
+et de même localisation sont reliées sans comparaison ; les noms distincts
+sont rangés dans des blocs par clés de regroupement (clé phonétique,
+trigrammes rares), les fiches par numéro de contact normalisé, et seules
+les paires d'un même bloc sont notées. Deux fiches de localisations
+différentes sans numéro commun sont pénalisées (MALUS_LOCALISATION) :
+
+    fiches = [fiche_client(client) for client in gestion.clients]
+    for score, codes in detecter_doublons(fiches):
+        print(f"{score:.0%}", codes)
+"""
+
+import re
+import math
+import operator
+import functools
+import itertools
+import collections
+import unicodedata
+
+# Score à partir duquel deux fiches sont proposées à la fusion
+SEUIL_DOUBLON = 0.7
+
+# Bonus ajoutés à la similarité des noms (trigrammes communs, de 0 à 1)
+BONUS_CONTACT = 0.3
+BONUS_PHONETIQUE = 0.2
+
+# Retranché quand les localisations, toutes deux saisies, diffèrent sans numéro commun :
+# un nom courant (« Pharmacie ») dans deux villes désigne deux établissements
+MALUS_LOCALISATION = 0.4
+
+# Un bloc plus grand (trigramme ou numéro très courant) n'est pas comparé paire à paire :
+# ses membres, triés par nom, ne sont comparés qu'à leurs voisins (fenêtres glissantes)
+TAILLE_MAX_BLOC = 50
+TAILLE_FENETRE = 10
+
+# Mots sans valeur pour distinguer deux établissements
+MOTS_VIDES = {"le", "la", "les", "l", "de", "du", "des", "d", "et", "chez"}
+
+# Substitutions phonétiques appliquées dans l'ordre (graphies françaises courantes)
+SUBSTITUTIONS_PHONETIQUES = [
+    ("ph", "f"), ("qu", "k"), ("gu", "g"), ("ch", "s"), ("sh", "s"), ("ck", "k"),
+    ("ce", "se"), ("ci", "si"), ("cy", "si"), ("c", "k"), ("q", "k"), ("x", "ks"),
+    ("ou", "u"), ("y", "i"), ("z", "s"), ("w", "v"), ("h", "")
+]
+
+# Indicatif de la Côte d'Ivoire, retiré des numéros saisis au format international
+INDICATIF = "225"
+
+SANS_VOYELLES = str.maketrans("", "", "aeiou")
+
+# Mots et noms normalisés gardés en cache (les mêmes reviennent d'une fiche à l'autre)
+TAILLE_CACHE = 1 << 18
+
+fiche_client = operator.attrgetter("code", "etablissement", "nom", "contact", "localisation")
+
+@functools.lru_cache(maxsize=TAILLE_CACHE)
+def normaliser_nom(texte):
+    """Mots significatifs d'un nom, sans accents, casse ni ponctuation"""
+    texte = unicodedata.normalize("NFKD", texte).encode("ascii", "ignore").decode().lower()
+    return tuple(mot for mot in re.findall(r"[a-z0-9]+", texte) if mot not in MOTS_VIDES)
+
+def normaliser_contact(contact):
+    """Numéros de téléphone d'un contact, chiffres seuls et sans indicatif
+    
+    Plusieurs numéros peuvent être séparés par / , ou ; ; les numéros trop
+    courts pour identifier quelqu'un sont ignorés.
+    """
+    numeros = set()
+    for partie in re.split(r"[/,;]", contact):
+        chiffres = re.sub(r"\D", "", partie)
+        if chiffres.startswith("00"):
+            chiffres = chiffres[2:]
+        if chiffres.startswith(INDICATIF) and len(chiffres) in (11, 13):
+            chiffres = chiffres[len(INDICATIF):]
+        if len(chiffres) >= 8:
+            numeros.add(chiffres)
+    return numeros
+
+@functools.lru_cache(maxsize=TAILLE_CACHE)
+def cle_phonetique(mot):
+    """Squelette phonétique d'un mot normalisé : première lettre puis consonnes, sans doublement"""
+    for graphie, son in SUBSTITUTIONS_PHONETIQUES:
+        mot = mot.replace(graphie, son)
+    if not mot:
+        return ""
+    squelette = mot[0] + mot[1:].translate(SANS_VOYELLES)
+    return "".join(lettre for lettre, suite in itertools.groupby(squelette))
+
+@functools.lru_cache(maxsize=TAILLE_CACHE)
+def trigrammes_mot(mot):
+    """Trigrammes d'un mot bordé d'espaces (les débuts et fins de mots comptent)"""
+    mot = f" {mot} "
+    return frozenset(mot[i:i + 3] for i in range(len(mot) - 2))
+
+def trigrammes(mots):
+    return frozenset().union(*map(trigrammes_mot, mots))
+
+def similarite(premier, second):
+    """Indice de Jaccard de deux ensembles de trigrammes"""
+    if not premier or not second:
+        return 0.0
+    communs = len(premier & second)
+    return communs / (len(premier) + len(second) - communs)
+
+class Signature:
+    """Forme normalisée d'une fiche, calculée une fois avant la recherche des paires"""
+    
+    __slots__ = ("code", "mots", "trigrammes", "phonetique", "numeros", "lieu")
+    
+    def __init__(self, code, etablissement, nom, contact, localisation=""):
+        mots = normaliser_nom(etablissement) + normaliser_nom(nom)
+        self.code = code
+        self.mots = mots
+        self.trigrammes = trigrammes(mots)
+        # Ordre des mots indifférent (« Bamba Mariam » et « Mariam Bamba »)
+        self.phonetique = " ".join(sorted(map(cle_phonetique, mots)))
+        self.numeros = normaliser_contact(contact)
+        self.lieu = " ".join(sorted(normaliser_nom(localisation)))  # Vide si la localisation n'est pas saisie
+    
+    def score(self, autre):
+        score = similarite(self.trigrammes, autre.trigrammes)
+        contact_commun = bool(self.numeros & autre.numeros)
+        if contact_commun:
+            score += BONUS_CONTACT
+        if self.phonetique and self.phonetique == autre.phonetique:
+            score += BONUS_PHONETIQUE
+        score = min(score, 1.0)
+        if not contact_commun and self.lieu and autre.lieu and self.lieu != autre.lieu:
+            score -= MALUS_LOCALISATION
+        return score
+
+# Ordres des fenêtres glissantes : une variante d'un nom reste proche de lui dans l'un ou l'autre
+ORDRES_VOISINAGE = [lambda signature: signature.mots, lambda signature: signature.mots[::-1]]
+
+def fenetres(signatures, rangs):
+    """Itère sur des fenêtres glissantes de fiches triées par nom (voisinage trié)
+    
+    Les fenêtres se chevauchent de moitié : chaque fiche est comparée à ses
+    voisines dans chacun des ORDRES_VOISINAGE.
+    """
+    pas = TAILLE_FENETRE // 2
+    for ordre in ORDRES_VOISINAGE:
+        tries = sorted(rangs, key=lambda rang: ordre(signatures[rang]))
+        for debut in range(0, max(len(tries) - pas, 1), pas):
+            yield tries[debut:debut + TAILLE_FENETRE]
+
+def blocs_noms(signatures):
+    """Itère sur les blocs de candidats (listes de rangs dans signatures) par nom
+    
+    Trigrammes : deux ensembles d'indice de Jaccard au moins SEUIL_DOUBLON
+    ont forcément un trigramme commun parmi les plus rares de chacun (filtrage
+    par préfixe), seuls ceux-là servent de clés. Les membres des blocs trop
+    grands pour être comparés en entier passent par les fenêtres glissantes.
+    """
+    par_phonetique = collections.defaultdict(list)
+    par_trigramme = collections.defaultdict(list)
+    
+    frequences = collections.Counter()
+    for signature in signatures:
+        frequences.update(signature.trigrammes)
+    # Ordre global des trigrammes, du plus rare au plus courant
+    rangs = {trigramme: rang for rang, trigramme in
+             enumerate(sorted(frequences, key=lambda trigramme: (frequences[trigramme], trigramme)))}
+    
+    for rang, signature in enumerate(signatures):
+        if signature.phonetique:
+            par_phonetique[signature.phonetique].append(rang)
+        
+        taille = len(signature.trigrammes)
+        if taille:
+            prefixe = taille - math.ceil(SEUIL_DOUBLON * taille) + 1
+            rares = sorted(signature.trigrammes, key=rangs.__getitem__)
+            for trigramme in rares[:prefixe]:
+                par_trigramme[trigramme].append(rang)
+    
+    voisinage = set()
+    for index in (par_phonetique, par_trigramme):
+        for bloc in index.values():
+            if len(bloc) > TAILLE_MAX_BLOC:
+                voisinage.update(bloc)
+            elif len(bloc) > 1:
+                yield bloc
+    yield from fenetres(signatures, voisinage)
+
+def blocs_contacts(signatures):
+    """Itère sur les blocs de fiches qui partagent un numéro de contact"""
+    par_contact = collections.defaultdict(list)
+    for rang, signature in enumerate(signatures):
+        for numero in signature.numeros:
+            par_contact[numero].append(rang)
+    for bloc in par_contact.values():
+        if len(bloc) > TAILLE_MAX_BLOC:
+            yield from fenetres(signatures, bloc)
+        elif len(bloc) > 1:
+            yield bloc
+
+def detecter_doublons(fiches, seuil=SEUIL_DOUBLON):
+    """Retourne les groupes de doublons probables, du plus sûr au moins sûr
+    
+    fiches est une suite de tuples (code, etablissement, nom, contact,
+    localisation), voir fiche_client ; la localisation est facultative. Chaque groupe est un tuple (meilleur score, codes triés) ;
+    deux fiches reliées par une chaîne de paires au-dessus du seuil sont dans
+    le même groupe.
+    """
+    signatures = [Signature(*fiche) for fiche in fiches]
+    
+    # Regroupement des paires retenues (union-find)
+    parents = {}
+    meilleurs = {}
+    
+    def racine(rang):
+        parents.setdefault(rang, rang)
+        while parents[rang] != rang:
+            parents[rang] = parents[parents[rang]]
+            rang = parents[rang]
+        return rang
+    
+    def relier(premier, second, score):
+        racine_premier, racine_second = racine(premier), racine(second)
+        if racine_premier != racine_second:
+            parents[racine_second] = racine_premier
+            score = max(score, meilleurs.pop(racine_second, 0))
+        meilleurs[racine_premier] = max(score, meilleurs.get(racine_premier, 0))
+    
+    # Noms identiques au même lieu : similarité de 1, reliés de proche en proche sans comparer
+    # les paires. Une fiche sans localisation est rattachée à la première de son nom.
+    par_nom = collections.defaultdict(list)
+    for rang, signature in enumerate(signatures):
+        if signature.trigrammes:
+            par_nom[signature.trigrammes].append(rang)
+    representants = []
+    for rangs in par_nom.values():
+        chefs = {}
+        for rang in rangs:
+            lieu = signatures[rang].lieu
+            chef = chefs.setdefault(lieu, rang) if lieu else rangs[0]
+            if chef != rang and seuil <= 1.0:
+                relier(chef, rang, 1.0)
+        representants.append(rangs[0])
+        representants.extend(chef for chef in chefs.values() if chef != rangs[0])
+    
+    # Noms distincts (un représentant par nom et par lieu) comparés entre eux, puis fiches de même contact
+    paires = set()
+    signatures_noms = [signatures[rang] for rang in representants]
+    for bloc in blocs_noms(signatures_noms):
+        paires.update(itertools.combinations([representants[rang] for rang in bloc], 2))
+    for bloc in blocs_contacts(signatures):
+        paires.update(itertools.combinations(bloc, 2))
+    
+    for premier, second in paires:
+        score = signatures[premier].score(signatures[second])
+        if score >= seuil:
+            relier(premier, second, score)
+    
+    groupes = collections.defaultdict(list)
+    for rang in parents:
+        groupes[racine(rang)].append(signatures[rang].code)
+    return sorted(((meilleurs[chef], sorted(codes)) for chef, codes in groupes.items()),
+                  key=lambda groupe: (-groupe[0], groupe[1]))
@@ -1,38 +1,255 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-import pickle
+from tkinter import ttk, messagebox, simpledialog, filedialog
 import os
-from datetime import datetime
+import csv
+import time
+import threading
+import queue
+from datetime import date, datetime
 
-class Client:
-    def __init__(self, code, etablissement, nom, localisation, contact, 
-                 mensualite, montant_paye, periode, agent, observation):
-        self.code = code
-        self.etablissement = etablissement
-        self.nom = nom
-        self.localisation = localisation
-        self.contact = contact
-        self.mensualite = mensualite
-        self.montant_paye = montant_paye
-        self.periode = periode
-        self.agent = agent
-        self.observation = observation
-        self.date_ajout = datetime.now().strftime("%Y-%m-%d")
+from profilage import SEUIL_BLOCAGE_S, profileur
+from statistiques import statistiques_instantane
+from doublons import detecter_doublons, fiche_client
+from moteur import (COLONNES_TABLEAU, TITRES, TRANCHES_RETARD, DonneesPerimees, GestionClients, VueTriee, 
+                    analyser_filtre, formater_montant, importer_csv, inserer_par_rang, position_par_rang, 
+                    valeurs_client, valider_valeurs)
+
+# Délai d'attente après la dernière frappe avant de lancer la recherche
+DELAI_RECHERCHE_MS = 250
+
+# Intervalle de relève des comptes rendus d'écriture
+INTERVALLE_SUIVI_MS = 200
+
+# Intervalle de relecture des modifications enregistrées par les autres postes
+INTERVALLE_SURVEILLANCE_MS = 1000
+
+# Temps maximal passé à intégrer des pages chargées par passage de la boucle Tk
+DUREE_INTEGRATION_S = 0.03
+
+# Intervalle des pulsations qui mesurent les blocages de la boucle Tk (profilage actif)
+INTERVALLE_PULSATION_MS = 100
+
+# Intervalle de rafraîchissement de l'onglet Diagnostics
+INTERVALLE_DIAGNOSTICS_MS = 1000
+
+# Tendances de l'onglet Statistiques : axes, mesures (rang dans une entrée de la série, couleur)
+LIBELLES_AXES_TENDANCE = {"Période": "periode", "Mois d'ajout": "mois"}
+MESURES_TENDANCE = {
+    "Montant perçu": (2, "#2ecc71"),
+    "Clients en retard": (3, "#e74c3c"),
+    "Nombre de clients": (1, "#3498db")
+}
+TOUS_LES_AGENTS = "Tous les agents"
+NB_POINTS_TENDANCE = 24
+
+# Bit de la touche Maj dans l'état des événements clavier Tk
+MASQUE_MAJ = 0x0001
+
+class TableauVirtuel:
+    """Affiche une liste de lignes dans un Treeview en ne matérialisant que la partie visible"""
+    
+    # Lignes matérialisées en plus de la zone visible (ligne partielle du bas)
+    TAMPON = 2
+    
+    def __init__(self, tableau, scrollbar, valeurs_ligne, commande_selection=None):
+        self.tableau = tableau
+        self.scrollbar = scrollbar
+        self.valeurs_ligne = valeurs_ligne
+        self.commande_selection = commande_selection
+        
+        self.lignes = []
+        self.debut = 0
+        self.selection = None  # Index absolu de la ligne sélectionnée dans self.lignes
+        self.items = []  # Items du Treeview réutilisés d'un rendu à l'autre
+        self.valeurs_items = []  # Valeurs affichées par chaque item
+        
+        # Dimensions par défaut, corrigées dès que la première ligne est affichée
+        self.hauteur_ligne = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        self.hauteur_entete = 25
+        self.nb_visibles = 1
+        self.mesure = False
+        
+        self.scrollbar.configure(command=self.defiler)
+        self.tableau.configure(yscrollcommand=lambda *args: None)
+        
+        self.tableau.bind("<Configure>", self.redimensionner)
+        self.tableau.bind("<<TreeviewSelect>>", self.selection_treeview)
+        self.tableau.bind("<MouseWheel>", self.molette)
+        self.tableau.bind("<Button-4>", lambda event: self.defiler("scroll", -3, "units") or "break")
+        self.tableau.bind("<Button-5>", lambda event: self.defiler("scroll", 3, "units") or "break")
+        self.tableau.bind("<Up>", lambda event: self.deplacer_selection(-1))
+        self.tableau.bind("<Down>", lambda event: self.deplacer_selection(1))
+        self.tableau.bind("<Prior>", lambda event: self.deplacer_selection(-self.nb_visibles))
+        self.tableau.bind("<Next>", lambda event: self.deplacer_selection(self.nb_visibles))
+    
+    def definir_lignes(self, lignes, conserver_position=False):
+        """Remplace les lignes affichées (toute séquence indexable)"""
+        self.lignes = lignes
+        self.selection = None
+        if not conserver_position:
+            self.debut = 0
+        self.debut = self.borner(self.debut)
+        self.dessiner()
+    
+    def actualiser(self):
+        """Redessine la fenêtre courante après un changement du contenu des lignes"""
+        self.debut = self.borner(self.debut)
+        if self.selection is not None and self.selection >= len(self.lignes):
+            self.selection = None
+        self.dessiner()
+    
+    def borner(self, debut):
+        """Limite la première ligne affichée aux bornes de la liste"""
+        return max(0, min(debut, len(self.lignes) - self.nb_visibles))
+    
+    @profileur.instrumenter("interface.dessiner")
+    def dessiner(self):
+        """Met à jour les items matérialisés pour la fenêtre courante"""
+        nb = max(0, min(self.nb_visibles + self.TAMPON, len(self.lignes) - self.debut))
+        
+        # Ajuster la taille du pool d'items sans toucher aux autres
+        while len(self.items) < nb:
+            self.items.append(self.tableau.insert("", tk.END))
+            self.valeurs_items.append(None)
+        while len(self.items) > nb:
+            self.tableau.delete(self.items.pop())
+            self.valeurs_items.pop()
+        
+        # Ne toucher que les items dont les valeurs changent
+        for i, item in enumerate(self.items):
+            valeurs = self.valeurs_ligne(self.lignes[self.debut + i])
+            if valeurs != self.valeurs_items[i]:
+                self.tableau.item(item, values=valeurs)
+                self.valeurs_items[i] = valeurs
+        
+        # Reporter la sélection sur l'item qui affiche la ligne sélectionnée
+        position = None if self.selection is None else self.selection - self.debut
+        if position is not None and 0 <= position < len(self.items):
+            self.tableau.selection_set(self.items[position])
+            self.tableau.focus(self.items[position])
+        elif self.tableau.selection():
+            self.tableau.selection_remove(*self.tableau.selection())
+        
+        self.tableau.yview_moveto(0)
+        self.mettre_a_jour_scrollbar()
+        
+        # Première ligne affichée : mesurer la hauteur réelle des lignes
+        if not self.mesure and self.items:
+            self.tableau.after_idle(self.ajuster)
+    
+    def mettre_a_jour_scrollbar(self):
+        """Positionne la scrollbar par rapport à la liste complète"""
+        total = len(self.lignes)
+        if total <= self.nb_visibles:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.debut / total, (self.debut + self.nb_visibles) / total)
+    
+    def defiler(self, action, valeur, unite=None):
+        """Commande de la scrollbar verticale"""
+        if action == "moveto":
+            debut = int(float(valeur) * len(self.lignes))
+        else:
+            pas = self.nb_visibles if unite == "pages" else 1
+            debut = self.debut + int(valeur) * pas
+        
+        debut = self.borner(debut)
+        if debut != self.debut:
+            self.debut = debut
+            self.dessiner()
+    
+    def molette(self, event):
+        """Défilement à la molette (Windows et macOS)"""
+        if event.delta:
+            pas = -event.delta // 120 if abs(event.delta) >= 120 else -event.delta
+            self.defiler("scroll", pas * 3, "units")
+        return "break"
+    
+    def deplacer_selection(self, pas):
+        """Déplace la sélection au clavier en faisant suivre la fenêtre"""
+        if not self.lignes:
+            return "break"
+        
+        index = self.debut if self.selection is None else self.selection + pas
+        index = max(0, min(index, len(self.lignes) - 1))
+        self.selection = index
+        
+        if index < self.debut:
+            self.debut = index
+        elif index >= self.debut + self.nb_visibles:
+            self.debut = self.borner(index - self.nb_visibles + 1)
+        self.dessiner()
+        
+        if self.commande_selection:
+            self.commande_selection()
+        return "break"
+    
+    def selection_treeview(self, event):
+        """Traduit la sélection du Treeview en index absolu"""
+        items = self.tableau.selection()
+        if items and items[0] in self.items:
+            self.selection = self.debut + self.items.index(items[0])
+        elif self.selection is not None and self.debut <= self.selection < self.debut + len(self.items):
+            # La ligne sélectionnée est visible mais plus sélectionnée : désélection réelle
+            self.selection = None
+        
+        if self.commande_selection:
+            self.commande_selection()
+    
+    def redimensionner(self, event):
+        """Recalcule le nombre de lignes visibles quand le tableau change de taille"""
+        self.ajuster(event.height)
+    
+    def ajuster(self, hauteur=None):
+        """Mesure les lignes réellement affichées et adapte la taille de la fenêtre"""
+        if hauteur is None:
+            hauteur = self.tableau.winfo_height()
+        
+        if self.items:
+            bbox = self.tableau.bbox(self.items[0])
+            if bbox:
+                self.hauteur_entete = bbox[1]
+                self.hauteur_ligne = bbox[3]
+                self.mesure = True
+        
+        nb_visibles = max(1, (hauteur - self.hauteur_entete) // self.hauteur_ligne)
+        if nb_visibles != self.nb_visibles:
+            self.nb_visibles = nb_visibles
+            self.debut = self.borner(self.debut)
+            self.dessiner()
 
 class BuridaApp:
     def __init__(self, root):
+        self.debut_chargement = time.perf_counter()
         self.root = root
         self.root.title("BURIDA - Gestion de Clients")
         self.root.geometry("1200x700")
         self.root.configure(bg="#f0f0f0")
         
-        self.clients = []
-        self.current_selection = None
+        self.current_selection = None  # Code du client sélectionné
+        self.clients_affiches = None  # Clients affichés, avant tri (tous ou résultat de recherche)
+        self.tri = None  # (colonne, décroissant) du tri affiché
+        self.filtre = {}  # Critères du filtre appliqué (voir analyser_filtre)
+        self.changements_en_attente = []  # Événements du moteur pas encore affichés
         self.filename = "burida_clients.pkl"
+        self.gestion = GestionClients(self.filename, asynchrone=True)
+        self.gestion.abonner(self.recevoir_changement)
+        self.cartes_affichees = {}
+        self.items_agents = {}
+        self.tendance_affichee = None
+        self.recherche_en_attente = None
+        self.donnees_perimees = False  # Avertissement de réorganisation déjà affiché
+        self.pages_a_charger = None
+        self.temps_premiere_ligne = None
         
-        # Charger les données si le fichier existe
+        # Ouvrir les données : seule la première page est lue avant l'affichage
         self.charger_donnees()
         
+        # Barre d'état (compte rendu des enregistrements en arrière-plan)
+        self.barre_etat = tk.Label(root, text="", anchor=tk.W, bg="#e0e0e0", 
+                                   font=("Arial", 9), padx=10)
+        self.barre_etat.pack(side=tk.BOTTOM, fill=tk.X)
+        
         # Créer les onglets
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -45,14 +262,38 @@ class BuridaApp:
         self.tab_stats = ttk.Frame(self.notebook)
         self.notebook.add(self.tab_stats, text="Statistiques")
         
+        # Onglet diagnostics (profilage)
+        self.tab_diagnostics = ttk.Frame(self.notebook)
+        self.notebook.add(self.tab_diagnostics, text="Diagnostics")
+        
         # Configuration des widgets dans l'onglet liste
         self.configurer_onglet_liste()
         
         # Configuration des widgets dans l'onglet statistiques
         self.configurer_onglet_stats()
         
-        # Remplir le tableau
+        # Menu et onglet de diagnostic
+        self.configurer_menu()
+        self.configurer_onglet_diagnostics()
+        
+        # Remplir le tableau et mesurer le délai d'affichage des premières lignes
         self.rafraichir_tableau()
+        self.root.update_idletasks()
+        self.temps_premiere_ligne = time.perf_counter() - self.debut_chargement
+        self.barre_etat.config(text=f"Premières lignes affichées en {self.temps_premiere_ligne * 1000:.0f} ms, "
+                                    "chargement des données...")
+        
+        # Charger le reste des données en arrière-plan
+        if self.pages_a_charger is not None:
+            self.demarrer_chargement_pages()
+        
+        # Suivre les enregistrements et tout écrire avant de fermer la fenêtre
+        self.root.after(INTERVALLE_SUIVI_MS, self.suivre_enregistrements)
+        self.root.protocol("WM_DELETE_WINDOW", self.quitter)
+        
+        # Profilage activé par BURIDA_PROFIL
+        if profileur.actif:
+            self.demarrer_profilage()
     
     def configurer_onglet_liste(self):
         # Frame pour les boutons
@@ -64,7 +305,10 @@ class BuridaApp:
             ("Ajouter", self.ajouter_client, "#4CAF50"),
             ("Modifier", self.modifier_client, "#2196F3"),
             ("Supprimer", self.supprimer_client, "#F44336"),
-            ("Rafraîchir", self.rafraichir_tableau, "#FF9800")
+            ("Paiement", self.paiement_client, "#009688"),
+            ("Rafraîchir", self.rafraichir_tableau, "#FF9800"),
+            ("Importer", self.importer_clients, "#9C27B0"),
+            ("Exporter", self.exporter_clients, "#607D8B")
         ]
         
         for i, (texte, commande, couleur) in enumerate(boutons):
@@ -79,19 +323,19 @@ class BuridaApp:
         
         tk.Label(frame_recherche, text="Rechercher:", bg="#f0f0f0").pack(side=tk.LEFT)
         self.recherche_var = tk.StringVar()
-        self.recherche_var.trace("w", lambda name, index, mode: self.rechercher())
+        self.recherche_var.trace("w", lambda name, index, mode: self.planifier_recherche())
         entry_recherche = tk.Entry(frame_recherche, textvariable=self.recherche_var, width=20)
         entry_recherche.pack(side=tk.LEFT, padx=5)
         
+        # Panneau de filtre multicritère
+        self.configurer_filtre()
+        
         # Frame pour le tableau
         frame_tableau = tk.Frame(self.tab_liste)
         frame_tableau.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
         # Tableau (Treeview)
-        colonnes = [
-            "code", "etablissement", "nom", "localisation", "contact", 
-            "mensualite", "montant_paye", "periode", "agent", "observation", "date_ajout"
-        ]
+        colonnes = COLONNES_TABLEAU
         
         self.tableau = ttk.Treeview(frame_tableau, columns=colonnes, show="headings")
         
@@ -99,32 +343,70 @@ class BuridaApp:
         largeurs = {
             "code": 80, "etablissement": 150, "nom": 150, "localisation": 120, 
             "contact": 100, "mensualite": 100, "montant_paye": 100, "periode": 100, 
-            "agent": 100, "observation": 150, "date_ajout": 100
+            "agent": 100, "observation": 150, "date_ajout": 100, "solde": 100, "retard": 80
         }
         
-        titres = {
-            "code": "Code", "etablissement": "Établissement", "nom": "Nom", 
-            "localisation": "Localisation", "contact": "Contact", "mensualite": "Mensualité", 
-            "montant_paye": "Montant Payé", "periode": "Période", "agent": "Agent", 
-            "observation": "Observation", "date_ajout": "Date d'ajout"
-        }
+        titres = TITRES
         
         for col in colonnes:
-            self.tableau.heading(col, text=titres[col])
+            self.tableau.heading(col, text=titres[col], command=lambda c=col: self.trier_par(c))
             self.tableau.column(col, width=largeurs[col], anchor=tk.W)
         
         # Scrollbars
-        scrollbar_y = ttk.Scrollbar(frame_tableau, orient=tk.VERTICAL, command=self.tableau.yview)
+        scrollbar_y = ttk.Scrollbar(frame_tableau, orient=tk.VERTICAL)
         scrollbar_x = ttk.Scrollbar(frame_tableau, orient=tk.HORIZONTAL, command=self.tableau.xview)
-        self.tableau.configure(yscrollcommand=scrollbar_y.set, xscrollcommand=scrollbar_x.set)
+        self.tableau.configure(xscrollcommand=scrollbar_x.set)
         
         # Placement des éléments
         scrollbar_y.pack(side=tk.RIGHT, fill=tk.Y)
         scrollbar_x.pack(side=tk.BOTTOM, fill=tk.X)
         self.tableau.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        # Événement de sélection
-        self.tableau.bind("<<TreeviewSelect>>", self.selection_item)
+        # Affichage virtualisé : la scrollbar verticale et la sélection sont gérées par la vue
+        self.vue = TableauVirtuel(self.tableau, scrollbar_y, valeurs_client,
+                                  commande_selection=self.selection_item)
+    
+    def configurer_filtre(self):
+        frame_filtre = tk.LabelFrame(self.tab_liste, text="Filtre", bg="#f0f0f0", padx=5, pady=5)
+        frame_filtre.pack(side=tk.TOP, fill=tk.X, padx=10, pady=5)
+        
+        self.filtre_vars = {}
+        
+        # Première ligne : valeurs exactes (listes des valeurs présentes) et situation
+        for i, (texte, champ) in enumerate([("Agent:", "agent"), ("Localisation:", "localisation"), 
+                                            ("Période:", "periode")]):
+            tk.Label(frame_filtre, text=texte, bg="#f0f0f0").grid(row=0, column=2 * i, padx=5, sticky=tk.E)
+            var = tk.StringVar()
+            self.filtre_vars[champ] = var
+            liste = ttk.Combobox(frame_filtre, textvariable=var, width=18)
+            liste.configure(postcommand=lambda liste=liste, champ=champ: 
+                            liste.configure(values=self.gestion.valeurs_filtre(champ)))
+            liste.grid(row=0, column=2 * i + 1, padx=5, pady=2, sticky=tk.W)
+        
+        tk.Label(frame_filtre, text="Situation:", bg="#f0f0f0").grid(row=0, column=6, padx=5, sticky=tk.E)
+        self.situation_var = tk.StringVar(value="Tous")
+        ttk.Combobox(frame_filtre, textvariable=self.situation_var, state="readonly", width=10,
+                     values=["Tous", "En retard", "À jour"]).grid(row=0, column=7, padx=5, pady=2, sticky=tk.W)
+        
+        # Deuxième ligne : intervalles (bornes facultatives)
+        intervalles = [("Mensualité:", "mensualite", 8), ("Montant payé:", "montant_paye", 8), 
+                       ("Ajouté (AAAA-MM-JJ):", "date_ajout", 10)]
+        for i, (texte, champ, largeur) in enumerate(intervalles):
+            tk.Label(frame_filtre, text=texte, bg="#f0f0f0").grid(row=1, column=2 * i, padx=5, sticky=tk.E)
+            frame_bornes = tk.Frame(frame_filtre, bg="#f0f0f0")
+            frame_bornes.grid(row=1, column=2 * i + 1, padx=5, pady=2, sticky=tk.W)
+            for borne, separateur in (("min", "de"), ("max", "à")):
+                tk.Label(frame_bornes, text=separateur, bg="#f0f0f0").pack(side=tk.LEFT)
+                var = tk.StringVar()
+                self.filtre_vars[f"{champ}_{borne}"] = var
+                tk.Entry(frame_bornes, textvariable=var, width=largeur).pack(side=tk.LEFT, padx=2)
+        
+        frame_actions = tk.Frame(frame_filtre, bg="#f0f0f0")
+        frame_actions.grid(row=1, column=6, columnspan=2, padx=5, sticky=tk.W)
+        tk.Button(frame_actions, text="Filtrer", command=self.appliquer_filtre, 
+                bg="#3498db", fg="white", width=8).pack(side=tk.LEFT, padx=2)
+        tk.Button(frame_actions, text="Effacer", command=self.effacer_filtre, 
+                bg="#95a5a6", fg="white", width=8).pack(side=tk.LEFT, padx=2)
     
     def configurer_onglet_stats(self):
         # Frame principale pour les statistiques
@@ -178,144 +460,518 @@ class BuridaApp:
         
         self.tableau_agents.pack(fill=tk.X, padx=10, pady=10)
         
+        # Ancienneté des retards : une ligne fixe par tranche
+        tk.Label(periode_frame, text="Ancienneté des retards", 
+               font=("Arial", 14, "bold"), bg="white").pack(pady=(0, 5))
+        
+        colonnes_anciennete = ["tranche", "nb_clients", "arrieres"]
+        self.tableau_anciennete = ttk.Treeview(periode_frame, columns=colonnes_anciennete, show="headings", 
+                                               height=len(TRANCHES_RETARD))
+        for col, largeur, titre in zip(colonnes_anciennete, [150, 100, 150], 
+                                     ["Retard", "Nombre de clients", "Arriérés"]):
+            self.tableau_anciennete.heading(col, text=titre)
+            self.tableau_anciennete.column(col, width=largeur, anchor=tk.CENTER)
+        self.items_anciennete = [self.tableau_anciennete.insert("", tk.END, values=(libelle, 0, "0.00"))
+                                 for limite, libelle in TRANCHES_RETARD]
+        
+        self.tableau_anciennete.pack(fill=tk.X, padx=10, pady=10)
+        
+        # Tendances par période ou par mois d'ajout, lues dans les cumuls du moteur
+        tendance_frame = tk.Frame(main_frame, bg="white", bd=1, relief=tk.RAISED)
+        tendance_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        
+        frame_choix = tk.Frame(tendance_frame, bg="white")
+        frame_choix.pack(fill=tk.X, padx=10, pady=5)
+        tk.Label(frame_choix, text="Tendances", font=("Arial", 14, "bold"), bg="white").pack(side=tk.LEFT, padx=(0, 20))
+        
+        self.axe_tendance_var = tk.StringVar(value="Période")
+        self.mesure_tendance_var = tk.StringVar(value="Montant perçu")
+        self.agent_tendance_var = tk.StringVar(value=TOUS_LES_AGENTS)
+        for libelle, variable, valeurs, largeur in [("Axe:", self.axe_tendance_var, list(LIBELLES_AXES_TENDANCE), 14),
+                                                    ("Mesure:", self.mesure_tendance_var, list(MESURES_TENDANCE), 18),
+                                                    ("Agent:", self.agent_tendance_var, [TOUS_LES_AGENTS], 22)]:
+            tk.Label(frame_choix, text=libelle, bg="white").pack(side=tk.LEFT, padx=(10, 2))
+            combo = ttk.Combobox(frame_choix, textvariable=variable, values=valeurs, state="readonly", width=largeur)
+            combo.pack(side=tk.LEFT)
+            combo.bind("<<ComboboxSelected>>", lambda e: self.dessiner_tendance())
+        self.combo_agent_tendance = combo
+        
+        self.canvas_tendance = tk.Canvas(tendance_frame, bg="white", height=220, highlightthickness=0)
+        self.canvas_tendance.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        self.canvas_tendance.bind("<Configure>", lambda e: self.dessiner_tendance())
+        
         # Bouton pour rafraîchir les statistiques
         tk.Button(main_frame, text="Rafraîchir les statistiques", 
                 command=self.calculer_statistiques, bg="#3498db", fg="white", 
                 font=("Arial", 10, "bold")).pack(pady=10)
     
+    def configurer_menu(self):
+        barre_menu = tk.Menu(self.root)
+        
+        menu_edition = tk.Menu(barre_menu, tearoff=0)
+        menu_edition.add_command(label="Annuler", accelerator="Ctrl+Z", command=self.annuler)
+        menu_edition.add_command(label="Rétablir", accelerator="Ctrl+Y", command=self.retablir)
+        barre_menu.add_cascade(label="Édition", menu=menu_edition)
+        # Verr. Maj change aussi la touche en « Z » ou « Y » : seul l'état de Maj distingue Ctrl+Maj+Z
+        for sequence in ("<Control-z>", "<Control-Z>"):
+            self.root.bind(sequence, self.raccourci_annuler)
+        for sequence in ("<Control-y>", "<Control-Y>"):
+            self.root.bind(sequence, lambda event: self.retablir())
+        
+        menu_outils = tk.Menu(barre_menu, tearoff=0)
+        
+        self.profilage_var = tk.BooleanVar(value=profileur.actif)
+        menu_outils.add_checkbutton(label="Profilage", variable=self.profilage_var,
+                                    command=self.basculer_profilage)
+        menu_outils.add_command(label="Exporter la trace...", command=self.exporter_trace)
+        menu_outils.add_separator()
+        menu_outils.add_command(label="Statistiques d'une archive...", command=self.statistiques_archive)
+        menu_outils.add_command(label="Rechercher les doublons...", command=self.rechercher_doublons)
+        
+        barre_menu.add_cascade(label="Outils", menu=menu_outils)
+        self.root.config(menu=barre_menu)
+    
+    def configurer_onglet_diagnostics(self):
+        main_frame = tk.Frame(self.tab_diagnostics, bg="#f0f0f0")
+        main_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=20)
+        
+        # Commandes du profilage
+        frame_commandes = tk.Frame(main_frame, bg="#f0f0f0")
+        frame_commandes.pack(fill=tk.X, pady=5)
+        
+        tk.Checkbutton(frame_commandes, text="Profilage actif", variable=self.profilage_var,
+                       command=self.basculer_profilage, bg="#f0f0f0").pack(side=tk.LEFT, padx=5)
+        
+        for texte, commande, couleur in [("Actualiser", self.actualiser_diagnostics, "#3498db"),
+                                         ("Réinitialiser", self.reinitialiser_diagnostics, "#95a5a6"),
+                                         ("Exporter la trace", self.exporter_trace, "#607D8B")]:
+            tk.Button(frame_commandes, text=texte, command=commande, bg=couleur, fg="white",
+                    font=("Arial", 10, "bold")).pack(side=tk.LEFT, padx=5)
+        
+        # Blocages de la boucle Tk
+        self.lbl_boucle = tk.Label(main_frame, text="Boucle Tk : profilage inactif",
+                                   font=("Arial", 11), bg="#f0f0f0", anchor=tk.W)
+        self.lbl_boucle.pack(fill=tk.X, pady=10)
+        
+        # Durées par opération
+        colonnes = ["operation", "appels", "total", "moyenne", "maximum"]
+        self.tableau_diagnostics = ttk.Treeview(main_frame, columns=colonnes, show="headings")
+        for col, largeur, titre in zip(colonnes, [250, 100, 120, 120, 120],
+                                       ["Opération", "Appels", "Total (ms)", "Moyenne (ms)", "Max (ms)"]):
+            self.tableau_diagnostics.heading(col, text=titre)
+            self.tableau_diagnostics.column(col, width=largeur, anchor=tk.W if col == "operation" else tk.E)
+        self.tableau_diagnostics.pack(fill=tk.BOTH, expand=True, pady=5)
+    
+    def basculer_profilage(self):
+        """Active ou désactive le profilage depuis le menu ou l'onglet Diagnostics"""
+        if self.profilage_var.get():
+            profileur.activer()
+            self.demarrer_profilage()
+        else:
+            profileur.activer(False)
+            self.actualiser_diagnostics()
+    
+    def demarrer_profilage(self):
+        """Lance les pulsations de mesure de la boucle Tk et le rafraîchissement des diagnostics"""
+        prevue = time.perf_counter() + INTERVALLE_PULSATION_MS / 1000
+        self.root.after(INTERVALLE_PULSATION_MS, self.surveiller_boucle, prevue)
+        self.root.after(INTERVALLE_DIAGNOSTICS_MS, self.suivre_diagnostics)
+    
+    def surveiller_boucle(self, prevue):
+        """Pulsation : le retard sur l'heure prévue est le temps pendant lequel la boucle Tk était bloquée"""
+        if not profileur.actif:
+            return
+        maintenant = time.perf_counter()
+        profileur.pulsation(prevue, max(0, maintenant - prevue))
+        self.root.after(INTERVALLE_PULSATION_MS, self.surveiller_boucle,
+                        maintenant + INTERVALLE_PULSATION_MS / 1000)
+    
+    def suivre_diagnostics(self):
+        if not profileur.actif:
+            return
+        self.actualiser_diagnostics()
+        self.root.after(INTERVALLE_DIAGNOSTICS_MS, self.suivre_diagnostics)
+    
+    def actualiser_diagnostics(self):
+        """Affiche les mesures du profilage dans l'onglet Diagnostics"""
+        mediane, p95, maximum, blocages = profileur.resume_boucle()
+        etat = "actif" if profileur.actif else "inactif"
+        self.lbl_boucle.config(text=f"Boucle Tk (profilage {etat}) : retard médian {mediane * 1000:.0f} ms, "
+                                    f"p95 {p95 * 1000:.0f} ms, max {maximum * 1000:.0f} ms, "
+                                    f"{blocages} blocage(s) de plus de {SEUIL_BLOCAGE_S * 1000:.0f} ms")
+        
+        self.tableau_diagnostics.delete(*self.tableau_diagnostics.get_children())
+        for nom, appels, total, moyenne, maximum in profileur.resume():
+            self.tableau_diagnostics.insert("", tk.END, values=(
+                nom, appels, f"{total * 1000:,.1f}", f"{moyenne * 1000:,.2f}", f"{maximum * 1000:,.1f}"))
+    
+    def reinitialiser_diagnostics(self):
+        profileur.reinitialiser()
+        self.actualiser_diagnostics()
+    
+    def exporter_trace(self):
+        """Exporte la trace du profilage au format Chrome trace"""
+        chemin = filedialog.asksaveasfilename(
+            parent=self.root, title="Exporter la trace", defaultextension=".json",
+            filetypes=[("Trace Chrome (JSON)", "*.json")])
+        if not chemin:
+            return
+        try:
+            nb_evenements = profileur.exporter_trace(chemin)
+        except OSError as e:
+            messagebox.showerror("Erreur", f"Impossible d'exporter la trace: {str(e)}")
+            return
+        self.barre_etat.config(text=f"{nb_evenements} événement(s) exporté(s) vers {os.path.basename(chemin)} "
+                                    "(à ouvrir dans chrome://tracing ou Perfetto)", fg="#2e7d32")
+    
+    @profileur.instrumenter("interface.calculer_statistiques")
     def calculer_statistiques(self):
-        """Calcule et affiche les statistiques"""
-        if not self.clients:
-            return
-        
-        # Statistiques générales
-        total_clients = len(self.clients)
-        total_montant = sum(float(client.montant_paye) for client in self.clients)
-        
-        # On suppose qu'un client est à jour si montant_paye >= mensualite
-        clients_a_jour = sum(1 for client in self.clients 
-                             if float(client.montant_paye) >= float(client.mensualite))
-        clients_retard = total_clients - clients_a_jour
-        
-        # Mettre à jour les labels
-        self.lbl_total_clients.config(text=str(total_clients))
-        self.lbl_total_montant.config(text=f"{total_montant:,.2f}")
-        self.lbl_clients_a_jour.config(text=str(clients_a_jour))
-        self.lbl_clients_retard.config(text=str(clients_retard))
-        
-        # Statistiques par agent
-        stats_agents = {}
-        for client in self.clients:
-            agent = client.agent
-            if agent not in stats_agents:
-                stats_agents[agent] = {"nb_clients": 0, "montant_total": 0}
+        """Affiche les statistiques tenues à jour, en ne redessinant que ce qui a changé"""
+        stats = self.gestion.statistiques
+        
+        # Cartes de statistiques générales
+        cartes = {
+            "total_clients": str(stats.total_clients),
+            "total_montant": f"{stats.total_montant / 100:,.2f}",
+            "clients_a_jour": str(stats.clients_a_jour),
+            "clients_retard": str(stats.clients_retard)
+        }
+        for tag, texte in cartes.items():
+            if self.cartes_affichees.get(tag) != texte:
+                getattr(self, f"lbl_{tag}").config(text=texte)
+                self.cartes_affichees[tag] = texte
+        
+        # Lignes du tableau des agents touchées depuis le dernier affichage
+        agents_modifies = stats.extraire_agents_modifies()
+        for agent in agents_modifies:
+            item = self.items_agents.get(agent)
+            if agent not in stats.par_agent:
+                if item is not None:
+                    self.tableau_agents.delete(item)
+                    del self.items_agents[agent]
+                continue
             
-            stats_agents[agent]["nb_clients"] += 1
-            stats_agents[agent]["montant_total"] += float(client.montant_paye)
-        
-        # Vider le tableau des agents
-        for item in self.tableau_agents.get_children():
-            self.tableau_agents.delete(item)
-        
-        # Remplir le tableau des agents
-        for agent, stats in stats_agents.items():
-            self.tableau_agents.insert("", tk.END, values=(
-                agent, 
-                stats["nb_clients"],
-                f"{stats['montant_total']:,.2f}"
-            ))
-    
-    def selection_item(self, event):
+            nb_clients, montant_total = stats.par_agent[agent]
+            valeurs = (agent, nb_clients, f"{montant_total / 100:,.2f}")
+            if item is None:
+                self.items_agents[agent] = self.tableau_agents.insert("", tk.END, values=valeurs)
+            else:
+                self.tableau_agents.item(item, values=valeurs)
+        
+        if agents_modifies:
+            self.combo_agent_tendance.config(values=[TOUS_LES_AGENTS] + sorted(stats.par_agent))
+        
+        # Les retards vieillissent chaque jour : l'ancienneté est recalculée à chaque affichage
+        for item, (limite, libelle), (nb_clients, arrieres) in zip(self.items_anciennete, TRANCHES_RETARD, 
+                                                                   stats.anciennete()):
+            valeurs = (libelle, nb_clients, f"{arrieres / 100:,.2f}")
+            if self.cartes_affichees.get(item) != valeurs:
+                self.tableau_anciennete.item(item, values=valeurs)
+                self.cartes_affichees[item] = valeurs
+        self.dessiner_tendance()
+    
+    def dessiner_tendance(self):
+        """Trace l'histogramme des derniers points de la tendance choisie (s'il a changé)"""
+        canvas = self.canvas_tendance
+        largeur, hauteur = canvas.winfo_width(), canvas.winfo_height()
+        axe = LIBELLES_AXES_TENDANCE[self.axe_tendance_var.get()]
+        indice, couleur = MESURES_TENDANCE[self.mesure_tendance_var.get()]
+        agent = self.agent_tendance_var.get()
+        agent = None if agent == TOUS_LES_AGENTS else agent
+        
+        # Les cumuls ne changent pas sans que leur version change : rien à redessiner
+        affichage = (self.gestion.statistiques.version_cumuls, self.gestion.charge, axe, indice, agent, largeur, hauteur)
+        if affichage == self.tendance_affichee or largeur < 100 or hauteur < 80:
+            return
+        self.tendance_affichee = affichage
+        
+        canvas.delete("all")
+        serie = self.gestion.tendance(axe, agent, NB_POINTS_TENDANCE)
+        if not serie:
+            canvas.create_text(largeur / 2, hauteur / 2, text="Aucune donnée", fill="#7f8c8d", font=("Arial", 11))
+            return
+        
+        valeurs = [entree[indice] / 100 if indice == 2 else entree[indice] for entree in serie]
+        maximum = max(max(valeurs), 1)
+        gauche, droite, haut, bas = 80, largeur - 10, 15, hauteur - 30
+        pas = (droite - gauche) / len(serie)
+        # Une étiquette sur n pour qu'elles ne se chevauchent pas
+        frequence = max(1, round(60 / pas))
+        
+        canvas.create_line(gauche, haut, gauche, bas, fill="#7f8c8d")
+        canvas.create_line(gauche, bas, droite, bas, fill="#7f8c8d")
+        canvas.create_text(gauche - 5, haut, text=f"{maximum:,.0f}", anchor=tk.E, font=("Arial", 8))
+        canvas.create_text(gauche - 5, bas, text="0", anchor=tk.E, font=("Arial", 8))
+        for i, (entree, valeur) in enumerate(zip(serie, valeurs)):
+            x0 = gauche + (i + 0.15) * pas
+            x1 = gauche + (i + 0.85) * pas
+            y = bas - valeur / maximum * (bas - haut)
+            canvas.create_rectangle(x0, y, x1, bas, fill=couleur, outline="")
+            if i % frequence == 0:
+                canvas.create_text((x0 + x1) / 2, bas + 12, text=entree[0], font=("Arial", 8))
+    
+    def selection_item(self):
         """Gère la sélection d'un élément dans le tableau"""
-        selected_items = self.tableau.selection()
-        if selected_items:
-            item_id = selected_items[0]
-            item_index = self.tableau.index(item_id)
-            self.current_selection = item_index
-        else:
+        if self.vue.selection is None:
             self.current_selection = None
+        else:
+            # Le code désigne le client quels que soient la recherche, le filtre et le tri
+            self.current_selection = self.vue.lignes[self.vue.selection].code
     
+    @profileur.instrumenter("interface.rafraichir_tableau")
     def rafraichir_tableau(self):
         """Rafraîchit l'affichage du tableau"""
-        # Effacer toutes les lignes actuelles
-        for item in self.tableau.get_children():
-            self.tableau.delete(item)
-        
-        # Ajouter les clients à la liste
-        for client in self.clients:
-            self.tableau.insert("", tk.END, values=(
-                client.code,
-                client.etablissement,
-                client.nom,
-                client.localisation,
-                client.contact,
-                client.mensualite,
-                client.montant_paye,
-                client.periode,
-                client.agent,
-                client.observation,
-                client.date_ajout
-            ))
+        # Seules les lignes visibles sont matérialisées dans le Treeview
+        self.afficher_clients(self.gestion.clients, conserver_position=True)
         
         # Mettre à jour les statistiques
         self.calculer_statistiques()
     
+    def recevoir_changement(self, evenement, client, ancien):
+        """Note un changement du moteur ; ceux d'un même passage de la boucle Tk sont affichés ensemble"""
+        if not self.changements_en_attente:
+            self.root.after_idle(self.appliquer_changements)
+        self.changements_en_attente.append((evenement, client, ancien))
+    
+    @profileur.instrumenter("interface.appliquer_changements")
+    def appliquer_changements(self):
+        """Répercute les changements en attente sur les lignes affichées et les statistiques"""
+        changements = self.changements_en_attente
+        self.changements_en_attente = []
+        
+        # La liste complète (et son ordre de tri) est tenue à jour par le moteur ; un
+        # résultat de recherche ou de filtre est corrigé client par client. Après un
+        # rechargement, les clients affichés ne font plus partie du modèle.
+        if any(evenement == "recharge" for evenement, client, ancien in changements):
+            self.tendance_affichee = None
+            self.rechercher()
+        elif self.clients_affiches is not self.gestion.clients:
+            recherche = self.recherche_var.get()
+            for evenement, client, ancien in changements:
+                self.retirer_affiche(client, ancien)
+                if evenement != "suppr" and self.gestion.correspond(client, recherche, self.filtre):
+                    self.inserer_affiche(client)
+        
+        # Garder la sélection sur le même client, où qu'il soit maintenant affiché
+        client = None if self.current_selection is None else self.gestion.client(self.current_selection)
+        self.vue.selection = None if client is None else self.position_affichee(client)
+        
+        # Seules les lignes visibles dont les valeurs ont changé sont redessinées
+        self.vue.actualiser()
+        self.calculer_statistiques()
+    
+    def retirer_affiche(self, client, ancien=None):
+        index = position_par_rang(self.clients_affiches, client)
+        if index is None:
+            return
+        del self.clients_affiches[index]
+        if isinstance(self.vue.lignes, VueTriee):
+            self.vue.lignes.retirer(client, ancien)
+    
+    def inserer_affiche(self, client):
+        inserer_par_rang(self.clients_affiches, client)
+        if isinstance(self.vue.lignes, VueTriee):
+            self.vue.lignes.inserer(client)
+    
+    def position_affichee(self, client):
+        """Position d'un client dans les lignes affichées (None s'il n'y figure pas)"""
+        if isinstance(self.vue.lignes, VueTriee):
+            return self.vue.lignes.position(client)
+        return position_par_rang(self.vue.lignes, client)
+    
+    @profileur.instrumenter("interface.afficher_clients")
+    def afficher_clients(self, clients, conserver_position=False):
+        """Affiche des clients dans l'ordre du tri courant"""
+        self.clients_affiches = clients
+        if self.tri is not None:
+            clients = self.gestion.trier(clients, *self.tri)
+        self.vue.definir_lignes(clients, conserver_position)
+    
+    def trier_par(self, colonne):
+        """Trie le tableau sur une colonne ; un nouveau clic inverse le sens"""
+        decroissant = self.tri is not None and self.tri[0] == colonne and not self.tri[1]
+        self.tri = (colonne, decroissant)
+        
+        for col in COLONNES_TABLEAU:
+            fleche = (" ▼" if decroissant else " ▲") if col == colonne else ""
+            self.tableau.heading(col, text=TITRES[col] + fleche)
+        
+        self.afficher_clients(self.clients_affiches)
+    
+    def planifier_recherche(self):
+        """Regroupe les frappes rapprochées en une seule recherche"""
+        if self.recherche_en_attente is not None:
+            self.root.after_cancel(self.recherche_en_attente)
+        self.recherche_en_attente = self.root.after(DELAI_RECHERCHE_MS, self.rechercher)
+    
+    @profileur.instrumenter("interface.rechercher")
     def rechercher(self):
         """Recherche dans le tableau"""
-        recherche = self.recherche_var.get().lower()
-        
-        # Effacer toutes les lignes actuelles
-        for item in self.tableau.get_children():
-            self.tableau.delete(item)
-        
-        # Filtrer et ajouter les clients correspondants
-        for client in self.clients:
-            if (recherche in client.code.lower() or 
-                recherche in client.etablissement.lower() or 
-                recherche in client.nom.lower() or
-                recherche in client.localisation.lower() or
-                recherche in client.contact.lower() or
-                recherche in client.agent.lower()):
-                
-                self.tableau.insert("", tk.END, values=(
-                    client.code,
-                    client.etablissement,
-                    client.nom,
-                    client.localisation,
-                    client.contact,
-                    client.mensualite,
-                    client.montant_paye,
-                    client.periode,
-                    client.agent,
-                    client.observation,
-                    client.date_ajout
-                ))
+        self.recherche_en_attente = None
+        
+        # Filtrer les clients correspondants via l'index de trigrammes et les index du filtre
+        self.afficher_clients(self.gestion.rechercher(self.recherche_var.get(), self.filtre))
+    
+    def appliquer_filtre(self):
+        """Applique les critères du panneau de filtre"""
+        valeurs = {cle: var.get() for cle, var in self.filtre_vars.items()}
+        valeurs["en_retard"] = {"En retard": True, "À jour": False}.get(self.situation_var.get())
+        try:
+            self.filtre = analyser_filtre(valeurs)
+        except ValueError as e:
+            messagebox.showwarning("Attention", str(e))
+            return
+        
+        debut = time.perf_counter()
+        self.rechercher()
+        if self.filtre:
+            self.barre_etat.config(text=f"{len(self.clients_affiches)} client(s) correspondant(s) au filtre "
+                                        f"({(time.perf_counter() - debut) * 1000:.0f} ms)", fg="black")
+    
+    def effacer_filtre(self):
+        """Vide le panneau de filtre et réaffiche tous les clients de la recherche"""
+        for var in self.filtre_vars.values():
+            var.set("")
+        self.situation_var.set("Tous")
+        self.filtre = {}
+        self.rechercher()
     
     def ajouter_client(self):
         """Ouvre une fenêtre pour ajouter un nouveau client"""
+        if not self.verifier_chargement():
+            return
         self.fenetre_client("Ajouter un client")
     
     def modifier_client(self):
         """Modifie le client sélectionné"""
+        if not self.verifier_chargement():
+            return
         if self.current_selection is None:
             messagebox.showwarning("Attention", "Veuillez sélectionner un client à modifier.")
             return
         
-        client = self.clients[self.current_selection]
+        client = self.gestion.client(self.current_selection)
+        if client is None:
+            messagebox.showwarning("Attention", "Le client sélectionné n'existe plus.")
+            self.current_selection = None
+            return
         self.fenetre_client("Modifier un client", client)
     
+    def paiement_client(self):
+        """Enregistre un paiement pour le client sélectionné"""
+        if not self.verifier_chargement():
+            return
+        if self.current_selection is None:
+            messagebox.showwarning("Attention", "Veuillez sélectionner un client.")
+            return
+        
+        client = self.gestion.client(self.current_selection)
+        if client is None:
+            messagebox.showwarning("Attention", "Le client sélectionné n'existe plus.")
+            self.current_selection = None
+            return
+        self.fenetre_paiement(client)
+    
+    def fenetre_paiement(self, client):
+        """Grand livre du client et saisie d'un nouveau paiement"""
+        fenetre = tk.Toplevel(self.root)
+        fenetre.title(f"Paiements - {client.code}")
+        fenetre.geometry("500x450")
+        fenetre.configure(bg="#f0f0f0")
+        fenetre.transient(self.root)
+        fenetre.grab_set()
+        
+        retard = f", en retard de {client.retard}" if client.retard else ""
+        tk.Label(fenetre, text=f"{client.etablissement} ({client.code})", 
+               font=("Arial", 12, "bold"), bg="#f0f0f0").pack(pady=(10, 0))
+        tk.Label(fenetre, text=f"Mensualité {client.mensualite}, payé {formater_montant(client.total_paye_centimes)}, "
+                               f"solde {client.solde}{retard}", bg="#f0f0f0").pack(pady=5)
+        
+        # Paiements déjà enregistrés, du plus ancien au plus récent
+        colonnes_paiement = ["date", "montant"]
+        tableau = ttk.Treeview(fenetre, columns=colonnes_paiement, show="headings", height=10)
+        for col, largeur, titre in zip(colonnes_paiement, [150, 150], ["Date", "Montant"]):
+            tableau.heading(col, text=titre)
+            tableau.column(col, width=largeur, anchor=tk.CENTER)
+        for jour, montant in self.gestion.paiements(client.code):
+            tableau.insert("", tk.END, values=(jour, montant))
+        tableau.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        # Saisie du paiement (date vide pour aujourd'hui)
+        frame_saisie = tk.Frame(fenetre, bg="#f0f0f0")
+        frame_saisie.pack(pady=5)
+        montant_var = tk.StringVar()
+        jour_var = tk.StringVar(value=date.today().strftime("%Y-%m-%d"))
+        for libelle, variable in [("Montant:", montant_var), ("Date (AAAA-MM-JJ):", jour_var)]:
+            tk.Label(frame_saisie, text=libelle, bg="#f0f0f0").pack(side=tk.LEFT, padx=(10, 2))
+            tk.Entry(frame_saisie, textvariable=variable, width=12).pack(side=tk.LEFT)
+        
+        def enregistrer():
+            # Le client a pu être supprimé sur un autre poste depuis l'ouverture de la fenêtre
+            if self.gestion.client(client.code) is None:
+                messagebox.showwarning("Attention", "Ce client a été supprimé sur un autre poste.")
+                fenetre.destroy()
+                return
+            try:
+                self.executer(self.gestion.enregistrer_paiement, client.code, montant_var.get(), jour_var.get().strip())
+            except ValueError as e:
+                messagebox.showwarning("Attention", str(e))
+                return
+            # Le tableau et les statistiques sont mis à jour par les événements du moteur
+            fenetre.destroy()
+        
+        buttons_frame = tk.Frame(fenetre, bg="#f0f0f0")
+        buttons_frame.pack(pady=10)
+        tk.Button(buttons_frame, text="Annuler", command=fenetre.destroy, 
+                bg="#f44336", fg="white", width=10).pack(side=tk.LEFT, padx=10)
+        tk.Button(buttons_frame, text="Enregistrer", command=enregistrer, 
+                bg="#4caf50", fg="white", width=10).pack(side=tk.LEFT, padx=10)
+    
     def supprimer_client(self):
         """Supprime le client sélectionné"""
+        if not self.verifier_chargement():
+            return
         if self.current_selection is None:
             messagebox.showwarning("Attention", "Veuillez sélectionner un client à supprimer.")
             return
         
         if messagebox.askyesno("Confirmation", "Êtes-vous sûr de vouloir supprimer ce client ?"):
-            del self.clients[self.current_selection]
-            self.sauvegarder_donnees()
-            self.rafraichir_tableau()
+            # Un autre poste a pu le supprimer pendant la confirmation
+            if self.gestion.client(self.current_selection) is not None:
+                self.executer(self.gestion.supprimer, self.current_selection)
             self.current_selection = None
     
+    def annuler(self):
+        """Annule la dernière modification (Ctrl+Z)"""
+        self.rejouer(self.gestion.annuler, "Annulé", "Rien à annuler.")
+    
+    def retablir(self):
+        """Rétablit la dernière modification annulée (Ctrl+Y)"""
+        self.rejouer(self.gestion.retablir, "Rétabli", "Rien à rétablir.")
+    
+    def raccourci_annuler(self, event):
+        """Ctrl+Z annule, Ctrl+Maj+Z rétablit"""
+        if event.state & MASQUE_MAJ:
+            self.retablir()
+        else:
+            self.annuler()
+    
+    def rejouer(self, operation, action, message_vide):
+        if not self.verifier_chargement():
+            return
+        try:
+            description = operation()
+        except ValueError as e:
+            messagebox.showwarning("Attention", str(e))
+            return
+        except OSError as e:
+            self.barre_etat.config(text=f"Impossible d'enregistrer les données: {str(e)}", fg="#c62828")
+            return
+        
+        # Le tableau est mis à jour par les événements du moteur
+        texte = message_vide if description is None else f"{action} : {description}"
+        self.barre_etat.config(text=texte, fg="black")
+    
     def fenetre_client(self, titre, client=None):
         """Fenêtre pour ajouter ou modifier un client"""
         # Créer une nouvelle fenêtre
@@ -350,6 +1006,7 @@ class BuridaApp:
         
         # Variables pour stocker les valeurs
         variables = {}
+        valeurs_initiales = valeurs_client(client) if client else None
         
         # Créer les champs de formulaire
         for i, (label_text, field_name) in enumerate(champs):
@@ -380,12 +1037,6 @@ class BuridaApp:
         
         # Fonction pour sauvegarder les données du formulaire
         def sauvegarder():
-            # Vérifier que les champs obligatoires sont remplis
-            for field_name in ["code", "etablissement", "nom"]:
-                if not variables[field_name].get().strip():
-                    messagebox.showwarning("Attention", f"Le champ {field_name} est obligatoire.")
-                    return
-            
             # Récupérer les valeurs du formulaire
             values = {}
             for field_name, var in variables.items():
@@ -394,17 +1045,32 @@ class BuridaApp:
                 else:
                     values[field_name] = var.get()
             
+            # Vérifier les champs obligatoires, les montants et l'unicité du code
+            try:
+                valider_valeurs(values)
+                self.gestion.verifier_code(values["code"], client)
+            except ValueError as e:
+                messagebox.showwarning("Attention", str(e))
+                return
+            
+            # Le client a pu changer sur un autre poste depuis l'ouverture de la fenêtre
+            if client and self.gestion.client(client.code) is not client:
+                messagebox.showwarning("Attention", "Ce client a été supprimé sur un autre poste.")
+                fenetre.destroy()
+                return
+            if client and valeurs_client(client) != valeurs_initiales and not messagebox.askyesno(
+                    "Conflit", "Ce client a été modifié sur un autre poste depuis l'ouverture de la fenêtre.\n"
+                               "Remplacer ses valeurs par les vôtres ?"):
+                return
+            
             # Créer ou modifier le client
             if client:
-                for field_name, value in values.items():
-                    setattr(client, field_name, value)
+                self.executer(self.gestion.modifier, client.code, values)
+                self.current_selection = client.code
             else:
-                nouveau_client = Client(**values)
-                self.clients.append(nouveau_client)
+                self.executer(self.gestion.ajouter, values)
             
-            # Sauvegarder les données et rafraîchir l'affichage
-            self.sauvegarder_donnees()
-            self.rafraichir_tableau()
+            # Le tableau est mis à jour par les événements du moteur
             fenetre.destroy()
         
         # Boutons d'action
@@ -414,151 +1080,509 @@ class BuridaApp:
         tk.Button(buttons_frame, text="Enregistrer", command=sauvegarder, 
                 bg="#4caf50", fg="white", width=10).pack(side=tk.LEFT, padx=10)
 
-    def sauvegarder_donnees(self):
-        """Sauvegarde les données dans un fichier"""
-        with open(self.filename, 'wb') as fichier:
-            pickle.dump(self.clients, fichier)
-        messagebox.showinfo("Succès", "Les données ont été enregistrées avec succès.")
+    def importer_clients(self):
+        """Importe des clients depuis un fichier CSV, par lots et en arrière-plan"""
+        if not self.verifier_chargement():
+            return
+        
+        chemin = filedialog.askopenfilename(
+            parent=self.root, title="Importer des clients",
+            filetypes=[("Fichiers CSV", "*.csv"), ("Tous les fichiers", "*.*")])
+        if not chemin:
+            return
+        
+        # Fenêtre de progression
+        fenetre = tk.Toplevel(self.root)
+        fenetre.title("Import de clients")
+        fenetre.geometry("400x150")
+        fenetre.configure(bg="#f0f0f0")
+        fenetre.transient(self.root)
+        
+        tk.Label(fenetre, text=os.path.basename(chemin), font=("Arial", 11, "bold"), 
+               bg="#f0f0f0").pack(pady=10)
+        progression = ttk.Progressbar(fenetre, length=350, maximum=100)
+        progression.pack(pady=5)
+        lbl_compte = tk.Label(fenetre, text="Lecture du fichier...", bg="#f0f0f0")
+        lbl_compte.pack(pady=5)
+        
+        arret = threading.Event()
+        tk.Button(fenetre, text="Arrêter", command=arret.set, 
+                bg="#f44336", fg="white", width=10).pack(pady=5)
+        fenetre.protocol("WM_DELETE_WINDOW", arret.set)
+        
+        import_en_cours = {
+            "fenetre": fenetre, "progression": progression, "lbl_compte": lbl_compte,
+            "file": queue.Queue(maxsize=4), "importes": 0, "rejets": []
+        }
+        threading.Thread(target=self.lire_import, args=(chemin, import_en_cours["file"], arret), 
+                         daemon=True).start()
+        self.root.after(50, self.suivre_import, import_en_cours)
     
-    def charger_donnees(self):
-        """Charge les données depuis un fichier"""
-        if os.path.exists(self.filename):
+    def lire_import(self, chemin, file_lots, arret):
+        """Lit et valide le CSV (thread d'import)"""
+        try:
+            for lot in importer_csv(chemin, arret=arret, codes_existants=self.gestion.clients.par_code):
+                file_lots.put(lot)
+        except (OSError, ValueError, csv.Error) as e:
+            file_lots.put(e)
+            return
+        file_lots.put(None)
+    
+    def suivre_import(self, import_en_cours):
+        """Insère les lots lus : une écriture et un rafraîchissement par lot"""
+        while True:
             try:
-                with open(self.filename, 'rb') as fichier:
-                    self.clients = pickle.load(fichier)
+                lot = import_en_cours["file"].get_nowait()
+            except queue.Empty:
+                self.root.after(50, self.suivre_import, import_en_cours)
+                return
+            
+            if lot is None or isinstance(lot, Exception):
+                break
+            
+            clients, rejets, octets_lus, taille = lot
+            import_en_cours["rejets"].extend(rejets)
+            if clients:
+                # Codes ajoutés entre la lecture du lot et son insertion
+                doublons = self.executer(self.gestion.ajouter_lot, clients) or []
+                import_en_cours["rejets"].extend((None, f"Le code {client.code} est déjà utilisé.") 
+                                                 for client in doublons)
+                import_en_cours["importes"] += len(clients) - len(doublons)
+            
+            import_en_cours["progression"]["value"] = 100 * octets_lus / max(taille, 1)
+            import_en_cours["lbl_compte"].config(
+                text=f"{import_en_cours['importes']} client(s) importé(s), {len(import_en_cours['rejets'])} rejeté(s)")
+        
+        import_en_cours["fenetre"].destroy()
+        if isinstance(lot, Exception):
+            messagebox.showerror("Erreur", f"Import interrompu: {str(lot)}")
+        self.rapport_import(import_en_cours["importes"], import_en_cours["rejets"])
+    
+    def rapport_import(self, importes, rejets):
+        """Affiche le bilan de l'import et les lignes rejetées"""
+        if not rejets:
+            messagebox.showinfo("Import terminé", f"{importes} client(s) importé(s).")
+            return
+        
+        fenetre = tk.Toplevel(self.root)
+        fenetre.title("Import terminé")
+        fenetre.geometry("600x400")
+        fenetre.configure(bg="#f0f0f0")
+        fenetre.transient(self.root)
+        
+        tk.Label(fenetre, text=f"{importes} client(s) importé(s), {len(rejets)} ligne(s) rejetée(s)", 
+               font=("Arial", 12, "bold"), bg="#f0f0f0").pack(pady=10)
+        
+        frame_texte = tk.Frame(fenetre)
+        frame_texte.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        scrollbar = ttk.Scrollbar(frame_texte, orient=tk.VERTICAL)
+        texte = tk.Text(frame_texte, yscrollcommand=scrollbar.set)
+        scrollbar.configure(command=texte.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        texte.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        texte.insert("1.0", "\n".join(f"Ligne {numero}: {motif}" if numero else motif for numero, motif in rejets))
+        texte.configure(state=tk.DISABLED)
+        
+        tk.Button(fenetre, text="Fermer", command=fenetre.destroy, 
+                bg="#3498db", fg="white", width=10).pack(pady=10)
+    
+    def exporter_clients(self):
+        """Exporte tous les clients ou ceux affichés (recherche ou filtre), en arrière-plan"""
+        if not self.verifier_chargement():
+            return
+        
+        clients = self.gestion.clients
+        if self.clients_affiches is not self.gestion.clients:
+            choix = messagebox.askyesnocancel(
+                "Exporter", f"Exporter uniquement les {len(self.vue.lignes)} client(s) affiché(s) ?\n"
+                            "(Non : exporter tous les clients)")
+            if choix is None:
+                return
+            if choix:
+                clients = self.vue.lignes
+        
+        chemin = filedialog.asksaveasfilename(
+            parent=self.root, title="Exporter les clients", defaultextension=".csv",
+            filetypes=[("Fichiers CSV", "*.csv"), ("JSON Lines", "*.jsonl")])
+        if not chemin:
+            return
+        format_export = "jsonl" if chemin.lower().endswith((".jsonl", ".json")) else "csv"
+        
+        # Copie figée prise ici : le thread exporte les clients tels qu'à cet instant, même modifiés entre-temps
+        copie = self.gestion.copie_figee(clients)
+        resultat = queue.Queue()
+        
+        def exporter():
+            debut = time.perf_counter()
+            try:
+                nb_lignes = self.gestion.exporter(chemin, copie, format_export)
+            except OSError as e:
+                resultat.put(e)
+            else:
+                resultat.put((nb_lignes, time.perf_counter() - debut))
+            finally:
+                self.gestion.liberer(copie)
+        
+        self.barre_etat.config(text=f"Export vers {os.path.basename(chemin)}...", fg="black")
+        threading.Thread(target=exporter, daemon=True).start()
+        self.root.after(100, self.suivre_export, resultat, chemin)
+    
+    def suivre_export(self, resultat, chemin):
+        """Affiche le bilan de l'export une fois terminé"""
+        try:
+            bilan = resultat.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self.suivre_export, resultat, chemin)
+            return
+        
+        if isinstance(bilan, Exception):
+            self.barre_etat.config(text=f"Échec de l'export: {str(bilan)}", fg="#c62828")
+            return
+        
+        nb_lignes, duree = bilan
+        debit = nb_lignes / duree if duree > 0 else nb_lignes
+        self.barre_etat.config(text=f"{nb_lignes} client(s) exporté(s) vers {os.path.basename(chemin)} "
+                                    f"en {duree:.2f} s ({debit:,.0f} lignes/s)", fg="#2e7d32")
+    
+    def statistiques_archive(self):
+        """Calcule en arrière-plan les statistiques d'un fichier de clients archivé"""
+        chemin = filedialog.askopenfilename(
+            parent=self.root, title="Statistiques d'une archive",
+            filetypes=[("Données BURIDA", "*.pkl"), ("Tous les fichiers", "*.*")])
+        if not chemin:
+            return
+        
+        resultat = queue.Queue()
+        
+        def calculer():
+            debut = time.perf_counter()
+            try:
+                resume = statistiques_instantane(chemin)
             except Exception as e:
-                messagebox.showerror("Erreur", f"Impossible de charger les données: {str(e)}")
-
-if __name__ == "__main__":
-    root = tk.Tk()
-    app = BuridaApp(root)
-    root.mainloop()
-       
+                resultat.put(e)
+            else:
+                resultat.put((resume, time.perf_counter() - debut))
         
-      .LEFT, padx=5)
+        self.barre_etat.config(text=f"Calcul des statistiques de {os.path.basename(chemin)}...", fg="black")
+        threading.Thread(target=calculer, daemon=True).start()
+        self.root.after(100, self.suivre_statistiques_archive, resultat, chemin)
+    
+    def suivre_statistiques_archive(self, resultat, chemin):
+        """Affiche les statistiques de l'archive une fois calculées"""
+        try:
+            bilan = resultat.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self.suivre_statistiques_archive, resultat, chemin)
+            return
         
-        # Frame pour la liste des tâches
-        tasks_frame = tk.Frame(main_frame, bg=self.bg_color)
-        tasks_frame.pack(fill=tk.BOTH, expand=True, pady=10)
+        if isinstance(bilan, Exception):
+            self.barre_etat.config(text=f"Échec du calcul des statistiques: {str(bilan)}", fg="#c62828")
+            return
         
-        # Créer un cadre avec scrollbar
-        task_scroll = tk.Scrollbar(tasks_frame)
-        task_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        resume, duree = bilan
+        self.barre_etat.config(text=f"Statistiques de {os.path.basename(chemin)} calculées en {duree:.2f} s", 
+                               fg="#2e7d32")
         
-        # Liste des tâches
-        self.task_listbox = tk.Listbox(
-            tasks_frame,
-            font=("Helvetica", 12),
-            selectbackground=self.accent_color,
-            selectmode=tk.SINGLE,
-            height=15,
-            width=50
-        )
-        self.task_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        fenetre = tk.Toplevel(self.root)
+        fenetre.title(f"Statistiques - {os.path.basename(chemin)}")
+        fenetre.geometry("600x400")
+        fenetre.configure(bg="#f0f0f0")
+        fenetre.transient(self.root)
         
-        # Configurer la scrollbar
-        task_scroll.config(command=self.task_listbox.yview)
-        self.task_listbox.config(yscrollcommand=task_scroll.set)
+        tk.Label(fenetre, text=f"{resume['total_clients']} client(s), {resume['total_montant']:,.2f} perçus, "
+                               f"{resume['clients_a_jour']} à jour, {resume['clients_retard']} en retard", 
+               font=("Arial", 12, "bold"), bg="#f0f0f0").pack(pady=10)
         
-        # Mettre à jour la liste des tâches
-        self.update_task_list()
+        colonnes_agent = ["agent", "nb_clients", "montant_total"]
+        tableau = ttk.Treeview(fenetre, columns=colonnes_agent, show="headings")
+        for col, largeur, titre in zip(colonnes_agent, [150, 100, 150], 
+                                     ["Agent", "Nombre de clients", "Montant total"]):
+            tableau.heading(col, text=titre)
+            tableau.column(col, width=largeur, anchor=tk.CENTER)
+        for agent, (nb_clients, montant_total) in sorted(resume["par_agent"].items()):
+            tableau.insert("", tk.END, values=(agent, nb_clients, f"{montant_total:,.2f}"))
+        tableau.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
-        # Frame pour les boutons d'action
-        button_frame = tk.Frame(main_frame, bg=self.bg_color)
-        button_frame.pack(fill=tk.X, pady=10)
+        retards = ", ".join(f"{libelle} : {nb_clients} ({arrieres:,.2f})" 
+                            for libelle, (nb_clients, arrieres) in resume["anciennete"].items())
+        tk.Label(fenetre, text=f"Retards (arriérés) : {retards}", bg="#f0f0f0").pack(pady=5)
         
-        # Boutons d'action
-        complete_button = tk.Button(
-            button_frame,
-            text="Marquer comme Terminé",
-            font=("Helvetica", 10),
-            bg="#5cb85c",
-            fg="white",
-            padx=10,
-            command=self.complete_task
-        )
-        complete_button.pack(side=tk.LEFT, padx=5)
-        
-        delete_button = tk.Button(
-            button_frame,
-            text="Supprimer Tâche",
-            font=("Helvetica", 10),
-            bg="#d9534f",
-            fg="white",
-            padx=10,
-            command=self.delete_task
-        )
-        delete_button.pack(side=tk.LEFT, padx=5)
-        
-        clear_button = tk.Button(
-            button_frame,
-            text="Effacer Tout",
-            font=("Helvetica", 10),
-            bg="#f0ad4e",
-            fg="white",
-            padx=10,
-            command=self.clear_all_tasks
-        )
-        clear_button.pack(side=tk.LEFT, padx=5)
-        
-    def add_task(self):
-        task = self.task_entry.get().strip()
-        if task:
-            self.tasks.append({"text": task, "completed": False})
-            self.update_task_list()
-            self.save_tasks()
-            self.task_entry.delete(0, tk.END)
+        tk.Button(fenetre, text="Fermer", command=fenetre.destroy, 
+                bg="#3498db", fg="white", width=10).pack(pady=10)
+    
+    def rechercher_doublons(self):
+        """Cherche en arrière-plan les clients saisis plusieurs fois"""
+        if not self.verifier_chargement():
+            return
+        
+        # Les champs comparés sont relevés ici : le thread ne lit pas les clients pendant qu'ils changent
+        fiches = list(map(fiche_client, self.gestion.clients))
+        resultat = queue.Queue()
+        
+        def chercher():
+            debut = time.perf_counter()
+            try:
+                groupes = detecter_doublons(fiches)
+            except Exception as e:
+                resultat.put(e)
+            else:
+                resultat.put((groupes, time.perf_counter() - debut))
+        
+        self.barre_etat.config(text=f"Recherche des doublons parmi {len(fiches)} client(s)...", fg="black")
+        threading.Thread(target=chercher, daemon=True).start()
+        self.root.after(100, self.suivre_doublons, resultat)
+    
+    def suivre_doublons(self, resultat):
+        """Ouvre la revue des doublons une fois la recherche terminée"""
+        try:
+            bilan = resultat.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self.suivre_doublons, resultat)
+            return
+        
+        if isinstance(bilan, Exception):
+            self.barre_etat.config(text=f"Échec de la recherche des doublons: {str(bilan)}", fg="#c62828")
+            return
+        
+        groupes, duree = bilan
+        self.barre_etat.config(text=f"{len(groupes)} groupe(s) de doublons trouvé(s) en {duree:.2f} s", 
+                               fg="#2e7d32")
+        if not groupes:
+            messagebox.showinfo("Doublons", "Aucun doublon probable.")
+            return
+        self.fenetre_doublons(groupes)
+    
+    def fenetre_doublons(self, groupes):
+        """Revue des groupes de doublons : le client sélectionné (ou le premier) garde les autres"""
+        fenetre = tk.Toplevel(self.root)
+        fenetre.title("Doublons probables")
+        fenetre.geometry("900x500")
+        fenetre.configure(bg="#f0f0f0")
+        fenetre.transient(self.root)
+        
+        tk.Label(fenetre, text=f"{len(groupes)} groupe(s) de clients probablement saisis plusieurs fois", 
+               font=("Arial", 12, "bold"), bg="#f0f0f0").pack(pady=10)
+        
+        colonnes_doublon = ["code", "etablissement", "nom", "contact", "localisation"]
+        frame_tableau = tk.Frame(fenetre)
+        frame_tableau.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        scrollbar = ttk.Scrollbar(frame_tableau, orient=tk.VERTICAL)
+        tableau = ttk.Treeview(frame_tableau, columns=colonnes_doublon, yscrollcommand=scrollbar.set)
+        scrollbar.configure(command=tableau.yview)
+        tableau.heading("#0", text="Groupe")
+        tableau.column("#0", width=140)
+        for col in colonnes_doublon:
+            tableau.heading(col, text=TITRES[col])
+            tableau.column(col, width=140)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tableau.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Groupe affiché -> codes de ses clients
+        codes_groupes = {}
+        for numero, (score, codes) in enumerate(groupes, 1):
+            groupe = tableau.insert("", tk.END, text=f"{numero} ({score:.0%})", open=True)
+            codes_groupes[groupe] = codes
+            for code in codes:
+                client = self.gestion.client(code)
+                if client is not None:
+                    tableau.insert(groupe, tk.END, iid=f"{groupe}:{code}",
+                                   values=[getattr(client, col) for col in colonnes_doublon])
+        
+        def groupe_selectionne():
+            selection = tableau.selection()
+            if not selection:
+                messagebox.showwarning("Attention", "Veuillez sélectionner un groupe ou le client à garder.", 
+                                       parent=fenetre)
+                return None, None
+            groupe, _, code = selection[0].partition(":")
+            return groupe, code or codes_groupes[groupe][0]
+        
+        def fusionner():
+            groupe, code = groupe_selectionne()
+            if groupe is None:
+                return
+            doublons = [autre for autre in codes_groupes[groupe] if autre != code]
+            if not messagebox.askyesno("Confirmation", f"Garder le client {code} et y fusionner "
+                                                       f"{', '.join(doublons)} ?", parent=fenetre):
+                return
+            try:
+                # Le tableau principal est mis à jour par les événements du moteur
+                self.executer(self.gestion.fusionner, code, doublons)
+            except ValueError as e:
+                messagebox.showwarning("Attention", str(e), parent=fenetre)
+                return
+            tableau.delete(groupe)
+            del codes_groupes[groupe]
+        
+        def ignorer():
+            groupe, code = groupe_selectionne()
+            if groupe is not None:
+                tableau.delete(groupe)
+                del codes_groupes[groupe]
+        
+        frame_boutons = tk.Frame(fenetre, bg="#f0f0f0")
+        frame_boutons.pack(pady=10)
+        tk.Button(frame_boutons, text="Fusionner", command=fusionner, 
+                bg="#4caf50", fg="white", width=10).pack(side=tk.LEFT, padx=5)
+        tk.Button(frame_boutons, text="Ignorer", command=ignorer, 
+                bg="#95a5a6", fg="white", width=10).pack(side=tk.LEFT, padx=5)
+        tk.Button(frame_boutons, text="Fermer", command=fenetre.destroy, 
+                bg="#3498db", fg="white", width=10).pack(side=tk.LEFT, padx=5)
+    
+    def executer(self, modification, *arguments):
+        """Applique une modification du moteur ; son enregistrement se fait en arrière-plan"""
+        try:
+            resultat = modification(*arguments)
+        except OSError as e:
+            self.barre_etat.config(text=f"Impossible d'enregistrer les données: {str(e)}", fg="#c62828")
+            return None
+        self.barre_etat.config(text="Enregistrement en cours...", fg="black")
+        return resultat
+    
+    def suivre_enregistrements(self):
+        """Affiche dans la barre d'état le compte rendu des écritures terminées"""
+        stockage = self.gestion.stockage
+        resultats = stockage.resultats_ecriture() if stockage.asynchrone else []
+        if resultats:
+            erreurs = [erreur for nb_operations, erreur in resultats if erreur is not None]
+            if erreurs:
+                self.barre_etat.config(text=f"Échec de l'enregistrement: {str(erreurs[-1])}", fg="#c62828")
+            elif stockage.file.empty():
+                nb_operations = sum(nb for nb, erreur in resultats)
+                heure = datetime.now().strftime("%H:%M:%S")
+                self.barre_etat.config(text=f"Données enregistrées à {heure} ({nb_operations} opération(s))", 
+                                       fg="#2e7d32")
+        
+        self.root.after(INTERVALLE_SUIVI_MS, self.suivre_enregistrements)
+    
+    def surveiller_fichier(self):
+        """Intègre les modifications enregistrées par les autres postes sur le même fichier"""
+        try:
+            appliquees, conflits = self.gestion.relire_journal()
+        except DonneesPerimees:
+            # Avertir une seule fois : la surveillance (et le passage des mois) continue
+            if not self.donnees_perimees:
+                self.donnees_perimees = True
+                messagebox.showwarning("Attention", "Les données ont été réorganisées par un autre poste pendant une "
+                                                    "longue absence de relecture. Redémarrez l'application pour voir "
+                                                    "leurs dernières modifications.")
+        except OSError as e:
+            self.barre_etat.config(text=f"Impossible de lire les modifications des autres postes: {str(e)}", 
+                                   fg="#c62828")
         else:
-            messagebox.showwarning("Attention", "Veuillez entrer une tâche.")
+            if appliquees:
+                heure = datetime.now().strftime("%H:%M:%S")
+                self.barre_etat.config(text=f"{appliquees} modification(s) d'un autre poste intégrée(s) à {heure}", 
+                                       fg="black")
+            if conflits:
+                codes = ", ".join(sorted(set(conflits)))
+                messagebox.showwarning("Conflit", f"Client(s) modifié(s) en même temps sur un autre poste : {codes}.\n"
+                                                  "La dernière modification enregistrée a été gardée.")
+        
+        # Le passage des jours fait passer des clients en retard sans aucune modification
+        if self.gestion.actualiser_echeances():
+            self.rechercher()
+            self.calculer_statistiques()
+        
+        self.root.after(INTERVALLE_SURVEILLANCE_MS, self.surveiller_fichier)
+    
+    def quitter(self):
+        """Écrit les opérations en attente avant de fermer l'application"""
+        self.barre_etat.config(text="Enregistrement des dernières modifications...", fg="black")
+        self.root.update_idletasks()
+        self.gestion.fermer()
+        
+        erreurs = [erreur for nb_operations, erreur in self.gestion.stockage.resultats_ecriture() if erreur is not None]
+        if erreurs:
+            messagebox.showerror("Erreur", f"Les dernières modifications n'ont pas pu être enregistrées: {str(erreurs[-1])}")
+        self.root.destroy()
     
-    def delete_task(self):
+    def charger_donnees(self):
+        """Ouvre les données et charge la première page de clients"""
         try:
-            index = self.task_listbox.curselection()[0]
-            self.tasks.pop(index)
-            self.update_task_list()
-            self.save_tasks()
-        except IndexError:
-            messagebox.showwarning("Attention", "Veuillez sélectionner une tâche à supprimer.")
-    
-    def complete_task(self):
+            self.pages_a_charger = self.gestion.ouvrir()
+        except Exception as e:
+            messagebox.showerror("Erreur", f"Impossible de charger les données: {str(e)}")
+    
+    def demarrer_chargement_pages(self):
+        """Lit les pages suivantes dans un thread et les intègre au fil de l'eau"""
+        self.file_pages = queue.Queue(maxsize=4)
+        threading.Thread(target=self.lire_pages, args=(self.pages_a_charger,), daemon=True).start()
+        self.root.after(0, self.integrer_pages)
+    
+    def lire_pages(self, pages):
+        """Désérialise les pages (thread de chargement)"""
         try:
-            index = self.task_listbox.curselection()[0]
-            self.tasks[index]["completed"] = not self.tasks[index]["completed"]
-            self.update_task_list()
-            self.save_tasks()
-        except IndexError:
-            messagebox.showwarning("Attention", "Veuillez sélectionner une tâche à marquer comme terminée.")
-    
-    def clear_all_tasks(self):
-        confirm = messagebox.askyesno("Confirmation", "Êtes-vous sûr de vouloir supprimer toutes les tâches?")
-        if confirm:
-            self.tasks = []
-            self.update_task_list()
-            self.save_tasks()
-    
-    def update_task_list(self):
-        self.task_listbox.delete(0, tk.END)
-        for task in self.tasks:
-            task_text = task["text"]
-            if task["completed"]:
-                task_text = "✓ " + task_text
-            else:
-                task_text = "○ " + task_text
-            self.task_listbox.insert(tk.END, task_text)
+            for page in pages:
+                self.file_pages.put(page)
+        except Exception as e:
+            self.file_pages.put(e)
+            return
+        self.file_pages.put(None)
     
-    def save_tasks(self):
-        with open("tasks.pickle", "wb") as file:
-            pickle.dump(self.tasks, file)
+    @profileur.instrumenter("interface.integrer_pages")
+    def integrer_pages(self):
+        """Intègre les pages lues en gardant la boucle Tk réactive"""
+        limite = time.perf_counter() + DUREE_INTEGRATION_S
+        while time.perf_counter() < limite:
+            try:
+                page = self.file_pages.get_nowait()
+            except queue.Empty:
+                break
+            
+            if page is None:
+                self.terminer_chargement()
+                return
+            if isinstance(page, Exception):
+                self.barre_etat.config(text="Chargement interrompu", fg="#c62828")
+                messagebox.showerror("Erreur", f"Impossible de charger les données: {str(page)}")
+                return
+            
+            self.gestion.integrer_page(page)
+        
+        # Un affichage trié garde l'ordre des clients déjà chargés jusqu'à la fin du chargement
+        if self.clients_affiches is self.gestion.clients and self.tri is None:
+            self.vue.actualiser()
+        self.calculer_statistiques()
+        self.barre_etat.config(text=f"Chargement des données... {len(self.gestion.clients)} clients", fg="black")
+        self.root.after(10, self.integrer_pages)
     
-    def load_tasks(self):
+    def terminer_chargement(self):
+        """Rejoue les journaux puis ouvre les données en écriture"""
         try:
-            with open("tasks.pickle", "rb") as file:
-                self.tasks = pickle.load(file)
-        except (FileNotFoundError, EOFError):
-            # Si le fichier n'existe pas ou est vide, on initialise une liste vide
-            self.tasks = []
+            self.gestion.terminer_chargement()
+        except Exception as e:
+            self.barre_etat.config(text="Chargement interrompu", fg="#c62828")
+            messagebox.showerror("Erreur", f"Impossible de charger les données: {str(e)}")
+            return
+        
+        self.pages_a_charger = None
+        self.root.after(INTERVALLE_SURVEILLANCE_MS, self.surveiller_fichier)
+        if self.recherche_var.get() or self.filtre:
+            self.rechercher()
+        elif self.tri is not None:
+            self.afficher_clients(self.gestion.clients, conserver_position=True)
+        else:
+            self.vue.actualiser()
+        self.calculer_statistiques()
+        
+        duree = time.perf_counter() - self.debut_chargement
+        self.barre_etat.config(text=f"{len(self.gestion.clients)} clients chargés en {duree:.2f} s "
+                                    f"(premières lignes en {self.temps_premiere_ligne * 1000:.0f} ms)", fg="black")
+        
+        if self.gestion.codes_renommes:
+            messagebox.showwarning("Attention", f"{self.gestion.codes_renommes} client(s) avaient un code déjà utilisé "
+                                                "par un autre client ; un suffixe (-2, -3...) a été ajouté à leur code.")
+    
+    def verifier_chargement(self):
+        """Les modifications attendent la fin du chargement (positions du journal)"""
+        if not self.gestion.charge:
+            messagebox.showwarning("Attention", "Veuillez patienter, le chargement des données n'est pas terminé.")
+            return False
+        return True
 
 if __name__ == "__main__":
     root = tk.Tk()
-    app = TaskManagerApp(root)
+    app = BuridaApp(root)
     root.mainloop()
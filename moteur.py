@@ -0,0 +1,2550 @@
+"""Moteur de gestion des clients BURIDA, indépendant de l'interface Tk
+
+Toute la logique métier (modèle, validation, recherche, statistiques,
+stockage, import et export) est accessible sans affichage au travers de
+GestionClients :
+
+    gestion = GestionClients("burida_clients.pkl")
+    gestion.charger()
+    gestion.ajouter({"code": "C001", "etablissement": "Maquis", "nom": "Yao", ...})
+    resultats = gestion.rechercher("yao")
+    print(gestion.resume_statistiques())
+    gestion.fermer()
+"""
+
+import pickle
+import io
+import os
+import array
+import csv
+import json
+import copy
+import glob
+import sys
+import random
+import hashlib
+import re
+import bisect
+import operator
+import itertools
+import functools
+import contextlib
+import collections
+import mmap
+import struct
+import threading
+import unicodedata
+import queue
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from profilage import profileur
+
+class ChargeurClients(pickle.Unpickler):
+    """Unpickler qui retrouve Client quel que soit le module d'origine
+    
+    Les fichiers écrits avant la séparation du moteur référencent
+    __main__.Client ou gestion.Client.
+    """
+    
+    def find_class(self, module, nom):
+        if nom == "Client" and module in ("__main__", "gestion"):
+            return Client
+        return super().find_class(module, nom)
+
+@profileur.instrumenter("pickle.load")
+def charger_pickle(fichier):
+    return ChargeurClients(fichier).load()
+
+def centimes(valeur):
+    """Convertit un montant (saisie texte ou nombre) en centimes entiers
+    
+    Accepte les espaces de séparation des milliers et la virgule décimale ;
+    une saisie vide vaut 0. Lève ValueError si la saisie n'est pas un montant.
+    """
+    texte = str(valeur).replace(" ", "").replace("\u00a0", "").replace(",", ".")
+    if not texte:
+        return 0
+    try:
+        return int((Decimal(texte) * 100).to_integral_value(ROUND_HALF_UP))
+    except (ArithmeticError, ValueError):
+        raise ValueError(f"montant invalide: {valeur!r}") from None
+
+def formater_montant(valeur):
+    """Formate un montant en centimes comme il serait saisi (5000 ou 5000.50)"""
+    signe = "-" if valeur < 0 else ""
+    unites, reste = divmod(abs(valeur), 100)
+    return f"{signe}{unites}.{reste:02d}" if reste else f"{signe}{unites}"
+
+def champ_montant(nom):
+    """Propriété exposant en texte un montant stocké en centimes dans nom_centimes"""
+    attribut = nom + "_centimes"
+    return property(lambda self: formater_montant(getattr(self, attribut)),
+                    lambda self, valeur: setattr(self, attribut, centimes(valeur)))
+
+def champ_interne(nom):
+    """Propriété texte dont la valeur est internée (valeurs très répétées)"""
+    attribut = "_" + nom
+    return property(lambda self: getattr(self, attribut),
+                    lambda self, valeur: setattr(self, attribut, sys.intern(valeur)))
+
+# Tirage des identifiants des clients (graine lue dans os.urandom)
+generateur_identifiants = random.Random()
+
+def identifiant_client(code=None):
+    """Identifiant d'un client, qui ne change pas avec son code
+    
+    Tiré au hasard à la création ; celui d'une fiche enregistrée avant les
+    identifiants est dérivé de son code, le même sur toutes les instances.
+    """
+    if code is None:
+        return generateur_identifiants.getrandbits(63)
+    return int.from_bytes(hashlib.blake2b(code.encode(), digest_size=8).digest(), "big") >> 1
+
+class Client:
+    """Fiche client compacte
+    
+    Les montants sont analysés une seule fois et stockés en centimes, la date
+    d'ajout en ordinal, et les champs très répétés sont internés. L'accès par
+    attribut (client.mensualite, client.date_ajout...) reste celui du texte saisi.
+    
+    montant_paye est le montant saisi sur la fiche ; paiements_centimes, le
+    total des paiements du grand livre, et debut_echeancier, la date du plus
+    ancien d'entre eux qui n'est pas contre-passé (0 sans paiement, voir
+    GrandLivre.debut), ne sont changés que par ceux-ci.
+    identifiant suit le client quand son code change (voir identifiant_client).
+    """
+    
+    __slots__ = ("code", "etablissement", "nom", "_localisation", "contact",
+                 "mensualite_centimes", "montant_paye_centimes", "_periode", "_agent",
+                 "observation", "date_ordinal", "paiements_centimes",
+                 "debut_echeancier", "identifiant", "rang")
+    
+    mensualite = champ_montant("mensualite")
+    montant_paye = champ_montant("montant_paye")
+    localisation = champ_interne("localisation")
+    periode = champ_interne("periode")
+    agent = champ_interne("agent")
+    
+    def __init__(self, code, etablissement, nom, localisation, contact, 
+                 mensualite, montant_paye, periode, agent, observation):
+        self.code = code
+        self.etablissement = etablissement
+        self.nom = nom
+        self.localisation = localisation
+        self.contact = contact
+        self.mensualite = mensualite
+        self.montant_paye = montant_paye
+        self.periode = periode
+        self.agent = agent
+        self.observation = observation
+        self.date_ordinal = date.today().toordinal()
+        self.paiements_centimes = 0
+        self.debut_echeancier = 0
+        self.identifiant = identifiant_client()
+        self.rang = None
+    
+    @property
+    def date_ajout(self):
+        return date.fromordinal(self.date_ordinal).strftime("%Y-%m-%d")
+    
+    @date_ajout.setter
+    def date_ajout(self, valeur):
+        self.date_ordinal = datetime.strptime(valeur, "%Y-%m-%d").toordinal()
+    
+    @property
+    def total_paye_centimes(self):
+        return self.montant_paye_centimes + self.paiements_centimes
+    
+    @property
+    def solde(self):
+        """Solde exigible au jour (payé moins mensualités échues), négatif en cas de retard"""
+        return formater_montant(solde_exigible(self, date.today().toordinal()))
+    
+    @property
+    def retard(self):
+        """Jours de retard de la plus ancienne mensualité impayée (vide si à jour)"""
+        jours = jours_retard(self, date.today().toordinal())
+        return f"{jours} j" if jours else ""
+    
+    def __getstate__(self):
+        return (self.code, self.etablissement, self.nom, self.localisation, self.contact,
+                self.mensualite_centimes, self.montant_paye_centimes, self.periode,
+                self.agent, self.observation, self.date_ordinal, self.paiements_centimes,
+                self.debut_echeancier, self.identifiant)
+    
+    def __setstate__(self, etat):
+        self.rang = None
+        self.paiements_centimes = 0
+        self.debut_echeancier = 0
+        # Fiche antérieure aux identifiants : GestionClients.inserer lui en donne un
+        self.identifiant = None
+        if isinstance(etat, dict):
+            # Fiche enregistrée par l'ancienne classe Client (attributs texte)
+            for champ in ("code", "etablissement", "nom", "localisation", "contact",
+                          "periode", "agent", "observation", "date_ajout"):
+                setattr(self, champ, etat[champ])
+            for champ in ("mensualite", "montant_paye"):
+                try:
+                    setattr(self, champ, etat[champ])
+                except ValueError:
+                    setattr(self, champ, 0)
+            return
+        
+        # Les fiches enregistrées avant le grand livre n'ont pas de total des paiements
+        (self.code, self.etablissement, self.nom, self.localisation, self.contact,
+         self.mensualite_centimes, self.montant_paye_centimes, self.periode,
+         self.agent, self.observation, self.date_ordinal, *paiements) = etat
+        if len(paiements) >= 2:
+            self.paiements_centimes, self.debut_echeancier = paiements[:2]
+            if len(paiements) == 3:
+                self.identifiant = paiements[2]
+        elif paiements and paiements[0]:
+            # Échéancier de la première version du grand livre, compté depuis l'ajout
+            self.paiements_centimes = paiements[0]
+            self.debut_echeancier = self.date_ordinal
+
+class ClientStore:
+    """Liste ordonnée des clients, qui attribue à chacun un rang d'insertion croissant
+    
+    Le code, unique, identifie durablement un client : par_code le retrouve
+    en temps constant, quelle que soit sa position dans la liste.
+    """
+    
+    def __init__(self, clients=()):
+        self.clients = []
+        self.par_code = {}
+        self.prochain_rang = 0
+        for client in clients:
+            self.append(client)
+    
+    def __len__(self):
+        return len(self.clients)
+    
+    def __iter__(self):
+        return iter(self.clients)
+    
+    def __getitem__(self, index):
+        return self.clients[index]
+    
+    def __setitem__(self, index, client):
+        # Le client remplaçant prend la place, donc le rang, de l'ancien
+        ancien = self.clients[index]
+        client.rang = ancien.rang
+        del self.par_code[ancien.code]
+        self.par_code[client.code] = client
+        self.clients[index] = client
+    
+    def __delitem__(self, index):
+        del self.par_code[self.clients[index].code]
+        del self.clients[index]
+    
+    def append(self, client):
+        client.rang = self.prochain_rang
+        self.prochain_rang += 1
+        self.par_code[client.code] = client
+        self.clients.append(client)
+    
+    def renommer(self, client, ancien_code):
+        """Prend en compte le changement de code d'un client"""
+        del self.par_code[ancien_code]
+        self.par_code[client.code] = client
+    
+    def position(self, client):
+        """Retourne la position actuelle d'un client (les rangs sont croissants dans la liste)"""
+        return bisect.bisect_left(self.clients, client.rang, key=RANG)
+
+RANG = operator.attrgetter("rang")
+
+def position_par_rang(clients, client):
+    """Position d'un client dans une séquence en ordre de rang (None s'il n'y figure pas)"""
+    index = bisect.bisect_left(clients, client.rang, key=RANG)
+    if index < len(clients) and clients[index] is client:
+        return index
+    return None
+
+def inserer_par_rang(clients, client):
+    """Insère un client dans une liste en ordre de rang"""
+    bisect.insort(clients, client, key=RANG)
+
+COLONNES = [
+    "code", "etablissement", "nom", "localisation", "contact", 
+    "mensualite", "montant_paye", "periode", "agent", "observation", "date_ajout"
+]
+
+TITRES = {
+    "code": "Code", "etablissement": "Établissement", "nom": "Nom", 
+    "localisation": "Localisation", "contact": "Contact", "mensualite": "Mensualité", 
+    "montant_paye": "Montant Payé", "periode": "Période", "agent": "Agent", 
+    "observation": "Observation", "date_ajout": "Date d'ajout", "solde": "Solde", "retard": "Retard"
+}
+
+CHAMPS_OBLIGATOIRES = ["code", "etablissement", "nom"]
+CHAMPS_MONTANT = ["mensualite", "montant_paye"]
+
+# Colonnes du tableau calculées depuis l'échéancier (ni saisies, ni importées, ni exportées)
+COLONNES_CALCULEES = ["solde", "retard"]
+COLONNES_TABLEAU = COLONNES + COLONNES_CALCULEES
+
+def valeurs_client(client):
+    """Retourne les valeurs d'un client dans l'ordre des colonnes du tableau"""
+    return tuple(getattr(client, col) for col in COLONNES_TABLEAU)
+
+def valider_valeurs(valeurs):
+    """Vérifie les valeurs saisies pour un client (ValueError avec le message à afficher)"""
+    for champ in CHAMPS_OBLIGATOIRES:
+        if not valeurs.get(champ, "").strip():
+            raise ValueError(f"Le champ {champ} est obligatoire.")
+    
+    for champ in CHAMPS_MONTANT:
+        try:
+            centimes(valeurs.get(champ, ""))
+        except ValueError:
+            raise ValueError(f"Le champ {champ} doit être un montant.") from None
+
+def creer_client(valeurs):
+    """Crée un client à partir de valeurs texte validées (date_ajout facultative)"""
+    client = Client(**{champ: valeurs.get(champ, "") for champ in COLONNES if champ != "date_ajout"})
+    if valeurs.get("date_ajout"):
+        try:
+            client.date_ajout = valeurs["date_ajout"]
+        except ValueError:
+            raise ValueError("Le champ date_ajout doit être une date AAAA-MM-JJ.") from None
+    return client
+
+# Nombre de lignes importées par lot (une écriture et un rafraîchissement par lot)
+TAILLE_LOT_IMPORT = 1000
+
+def normaliser_entete(texte):
+    """Normalise un nom de colonne : sans accents, casse ni séparateurs"""
+    texte = unicodedata.normalize("NFKD", texte).encode("ascii", "ignore").decode()
+    return "".join(c for c in texte.lower() if c.isalnum())
+
+def lire_csv(fichier_binaire):
+    """Parcourt un CSV ligne par ligne : (numéro de ligne, valeurs par champ)
+    
+    Les colonnes sont reconnues par leur nom de champ ou leur titre dans le
+    tableau ; le séparateur (virgule, point-virgule ou tabulation) est
+    déduit de la ligne d'en-tête.
+    """
+    def lignes():
+        for brute in fichier_binaire:
+            try:
+                yield brute.decode("utf-8")
+            except UnicodeDecodeError:
+                # Export Excel en encodage Windows
+                yield brute.decode("cp1252")
+    
+    lignes_texte = lignes()
+    entete = next(lignes_texte, "").lstrip("\ufeff")
+    separateur = max(",;\t", key=entete.count)
+    
+    correspondances = {}
+    for champ in COLONNES:
+        correspondances[normaliser_entete(champ)] = champ
+        correspondances[normaliser_entete(TITRES[champ])] = champ
+    
+    noms = next(csv.reader([entete], delimiter=separateur), [])
+    champs = [correspondances.get(normaliser_entete(nom)) for nom in noms]
+    manquants = [champ for champ in CHAMPS_OBLIGATOIRES if champ not in champs]
+    if manquants:
+        raise ValueError(f"Colonnes obligatoires absentes du fichier: {', '.join(manquants)}")
+    
+    lecteur = csv.reader(lignes_texte, delimiter=separateur)
+    for ligne in lecteur:
+        if not any(cellule.strip() for cellule in ligne):
+            continue
+        # line_num compte depuis la deuxième ligne (l'en-tête est lu à part)
+        yield lecteur.line_num + 1, {champ: cellule.strip() for champ, cellule in zip(champs, ligne) if champ}
+
+def importer_csv(chemin, taille_lot=TAILLE_LOT_IMPORT, arret=None, codes_existants=()):
+    """Lit un CSV de clients par lots
+    
+    Produit des tuples (clients valides du lot, rejets du lot, octets lus,
+    taille du fichier) ; un rejet est un couple (numéro de ligne, motif).
+    Les codes déjà présents dans codes_existants ou plus haut dans le
+    fichier sont rejetés.
+    """
+    taille = os.path.getsize(chemin)
+    codes_lus = set()
+    with open(chemin, 'rb') as fichier:
+        lot = []
+        rejets = []
+        for numero, valeurs in lire_csv(fichier):
+            if arret is not None and arret.is_set():
+                break
+            
+            try:
+                valider_valeurs(valeurs)
+                if valeurs["code"] in codes_existants or valeurs["code"] in codes_lus:
+                    raise ValueError(f"Le code {valeurs['code']} est déjà utilisé.")
+                client = creer_client(valeurs)
+            except ValueError as e:
+                rejets.append((numero, str(e)))
+                continue
+            
+            codes_lus.add(client.code)
+            lot.append(client)
+            if len(lot) >= taille_lot:
+                yield lot, rejets, fichier.tell(), taille
+                lot = []
+                rejets = []
+        
+        yield lot, rejets, taille, taille
+
+def enregistrements(clients):
+    """Parcourt les clients sous forme de dictionnaires champ -> valeur texte"""
+    for client in clients:
+        yield {champ: getattr(client, champ) for champ in COLONNES}
+
+def exporter_clients(chemin, clients, format_export="csv"):
+    """Écrit les clients au fil de l'eau en CSV ou JSON Lines, retourne le nombre de lignes"""
+    nb_lignes = 0
+    if format_export == "jsonl":
+        with open(chemin, 'w', encoding="utf-8") as fichier:
+            for enregistrement in enregistrements(clients):
+                fichier.write(json.dumps(enregistrement, ensure_ascii=False) + "\n")
+                nb_lignes += 1
+    else:
+        # BOM pour qu'Excel reconnaisse l'UTF-8
+        with open(chemin, 'w', encoding="utf-8-sig", newline="") as fichier:
+            ecrivain = csv.DictWriter(fichier, fieldnames=COLONNES)
+            ecrivain.writeheader()
+            for enregistrement in enregistrements(clients):
+                ecrivain.writerow(enregistrement)
+                nb_lignes += 1
+    return nb_lignes
+
+# Champs couverts par la recherche libre
+CHAMPS_RECHERCHE = ["code", "etablissement", "nom", "localisation", "contact", "agent"]
+
+class IndexRecherche:
+    """Index inversé de trigrammes sur les champs de recherche des clients"""
+    
+    N = 3
+    
+    def __init__(self):
+        self.ngrammes = {}  # n-gramme -> ensemble de rangs
+        self.clients = {}  # rang (attribué par ClientStore) -> client
+        self.textes = {}  # rang -> champs de recherche en minuscules
+        
+        # Résultats de la dernière recherche, réutilisés quand la saisie s'allonge
+        self.derniere_recherche = ""
+        self.derniers_rangs = None
+    
+    @classmethod
+    def decouper(cls, textes):
+        """Retourne l'ensemble des n-grammes d'une liste de textes"""
+        return {texte[i:i + cls.N] for texte in textes for i in range(len(texte) - cls.N + 1)}
+    
+    def reconstruire(self, clients):
+        """Reconstruit l'index complet"""
+        self.ngrammes.clear()
+        self.clients.clear()
+        self.textes.clear()
+        for client in clients:
+            self.ajouter(client)
+    
+    def ajouter(self, client):
+        """Indexe un nouveau client"""
+        self.clients[client.rang] = client
+        self.indexer(client.rang, client)
+    
+    def retirer(self, client):
+        """Retire un client de l'index"""
+        del self.clients[client.rang]
+        self.desindexer(client.rang)
+    
+    def mettre_a_jour(self, client):
+        """Réindexe un client dont les champs ont été modifiés"""
+        self.desindexer(client.rang)
+        self.indexer(client.rang, client)
+    
+    def indexer(self, rang, client):
+        textes = tuple(getattr(client, champ).lower() for champ in CHAMPS_RECHERCHE)
+        self.textes[rang] = textes
+        for ngramme in self.decouper(textes):
+            self.ngrammes.setdefault(ngramme, set()).add(rang)
+        self.derniers_rangs = None
+    
+    def desindexer(self, rang):
+        for ngramme in self.decouper(self.textes.pop(rang)):
+            rangs = self.ngrammes[ngramme]
+            rangs.discard(rang)
+            if not rangs:
+                del self.ngrammes[ngramme]
+        self.derniers_rangs = None
+    
+    def rechercher(self, recherche):
+        """Retourne les clients dont un champ contient la recherche, dans l'ordre d'insertion"""
+        return [self.clients[rang] for rang in sorted(self.rangs(recherche))]
+    
+    def rangs(self, recherche):
+        """Retourne l'ensemble des rangs des clients dont un champ contient la recherche"""
+        recherche = recherche.lower()
+        
+        if self.derniers_rangs is not None and self.derniere_recherche and self.derniere_recherche in recherche:
+            # La saisie prolonge la précédente : seuls ses résultats peuvent correspondre
+            candidats = self.derniers_rangs
+        elif len(recherche) >= self.N:
+            listes = []
+            for ngramme in self.decouper((recherche,)):
+                rangs = self.ngrammes.get(ngramme)
+                if not rangs:
+                    listes = [set()]
+                    break
+                listes.append(rangs)
+            listes.sort(key=len)
+            candidats = listes[0].intersection(*listes[1:])
+        else:
+            candidats = self.textes.keys()
+        
+        # Les trigrammes ne garantissent pas une sous-chaîne contiguë dans un même champ
+        textes = self.textes
+        rangs = {rang for rang in candidats if any(recherche in texte for texte in textes[rang])}
+        
+        self.derniere_recherche = recherche
+        self.derniers_rangs = rangs
+        return rangs
+
+@functools.lru_cache(maxsize=4096)
+def mois_ordinal(ordinal):
+    """Mois (AAAA-MM) d'une date ordinale"""
+    return date.fromordinal(ordinal).strftime("%Y-%m")
+
+@functools.lru_cache(maxsize=4096)
+def indice_mois(ordinal):
+    """Numéro de mois (année * 12 + mois - 1) d'une date ordinale"""
+    jour = date.fromordinal(ordinal)
+    return jour.year * 12 + jour.month - 1
+
+@functools.lru_cache(maxsize=4096)
+def fin_mois(indice):
+    """Date ordinale du dernier jour d'un mois numéroté par indice_mois"""
+    return date((indice + 1) // 12, (indice + 1) % 12 + 1, 1).toordinal() - 1
+
+# Échéancier des clients qui ont des paiements au grand livre : une mensualité par mois à partir
+# du mois du plus ancien paiement, payable d'avance (due au dernier jour du mois précédent). Le
+# total payé couvre les mensualités dans l'ordre, la plus ancienne d'abord. Les autres clients
+# gardent la règle de la fiche : à jour si le montant payé atteint la mensualité.
+
+# Mensualités d'avance prises en compte (au-delà, l'échéance ne recule plus)
+MAX_MENSUALITES_COUVERTES = 1200
+
+# Tranches d'ancienneté des retards : (jours de retard maximum, libellé), la dernière sans limite
+TRANCHES_RETARD = [(30, "1-30 j"), (60, "31-60 j"), (90, "61-90 j"), (None, "90+ j")]
+
+def echeancier(client):
+    """Retourne (échéance impayée, mensualité due par mois, base) d'un client
+    
+    L'échéance est la date ordinale à laquelle la plus ancienne mensualité
+    impayée était due (None si le client ne doit rien) ; le solde exigible
+    au mois numéroté n (indice_mois) vaut base - mensualité due * n. Calculé
+    depuis les totaux tenus sur la fiche, sans relire les paiements.
+    """
+    mensualite = client.mensualite_centimes
+    total = client.total_paye_centimes
+    if not client.debut_echeancier:
+        # Règle de la fiche : la mensualité est due dès l'ajout, le solde ne varie pas avec le temps
+        echeance = client.date_ordinal - 1 if total < mensualite else None
+        return echeance, 0, total - mensualite
+    debut = indice_mois(client.debut_echeancier)
+    if mensualite <= 0:
+        return None, 0, total
+    couvertes = min(max(0, total) // mensualite, MAX_MENSUALITES_COUVERTES)
+    return fin_mois(debut + couvertes - 1), mensualite, total + mensualite * (debut - 1)
+
+def echeance_impayee(client):
+    """Date ordinale d'échéance de la plus ancienne mensualité impayée (None si le client ne doit rien)"""
+    return echeancier(client)[0]
+
+def jours_retard(client, jour):
+    """Jours de retard au jour donné (0 si le client est à jour)"""
+    echeance = echeance_impayee(client)
+    return 0 if echeance is None or echeance >= jour else jour - echeance
+
+def solde_exigible(client, jour):
+    """Total payé moins les mensualités dues au jour donné, en centimes"""
+    echeance, mensualite, base = echeancier(client)
+    return base - mensualite * indice_mois(jour)
+
+def tranche_retard(jours):
+    """Rang dans TRANCHES_RETARD d'un retard en jours (strictement positif)"""
+    for rang, (limite, libelle) in enumerate(TRANCHES_RETARD):
+        if limite is None or jours <= limite:
+            return rang
+
+# Axes des tendances : champ des cumuls de AgregatsStatistiques
+AXES_TENDANCE = {"periode": "par_periode", "mois": "par_mois"}
+
+def serie_tendance(cumuls, agent=None, nombre=24):
+    """Retourne les nombre dernières entrées d'un cumul, dans l'ordre chronologique
+    
+    cumuls associe (période ou mois, agent) à [nombre de clients, montant payé
+    en centimes, clients en retard] ; sans agent, les agents sont additionnés.
+    Chaque entrée est un tuple (période ou mois, clients, montant, retards).
+    """
+    totaux = {}
+    for (cle, agent_cumul), (nb_clients, montant, retards) in cumuls.items():
+        if agent is not None and agent_cumul != agent:
+            continue
+        total = totaux.setdefault(cle, [0, 0, 0])
+        total[0] += nb_clients
+        total[1] += montant
+        total[2] += retards
+    cles = sorted(totaux, key=cle_naturelle)
+    if nombre:
+        cles = cles[-nombre:]
+    return [(cle, *totaux[cle]) for cle in cles]
+
+class AgregatsStatistiques:
+    """Totaux statistiques maintenus par deltas à chaque ajout, modification ou suppression
+    
+    Les montants sont tenus en centimes entiers pour que les deltas successifs
+    ne cumulent pas d'erreurs d'arrondi. Les cumuls par (période, agent) et
+    par (mois d'ajout, agent) alimentent les tendances sans parcourir les clients.
+    
+    La situation (à jour ou en retard) est évaluée au jour de référence
+    self.jour, avancé chaque jour (voir GestionClients.actualiser_echeances).
+    Les clients sont aussi comptés par échéance impayée, ce qui donne
+    l'ancienneté des retards à n'importe quel jour.
+    """
+    
+    def __init__(self, jour=None):
+        self.jour = date.today().toordinal() if jour is None else jour
+        self.total_clients = 0
+        self.total_montant = 0
+        self.clients_a_jour = 0
+        self.par_agent = {}  # agent -> [nombre de clients, montant total]
+        self.par_periode = {}  # (période, agent) -> [nombre de clients, montant total, clients en retard]
+        self.par_mois = {}  # (mois d'ajout, agent) -> [nombre de clients, montant total, clients en retard]
+        # échéance impayée -> [nombre de clients, somme des mensualités dues, somme des bases (voir echeancier)]
+        self.par_echeance = {}
+        # client -> (agent, montant payé, à jour, période, mois d'ajout, échéance, mensualité due, base)
+        self.contributions = {}
+        self.agents_modifies = set()
+        self.version_cumuls = 0
+    
+    @property
+    def clients_retard(self):
+        return self.total_clients - self.clients_a_jour
+    
+    def contribution(self, client):
+        """Part d'un client dans les totaux"""
+        echeance, mensualite, base = echeancier(client)
+        return (client.agent, client.total_paye_centimes, echeance is None or echeance >= self.jour,
+                client.periode, mois_ordinal(client.date_ordinal), echeance, mensualite, base)
+    
+    def reconstruire(self, clients, jour=None):
+        """Recalcule tous les totaux (au jour donné, par défaut le jour de référence actuel)"""
+        if jour is not None:
+            self.jour = jour
+        self.total_clients = 0
+        self.total_montant = 0
+        self.clients_a_jour = 0
+        self.agents_modifies.update(self.par_agent)
+        self.par_agent.clear()
+        self.par_periode.clear()
+        self.par_mois.clear()
+        self.par_echeance.clear()
+        self.contributions.clear()
+        for client in clients:
+            self.ajouter(client)
+    
+    def ajouter(self, client):
+        contribution = self.contribution(client)
+        self.contributions[client] = contribution
+        self.appliquer(contribution, 1)
+    
+    def retirer(self, client):
+        self.appliquer(self.contributions.pop(client), -1)
+    
+    def mettre_a_jour(self, client):
+        """Remplace l'ancienne contribution d'un client modifié par la nouvelle"""
+        self.retirer(client)
+        self.ajouter(client)
+    
+    def appliquer(self, contribution, signe):
+        agent, montant, a_jour, periode, mois, echeance, mensualite, base = contribution
+        self.total_clients += signe
+        self.total_montant += signe * montant
+        self.clients_a_jour += signe * a_jour
+        
+        stats_agent = self.par_agent.setdefault(agent, [0, 0])
+        stats_agent[0] += signe
+        stats_agent[1] += signe * montant
+        if not stats_agent[0]:
+            del self.par_agent[agent]
+        self.agents_modifies.add(agent)
+        
+        for cumuls, cle in ((self.par_periode, (periode, agent)), (self.par_mois, (mois, agent))):
+            cumul = cumuls.setdefault(cle, [0, 0, 0])
+            cumul[0] += signe
+            cumul[1] += signe * montant
+            cumul[2] += signe * (not a_jour)
+            if not cumul[0]:
+                del cumuls[cle]
+        self.version_cumuls += 1
+        
+        if echeance is not None:
+            cumul = self.par_echeance.setdefault(echeance, [0, 0, 0])
+            cumul[0] += signe
+            cumul[1] += signe * mensualite
+            cumul[2] += signe * base
+            if not cumul[0]:
+                del self.par_echeance[echeance]
+    
+    def extraire_agents_modifies(self):
+        """Retourne et oublie les agents touchés depuis le dernier appel"""
+        agents = self.agents_modifies
+        self.agents_modifies = set()
+        return agents
+    
+    def tendance(self, axe, agent=None, nombre=24):
+        """Série chronologique d'un axe ("periode" ou "mois"), voir serie_tendance"""
+        return serie_tendance(getattr(self, AXES_TENDANCE[axe]), agent, nombre)
+    
+    def anciennete(self, jour=None):
+        """Clients en retard et arriérés (centimes) par tranche de TRANCHES_RETARD, au jour donné (aujourd'hui par défaut)
+        
+        Retourne une liste [clients, arriérés] par tranche. Les arriérés d'un
+        client sont l'opposé de son solde exigible ; sommés par échéance, ils
+        se déduisent des sommes tenues sans parcourir les clients.
+        """
+        jour = date.today().toordinal() if jour is None else jour
+        mois = indice_mois(jour)
+        tranches = [[0, 0] for tranche in TRANCHES_RETARD]
+        for echeance, (nb_clients, mensualites, bases) in self.par_echeance.items():
+            if echeance < jour:
+                tranche = tranches[tranche_retard(jour - echeance)]
+                tranche[0] += nb_clients
+                tranche[1] += mois * mensualites - bases
+        return tranches
+    
+    def cumuls(self):
+        """Copie des cumuls par axe, enregistrée avec l'instantané"""
+        return {axe: {cle: tuple(cumul) for cle, cumul in getattr(self, champ).items()}
+                for axe, champ in AXES_TENDANCE.items()}
+
+def resume_agregats(total_clients, total_montant, clients_a_jour, par_agent, anciennete):
+    """Statistiques générales, par agent et par ancienneté de retard, montants convertis des centimes en unités"""
+    return {
+        "total_clients": total_clients,
+        "total_montant": total_montant / 100,
+        "clients_a_jour": clients_a_jour,
+        "clients_retard": total_clients - clients_a_jour,
+        "par_agent": {agent: (nb_clients, montant / 100)
+                      for agent, (nb_clients, montant) in par_agent.items()},
+        "anciennete": {libelle: (nb_clients, arrieres / 100)
+                       for (limite, libelle), (nb_clients, arrieres) in zip(TRANCHES_RETARD, anciennete)}
+    }
+
+# Clés de tri des colonnes numériques (les autres colonnes sont triées comme du texte)
+CLES_TRI = {
+    "mensualite": operator.attrgetter("mensualite_centimes"),
+    "montant_paye": operator.attrgetter("montant_paye_centimes"),
+    "date_ajout": operator.attrgetter("date_ordinal"),
+    # Échéance impayée la plus récente d'abord : du moins en retard au plus en retard
+    "retard": lambda client: -(echeance_impayee(client) or date.max.toordinal())
+}
+
+def cle_naturelle(texte):
+    """Clé de tri d'un texte sans accents ni casse, les nombres comparés par valeur (C2 avant C10)"""
+    texte = unicodedata.normalize("NFKD", texte).encode("ascii", "ignore").decode().lower()
+    morceaux = re.split(r"(\d+)", texte)
+    morceaux[1::2] = map(int, morceaux[1::2])
+    return tuple(morceaux)
+
+# Clés de tri évaluées à un jour de référence : fonction (client, jour) -> clé
+CLES_TRI_DATEES = {"solde": solde_exigible}
+
+def fonction_cle_tri(colonne, jour=None):
+    """Retourne la fonction client -> clé de tri d'une colonne (au jour donné, aujourd'hui par défaut)"""
+    if colonne in CLES_TRI_DATEES:
+        cle_datee = CLES_TRI_DATEES[colonne]
+        jour = date.today().toordinal() if jour is None else jour
+        return lambda client: cle_datee(client, jour)
+    if colonne in CLES_TRI:
+        return CLES_TRI[colonne]
+    lire = operator.attrgetter(colonne)
+    return lambda client: cle_naturelle(lire(client))
+
+class VueTriee:
+    """Séquence des clients d'une liste d'entrées triées, à l'endroit ou à l'envers, sans copie"""
+    
+    def __init__(self, entrees, decroissant=False, cle=None):
+        self.entrees = entrees
+        self.decroissant = decroissant
+        self.cle = cle  # Fonction clé du tri, pour retrouver un client par dichotomie
+    
+    def __len__(self):
+        return len(self.entrees)
+    
+    def __getitem__(self, index):
+        if self.decroissant:
+            index = len(self.entrees) - 1 - index
+        return self.entrees[index][2]
+    
+    def __iter__(self):
+        entrees = reversed(self.entrees) if self.decroissant else self.entrees
+        return (entree[2] for entree in entrees)
+    
+    def index_entree(self, client, ancien=None):
+        # ancien : copie du client avant modification, dont la clé situe encore l'entrée
+        index = bisect.bisect_left(self.entrees, (self.cle(ancien or client), client.rang))
+        if index < len(self.entrees) and self.entrees[index][2] is client:
+            return index
+        return None
+    
+    def position(self, client):
+        """Position d'un client dans la vue (None s'il n'y figure pas)"""
+        index = self.index_entree(client)
+        if index is not None and self.decroissant:
+            return len(self.entrees) - 1 - index
+        return index
+    
+    def inserer(self, client):
+        bisect.insort(self.entrees, (self.cle(client), client.rang, client))
+    
+    def retirer(self, client, ancien=None):
+        index = self.index_entree(client, ancien)
+        if index is not None:
+            del self.entrees[index]
+
+class OrdresTri:
+    """Ordres de tri des clients par colonne, calculés à la première demande puis tenus à jour
+    
+    Chaque ordre est une liste triée d'entrées (clé, rang, client) : le rang
+    départage les égalités, si bien qu'un client se retrouve par dichotomie
+    et que deux clients ne sont jamais comparés. Les listes sont modifiées
+    sur place pour que les VueTriee déjà affichées restent à jour.
+    
+    Les clés datées (CLES_TRI_DATEES) sont évaluées au jour de référence
+    self.jour, et non au jour courant : la clé d'un client ne change qu'avec
+    ses champs. Les ordres sont remplacés quand le mois change (voir
+    GestionClients.actualiser_echeances).
+    """
+    
+    # Taille de lot au-delà de laquelle le lot est trié à part puis fusionné
+    SEUIL_FUSION = 32
+    
+    def __init__(self, jour=None):
+        self.jour = date.today().toordinal() if jour is None else jour
+        self.ordres = {}  # colonne -> liste triée d'entrées
+        self.cles = {}  # colonne -> fonction clé
+    
+    def fonction_cle(self, colonne):
+        """Fonction clé d'une colonne, au jour de référence"""
+        cle = self.cles.get(colonne)
+        if cle is None:
+            cle = self.cles[colonne] = fonction_cle_tri(colonne, self.jour)
+        return cle
+    
+    def entrees(self, colonne, clients):
+        """Retourne l'ordre d'une colonne, trié à la première demande seulement"""
+        ordre = self.ordres.get(colonne)
+        if ordre is None:
+            cle = self.fonction_cle(colonne)
+            ordre = self.ordres[colonne] = sorted((cle(client), client.rang, client) for client in clients)
+        return ordre
+    
+    def invalider(self):
+        """Oublie les ordres calculés (chargement en cours)"""
+        self.ordres.clear()
+    
+    def ajouter(self, client):
+        for colonne, ordre in self.ordres.items():
+            bisect.insort(ordre, (self.cles[colonne](client), client.rang, client))
+    
+    def ajouter_lot(self, clients):
+        if len(clients) <= self.SEUIL_FUSION:
+            for client in clients:
+                self.ajouter(client)
+            return
+    
+        for colonne, ordre in self.ordres.items():
+            cle = self.cles[colonne]
+            # Deux suites déjà triées : le tri de Python les fusionne en temps linéaire
+            ordre.extend(sorted((cle(client), client.rang, client) for client in clients))
+            ordre.sort()
+    
+    def retirer(self, client):
+        """Retire un client ; à appeler avant de modifier ses champs"""
+        for colonne, ordre in self.ordres.items():
+            index = bisect.bisect_left(ordre, (self.cles[colonne](client), client.rang))
+            if index == len(ordre) or ordre[index][2] is not client:
+                # Clé changée sans passer par mettre_a_jour : l'entrée est cherchée une à une
+                index = next(index for index, entree in enumerate(ordre) if entree[2] is client)
+            del ordre[index]
+
+# Champs filtrés par valeur exacte (index de hachage) et par intervalle (ordres de tri)
+CHAMPS_FILTRE_EXACT = ["agent", "localisation", "periode"]
+CHAMPS_FILTRE_INTERVALLE = ["mensualite", "montant_paye", "date_ajout"]
+
+def en_retard(client, jour):
+    # Pendant de AgregatsStatistiques.contribution : une mensualité échue au jour donné n'est pas couverte
+    echeance = echeance_impayee(client)
+    return echeance is not None and echeance < jour
+
+def analyser_filtre(valeurs):
+    """Convertit les critères saisis en texte en critères de filtre (les critères vides sont ignorés)
+    
+    Les bornes d'intervalle sont lues dans champ_min et champ_max, la situation
+    dans en_retard (True, False ou None). Lève ValueError avec le message à
+    afficher si un montant ou une date est invalide.
+    """
+    criteres = {}
+    for champ in CHAMPS_FILTRE_EXACT:
+        valeur = valeurs.get(champ, "").strip()
+        if valeur:
+            criteres[champ] = valeur
+    
+    for champ in CHAMPS_FILTRE_INTERVALLE:
+        for borne in (f"{champ}_min", f"{champ}_max"):
+            texte = valeurs.get(borne, "").strip()
+            if not texte:
+                continue
+            if champ == "date_ajout":
+                try:
+                    criteres[borne] = datetime.strptime(texte, "%Y-%m-%d").toordinal()
+                except ValueError:
+                    raise ValueError("Les dates du filtre doivent être au format AAAA-MM-JJ.") from None
+            else:
+                try:
+                    criteres[borne] = centimes(texte)
+                except ValueError:
+                    raise ValueError(f"Les bornes du filtre {champ} doivent être des montants.") from None
+    
+    if valeurs.get("en_retard") is not None:
+        criteres["en_retard"] = bool(valeurs["en_retard"])
+    return criteres
+
+class IndexFiltres:
+    """Index secondaires du filtre multicritère
+    
+    Index de hachage valeur -> rangs sur les champs à valeur exacte et
+    ensemble des clients en retard au jour de référence self.jour, tenus à
+    jour à chaque modification ; les intervalles (montants, date d'ajout)
+    s'appuient sur les ordres de tri.
+    """
+    
+    def __init__(self, jour=None):
+        self.jour = date.today().toordinal() if jour is None else jour
+        self.valeurs = {champ: {} for champ in CHAMPS_FILTRE_EXACT}  # champ -> valeur -> rangs
+        self.en_retard = set()
+    
+    def ajouter(self, client):
+        for champ, index in self.valeurs.items():
+            index.setdefault(getattr(client, champ), set()).add(client.rang)
+        if en_retard(client, self.jour):
+            self.en_retard.add(client.rang)
+    
+    def retirer(self, client):
+        """Retire un client ; à appeler avant de modifier ses champs"""
+        for champ, index in self.valeurs.items():
+            valeur = getattr(client, champ)
+            rangs = index[valeur]
+            rangs.discard(client.rang)
+            if not rangs:
+                del index[valeur]
+        self.en_retard.discard(client.rang)
+    
+    def verifier(self, client, criteres):
+        """Indique si un client satisfait tous les critères"""
+        for champ in CHAMPS_FILTRE_EXACT:
+            if champ in criteres and getattr(client, champ) != criteres[champ]:
+                return False
+        for champ in CHAMPS_FILTRE_INTERVALLE:
+            valeur = CLES_TRI[champ](client)
+            if criteres.get(f"{champ}_min", valeur) > valeur or criteres.get(f"{champ}_max", valeur) < valeur:
+                return False
+        return "en_retard" not in criteres or en_retard(client, self.jour) == criteres["en_retard"]
+    
+    def rangs(self, criteres, ordres_tri, clients, par_rang):
+        """Retourne l'ensemble des rangs des clients qui satisfont tous les critères
+    
+        Chaque critère dénombre ses clients sans les parcourir : seuls les
+        clients du critère le plus sélectif sont parcourus, puis vérifiés
+        contre les autres critères.
+        """
+        selections = []  # (nombre de clients, rangs, vérification d'un client)
+    
+        for champ in CHAMPS_FILTRE_EXACT:
+            if champ in criteres:
+                valeur = criteres[champ]
+                rangs = self.valeurs[champ].get(valeur, ())
+                selections.append((len(rangs), rangs,
+                                   lambda client, champ=champ, valeur=valeur: getattr(client, champ) == valeur))
+    
+        for champ in CHAMPS_FILTRE_INTERVALLE:
+            mini = criteres.get(f"{champ}_min")
+            maxi = criteres.get(f"{champ}_max")
+            if mini is None and maxi is None:
+                continue
+    
+            # Bornes trouvées par dichotomie dans l'ordre de tri de la colonne (clés entières)
+            ordre = ordres_tri.entrees(champ, clients)
+            debut = 0 if mini is None else bisect.bisect_left(ordre, (mini,))
+            fin = len(ordre) if maxi is None else bisect.bisect_left(ordre, (maxi + 1,))
+            rangs = map(operator.itemgetter(1), itertools.islice(ordre, debut, fin))
+    
+            cle = CLES_TRI[champ]
+            bas = float("-inf") if mini is None else mini
+            haut = float("inf") if maxi is None else maxi
+            selections.append((max(0, fin - debut), rangs,
+                               lambda client, cle=cle, bas=bas, haut=haut: bas <= cle(client) <= haut))
+    
+        if "en_retard" in criteres:
+            situation = criteres["en_retard"]
+            if situation:
+                rangs = self.en_retard
+                nombre = len(rangs)
+            else:
+                rangs = (rang for rang in par_rang if rang not in self.en_retard)
+                nombre = len(par_rang) - len(self.en_retard)
+            selections.append((nombre, rangs, lambda client: en_retard(client, self.jour) == situation))
+    
+        if not selections:
+            return set(par_rang)
+    
+        selections.sort(key=lambda selection: selection[0])
+        verifications = [verification for nombre, rangs, verification in selections[1:]]
+        return {rang for rang in selections[0][1]
+                if all(verification(par_rang[rang]) for verification in verifications)}
+
+class GrandLivre:
+    """Paiements des clients par code, en ajout seulement
+    
+    Les paiements d'un code sont rangés à la suite dans un tableau d'entiers
+    (date ordinale, montant en centimes), 16 octets chacun. Un paiement n'est
+    jamais modifié ni retiré : on l'annule par une contre-passation (montant
+    opposé). Les lignes d'un client supprimé partent avec lui (l'historique
+    les garde pour l'annulation), si bien qu'un client qui reprend son code
+    part d'un grand livre vide. Le total par client est tenu sur la fiche
+    (Client.paiements_centimes).
+    """
+    
+    def __init__(self, etat=None):
+        self.paiements = {}  # code -> array("q") date, montant, date, montant...
+        for code, octets in (etat or {}).items():
+            lignes = self.paiements[code] = array.array("q")
+            lignes.frombytes(octets)
+    
+    def __len__(self):
+        return sum(len(lignes) for lignes in self.paiements.values()) // 2
+    
+    def ajouter(self, code, ordinal, montant):
+        lignes = self.paiements.get(code)
+        if lignes is None:
+            lignes = self.paiements[code] = array.array("q")
+        lignes.append(ordinal)
+        lignes.append(montant)
+    
+    def lignes(self, code):
+        """Paiements d'un code dans l'ordre d'enregistrement : liste de (date ordinale, montant en centimes)"""
+        lignes = self.paiements.get(code, ())
+        return list(zip(lignes[0::2], lignes[1::2]))
+    
+    def debut(self, code):
+        """Plus ancienne date où les paiements d'un code, contre-passations déduites, sont positifs (0 sinon)"""
+        nets = collections.defaultdict(int)
+        lignes = self.paiements.get(code, ())
+        for ordinal, montant in zip(lignes[0::2], lignes[1::2]):
+            nets[ordinal] += montant
+        return min((ordinal for ordinal, net in nets.items() if net > 0), default=0)
+    
+    def octets(self, code):
+        """Lignes d'un code en octets (vide sans paiement), pour les retrouver avec restaurer"""
+        lignes = self.paiements.get(code)
+        return b"" if lignes is None else lignes.tobytes()
+    
+    def restaurer(self, code, octets):
+        """Remplace les lignes d'un code par celles lues avec octets"""
+        self.paiements.pop(code, None)
+        if octets:
+            lignes = self.paiements[code] = array.array("q")
+            lignes.frombytes(octets)
+    
+    def retirer(self, code):
+        self.paiements.pop(code, None)
+    
+    def renommer(self, ancien_code, code):
+        """Suit le changement de code d'un client (le nouveau code n'a pas de lignes à garder)"""
+        self.restaurer(code, b"")
+        lignes = self.paiements.pop(ancien_code, None)
+        if lignes is not None:
+            self.paiements[code] = lignes
+    
+    def etat(self):
+        """Copie compacte (octets par code), enregistrée avec l'instantané"""
+        return {code: lignes.tobytes() for code, lignes in self.paiements.items()}
+
+class InstantanePagine:
+    """Instantané découpé en pages de clients, lisibles séparément
+    
+    Format : signature, en-tête (génération, nombre de clients, nombre de
+    pages, position de la table des pages), pages sérialisées, cumuls
+    statistiques et grand livre facultatifs, puis la table des positions de
+    début de chaque page (et des sections facultatives). L'ouverture ne lit
+    que l'en-tête et la table ; les pages sont lues à la demande depuis le
+    fichier projeté en mémoire.
+    """
+    
+    SIGNATURE = b"BURIDA-PAGES-1\n"
+    EN_TETE = struct.Struct("<QQQQ")
+    TAILLE_PAGE = 1000
+    
+    def __init__(self, chemin):
+        with open(chemin, 'rb') as fichier:
+            self.donnees = mmap.mmap(fichier.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        debut = len(self.SIGNATURE)
+        self.generation, self.nb_clients, self.nb_pages, position_table = \
+            self.EN_TETE.unpack_from(self.donnees, debut)
+        # Positions en plus de celles des pages + 1 : les sections qui suivent la dernière page
+        nb_positions = (len(self.donnees) - position_table) // 8
+        self.positions = struct.unpack_from(f"<{nb_positions}Q", self.donnees, position_table)
+        self.nb_sections = nb_positions - self.nb_pages - 1
+    
+    def __len__(self):
+        return self.nb_clients
+    
+    @profileur.instrumenter("instantane.lire_page")
+    def lire_page(self, numero):
+        """Désérialise une page de clients"""
+        if numero >= self.nb_pages:
+            return []
+        return charger_pickle(io.BytesIO(self.donnees[self.positions[numero]:self.positions[numero + 1]]))
+    
+    def lire_section(self, numero):
+        """Désérialise une section facultative (None pour un instantané qui ne l'a pas)"""
+        if numero >= self.nb_sections:
+            return None
+        debut = self.nb_pages + numero
+        return charger_pickle(io.BytesIO(self.donnees[self.positions[debut]:self.positions[debut + 1]]))
+    
+    def lire_cumuls(self):
+        """Retourne les cumuls statistiques enregistrés (None pour un instantané qui n'en a pas)"""
+        return self.lire_section(0)
+    
+    def lire_grand_livre(self):
+        """Retourne l'état du grand livre enregistré (None pour un instantané qui n'en a pas)"""
+        return self.lire_section(1)
+    
+    @classmethod
+    def ecrire(cls, chemin, clients, generation, cumuls=None, grand_livre=None):
+        # Les sections sont repérées par leur rang : seules les dernières absentes sont omises
+        sections = [cumuls, grand_livre]
+        while sections and sections[-1] is None:
+            sections.pop()
+        with open(chemin, 'wb') as fichier:
+            fichier.write(cls.SIGNATURE)
+            fichier.write(cls.EN_TETE.pack(0, 0, 0, 0))
+            
+            positions = []
+            for debut in range(0, len(clients), cls.TAILLE_PAGE):
+                positions.append(fichier.tell())
+                fichier.write(pickle.dumps(clients[debut:debut + cls.TAILLE_PAGE]))
+            nb_pages = len(positions)
+            for section in sections:
+                positions.append(fichier.tell())
+                fichier.write(pickle.dumps(section))
+            position_table = fichier.tell()
+            positions.append(position_table)
+            fichier.write(struct.pack(f"<{len(positions)}Q", *positions))
+            
+            fichier.seek(len(cls.SIGNATURE))
+            fichier.write(cls.EN_TETE.pack(generation, len(clients), nb_pages, position_table))
+            fichier.flush()
+            os.fsync(fichier.fileno())
+
+# Taille du journal (octets) au-delà de laquelle il est compacté dans un instantané
+SEUIL_COMPACTAGE = 1024 * 1024
+
+# Délai (secondes) avant de réessayer d'écrire des opérations dont l'écriture a échoué
+DELAI_REESSAI_ECRITURE = 1.0
+
+if sys.platform == "win32":
+    import msvcrt
+    
+    def verrouiller(fichier):
+        fichier.seek(0)
+        while True:
+            try:
+                msvcrt.locking(fichier.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK abandonne au bout de 10 secondes : on attend encore
+                continue
+    
+    def deverrouiller(fichier):
+        fichier.seek(0)
+        msvcrt.locking(fichier.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+    
+    def verrouiller(fichier):
+        fcntl.flock(fichier.fileno(), fcntl.LOCK_EX)
+    
+    def deverrouiller(fichier):
+        fcntl.flock(fichier.fileno(), fcntl.LOCK_UN)
+
+class VerrouFichier:
+    """Verrou exclusif partagé par les instances qui ouvrent les mêmes données
+    
+    Le verrou du système porte sur un fichier .lock à côté des données ; un
+    verrou de thread s'y ajoute, le verrou du système ne départageant pas les
+    threads d'une même instance.
+    """
+    
+    def __init__(self, chemin):
+        self.chemin = chemin
+        self.verrou = threading.Lock()
+        self.fichier = None
+    
+    def __enter__(self):
+        self.verrou.acquire()
+        try:
+            if self.fichier is None:
+                self.fichier = open(self.chemin, 'a+b')
+            verrouiller(self.fichier)
+        except BaseException:
+            self.verrou.release()
+            raise
+        return self
+    
+    def __exit__(self, *exception):
+        try:
+            deverrouiller(self.fichier)
+        finally:
+            self.verrou.release()
+    
+    def fermer(self):
+        with self.verrou:
+            if self.fichier is not None:
+                self.fichier.close()
+                self.fichier = None
+
+class DonneesPerimees(OSError):
+    """Le journal à relire a été intégré à un instantané puis supprimé par une autre instance"""
+
+def generation_instantane(chemin):
+    """Génération d'un instantané paginé (-1 s'il n'existe pas ou est d'un ancien format)"""
+    try:
+        with open(chemin, 'rb') as fichier:
+            if fichier.read(len(InstantanePagine.SIGNATURE)) != InstantanePagine.SIGNATURE:
+                return -1
+            return InstantanePagine.EN_TETE.unpack(fichier.read(InstantanePagine.EN_TETE.size))[0]
+    except (OSError, struct.error):
+        return -1
+
+class ClientsFiges:
+    """Clients tels qu'au moment de la copie, lus par un autre thread (instantané, export)
+    
+    Seule la liste est copiée à la création ; un client modifié ensuite garde
+    dans self.etats son état d'avant (voir StockageJournal.figer). Les pages
+    sont lues comme celles d'une liste, en copies des clients.
+    """
+    
+    def __init__(self, clients, verrou):
+        self.clients = list(clients)
+        self.etats = {}  # id(client) -> état avant sa première modification
+        self.verrou = verrou
+    
+    def __len__(self):
+        return len(self.clients)
+    
+    def __iter__(self):
+        for debut in range(0, len(self.clients), InstantanePagine.TAILLE_PAGE):
+            yield from self[debut:debut + InstantanePagine.TAILLE_PAGE]
+    
+    def __getitem__(self, tranche):
+        with self.verrou:
+            etats = [self.etats.get(id(client)) or client.__getstate__() for client in self.clients[tranche]]
+        copies = []
+        for etat in etats:
+            copie = Client.__new__(Client)
+            copie.__setstate__(etat)
+            copies.append(copie)
+        return copies
+
+class StockageJournal:
+    """Stockage par instantané et journal d'opérations ajoutées en fin de fichier
+    
+    L'instantané (self.filename) contient la liste des clients et le numéro de
+    génération du premier journal qui n'y est pas encore intégré. Chaque
+    opération est ajoutée au journal de la génération courante ; au-delà de
+    SEUIL_COMPACTAGE, on bascule sur un nouveau journal et l'instantané est
+    réécrit en arrière-plan (fichier temporaire puis renommage atomique).
+    
+    En mode asynchrone, toutes les écritures sont faites par un thread dédié
+    qui regroupe les opérations en attente ; les comptes rendus sont lus par
+    resultats_ecriture() depuis le thread de l'interface.
+    
+    Plusieurs instances peuvent partager les mêmes fichiers : les écritures
+    se font sous VerrouFichier, chaque opération est précédée d'un marqueur
+    ("auteur", identifiant de l'instance, position lue) et chaque instance
+    relit les opérations des autres avec nouvelles_operations(). Le journal
+    de la génération précédente est gardé pour les instances en retard.
+    
+    Une écriture en échec ne perd rien : le journal est ramené à sa taille
+    d'avant et les enregistrements sont réécrits en tête de l'écriture suivante.
+    """
+    
+    def __init__(self, filename, asynchrone=False):
+        self.filename = filename
+        self.asynchrone = asynchrone
+        self.identifiant = os.urandom(8).hex()
+        self.verrou = VerrouFichier(filename + ".lock")
+        self.generation = 0
+        # Position (génération, octet) jusqu'où les journaux ont été lus et appliqués
+        self.position_lue = (0, 0)
+        self.journal = None
+        self.taille_journal = 0
+        self.non_ecrits = b""  # Enregistrements d'une écriture en échec, à réécrire
+        self.nb_non_ecrits = 0  # Nombre d'opérations qu'ils contiennent (mode asynchrone)
+        self.fin_valide = None  # (génération, taille) du journal avant l'écriture en échec
+        self.figes = []  # ClientsFiges des instantanés pas encore écrits
+        self.verrou_figes = threading.Lock()
+        # Thread de compactage (mode synchrone) ou écrivain (mode asynchrone)
+        self.compactage = None
+        self.file = queue.Queue()
+        self.resultats = queue.Queue()
+    
+    def chemin_journal(self, generation):
+        return f"{self.filename}.journal.{generation}"
+    
+    def generations_journal(self):
+        """Retourne les générations de journal présentes sur le disque, triées"""
+        prefixe = self.chemin_journal("")
+        generations = []
+        for chemin in glob.glob(glob.escape(prefixe) + "*"):
+            suffixe = chemin[len(prefixe):]
+            if suffixe.isdigit():
+                generations.append(int(suffixe))
+        return sorted(generations)
+    
+    def ouvrir(self):
+        """Ouvre l'instantané sans tout désérialiser
+        
+        Retourne la première page de clients et un itérateur sur les pages
+        suivantes. Les anciens formats (pickle d'un bloc) n'ont qu'une page.
+        Le grand livre de l'instantané est lu à la fin des pages suivantes
+        (voir pages_suivantes), dans self.grand_livre_instantane.
+        """
+        self.generation = 0
+        self.instantane_pagine = False
+        self.cumuls_instantane = None
+        self.grand_livre_instantane = None
+        if not os.path.exists(self.filename):
+            return [], iter(())
+        
+        with open(self.filename, 'rb') as fichier:
+            pagine = fichier.read(len(InstantanePagine.SIGNATURE)) == InstantanePagine.SIGNATURE
+        
+        if pagine:
+            instantane = InstantanePagine(self.filename)
+            self.generation = instantane.generation
+            self.instantane_pagine = True
+            self.cumuls_instantane = instantane.lire_cumuls()
+            return instantane.lire_page(0), self.pages_suivantes(instantane)
+        
+        with open(self.filename, 'rb') as fichier:
+            donnees = charger_pickle(fichier)
+        if isinstance(donnees, dict):
+            self.generation = donnees["generation"]
+            return donnees["clients"], iter(())
+        # Ancien format : liste de clients sérialisée d'un bloc
+        return donnees, iter(())
+    
+    def pages_suivantes(self, instantane):
+        """Parcourt les pages après la première, lit le grand livre, puis libère la projection
+        
+        Le grand livre ne sert pas à afficher les clients : il est désérialisé
+        par le thread qui lit les pages, avant le rejeu des journaux.
+        """
+        for numero in range(1, instantane.nb_pages):
+            yield instantane.lire_page(numero)
+        self.grand_livre_instantane = GrandLivre(instantane.lire_grand_livre())
+        instantane.donnees.close()
+    
+    def lire_journaux(self):
+        """Parcourt les opérations des journaux que l'instantané n'intègre pas encore"""
+        self.position_lue = (self.generation, 0)
+        with self.verrou:
+            for g in self.generations_journal():
+                if g >= self.generation:
+                    self.generation = g
+                    with open(self.chemin_journal(g), 'rb+') as fichier:
+                        while True:
+                            position = fichier.tell()
+                            try:
+                                operation = charger_pickle(fichier)
+                            except (EOFError, pickle.UnpicklingError):
+                                # Fin du journal, ou enregistrement incomplet (arrêt pendant une
+                                # écriture) que l'on écarte pour pouvoir continuer à ajouter
+                                fichier.truncate(position)
+                                self.position_lue = (g, position)
+                                break
+                            if operation[0] != "auteur":
+                                yield operation
+    
+    def lire_depuis(self, generation, debut):
+        """Lit les opérations d'un journal à partir d'un octet (verrou tenu)
+        
+        Retourne la liste des (position, auteur, position lue par l'auteur,
+        opération) et l'octet où la lecture s'est arrêtée. Les opérations
+        écrites sans marqueur ont un auteur et une position lue à None.
+        """
+        operations = []
+        auteur = vu = None
+        with open(self.chemin_journal(generation), 'rb') as fichier:
+            fichier.seek(debut)
+            while True:
+                position = fichier.tell()
+                try:
+                    enregistrement = charger_pickle(fichier)
+                except (EOFError, pickle.UnpicklingError):
+                    # Un marqueur sans son opération est relu avec elle la fois suivante
+                    return operations, position if auteur is None else debut_marqueur
+                if enregistrement[0] == "auteur":
+                    debut_marqueur = position
+                    auteur, vu = enregistrement[1], enregistrement[2]
+                else:
+                    operations.append(((generation, position), auteur, vu, enregistrement))
+                    auteur = vu = None
+    
+    def nouvelles_operations(self):
+        """Retourne les opérations ajoutées aux journaux depuis la dernière lecture, toutes instances confondues
+        
+        Un journal qui n'a ni grandi ni de successeur n'est pas ouvert. Lève
+        DonneesPerimees si le journal à relire a déjà été supprimé.
+        """
+        generation, debut = self.position_lue
+        try:
+            inchange = os.path.getsize(self.chemin_journal(generation)) == debut
+        except OSError:
+            inchange = False
+        if inchange and not os.path.exists(self.chemin_journal(generation + 1)):
+            return []
+        
+        operations = []
+        with self.verrou:
+            while True:
+                if not os.path.exists(self.chemin_journal(generation)):
+                    raise DonneesPerimees("les données ont été réorganisées par une autre instance")
+                lues, debut = self.lire_depuis(generation, debut)
+                operations.extend(lues)
+                if not os.path.exists(self.chemin_journal(generation + 1)):
+                    break
+                generation, debut = generation + 1, 0
+        self.position_lue = (generation, debut)
+        return operations
+    
+    def ouvrir_journal(self):
+        """Ouvre le journal courant en ajout, une fois le chargement terminé"""
+        self.journal = open(self.chemin_journal(self.generation), 'ab')
+        self.taille_journal = self.journal.tell()
+        if self.asynchrone:
+            self.demarrer_ecrivain()
+    
+    def journaliser(self, operation, *arguments):
+        """Ajoute une opération en fin de journal (ou la confie à l'écrivain)"""
+        if self.journal is None:
+            raise OSError("le journal n'est pas ouvert (chargement des données en échec)")
+        
+        # Sérialiser tout de suite : les clients peuvent changer avant l'écriture
+        donnees = (pickle.dumps(("auteur", self.identifiant, self.position_lue))
+                   + pickle.dumps((operation, *arguments)))
+        self.taille_journal += len(donnees)
+        if self.asynchrone:
+            self.file.put(("journal", donnees))
+        else:
+            self.ecrire_journal(donnees)
+    
+    @profileur.instrumenter("stockage.ecrire_journal")
+    def ecrire_journal(self, donnees):
+        """Ajoute des enregistrements au journal, après ceux d'une écriture précédente en échec
+        
+        En cas d'échec, ils sont gardés dans self.non_ecrits et le journal est
+        ramené à sa taille d'avant : un enregistrement incomplet au milieu du
+        journal ferait écarter tous les suivants à la relecture.
+        """
+        self.non_ecrits += donnees
+        with self.verrou:
+            self.retablir_journal()
+            self.suivre_generation()
+            taille = os.fstat(self.journal.fileno()).st_size
+            try:
+                self.journal.write(self.non_ecrits)
+                self.journal.flush()
+                os.fsync(self.journal.fileno())
+            except OSError:
+                self.fin_valide = (self.generation, taille)
+                try:
+                    self.retablir_journal()
+                except OSError:
+                    pass  # Nouvel essai à la prochaine écriture
+                raise
+        self.non_ecrits = b""
+    
+    def retablir_journal(self):
+        """Ramène le journal à sa taille d'avant une écriture en échec (verrou tenu)"""
+        if self.fin_valide is None:
+            return
+        generation, taille = self.fin_valide
+        try:
+            # Ce qui reste dans le tampon du fichier est de toute façon retiré ci-dessous
+            self.journal.close()
+        except OSError:
+            pass
+        os.truncate(self.chemin_journal(generation), taille)
+        self.journal = open(self.chemin_journal(self.generation), 'ab')
+        self.fin_valide = None
+    
+    def suivre_generation(self):
+        """Passe au journal le plus récent s'il a été ouvert par une autre instance (verrou tenu)"""
+        if not os.path.exists(self.chemin_journal(self.generation + 1)):
+            return
+        self.journal.close()
+        while os.path.exists(self.chemin_journal(self.generation + 1)):
+            self.generation += 1
+        self.journal = open(self.chemin_journal(self.generation), 'ab')
+    
+    def basculer_journal(self):
+        """Ferme le journal courant et ouvre celui de la génération suivante"""
+        self.journal.close()
+        self.generation += 1
+        self.journal = open(self.chemin_journal(self.generation), 'ab')
+    
+    def basculer_si_a_jour(self, position):
+        """Bascule sur un nouveau journal si aucune autre instance n'a écrit depuis position
+        
+        L'instantané qui suit n'intègre que ce qui avait été lu à position :
+        écrit par-dessus des opérations d'autres instances, il les perdrait.
+        On renonce alors au compactage, qui sera retenté plus tard.
+        """
+        with self.verrou:
+            return self.basculer_depuis(position)
+    
+    def basculer_depuis(self, position):
+        """Corps de basculer_si_a_jour (verrou tenu)"""
+        self.suivre_generation()
+        generation, debut = position
+        while generation <= self.generation:
+            if not os.path.exists(self.chemin_journal(generation)):
+                return False
+            operations, fin = self.lire_depuis(generation, debut)
+            if any(auteur != self.identifiant for position, auteur, vu, operation in operations):
+                return False
+            generation, debut = generation + 1, 0
+        self.basculer_journal()
+        return True
+    
+    def compactage_necessaire(self):
+        """Indique si le journal courant dépasse le seuil de compactage"""
+        return self.taille_journal > SEUIL_COMPACTAGE
+    
+    def compacter(self, clients, cumuls=None, grand_livre=None):
+        """Bascule sur un nouveau journal et réécrit l'instantané en arrière-plan
+        
+        cumuls et grand_livre sont des copies, enregistrées avec l'instantané.
+        """
+        if not self.asynchrone and self.compactage is not None and self.compactage.is_alive():
+            return
+        if not self.asynchrone and self.non_ecrits:
+            # L'instantané ne doit pas devancer des opérations absentes du journal
+            try:
+                self.ecrire_journal(b"")
+            except OSError:
+                return
+        
+        # Copie de la liste seule : les clients modifiés pendant l'écriture sont figés par figer()
+        copie = self.copie_figee(clients)
+        self.taille_journal = 0
+        
+        if self.asynchrone:
+            # L'écrivain bascule le journal à ce point de la file, dans l'ordre des opérations
+            self.file.put(("instantane", copie, cumuls, grand_livre, self.position_lue))
+            return
+        
+        # Les opérations suivantes iront dans un journal que l'instantané n'intègre pas
+        if not self.basculer_si_a_jour(self.position_lue):
+            self.liberer(copie)
+            return
+        self.compactage = threading.Thread(target=self.ecrire_instantane,
+                                           args=(copie, self.generation, cumuls, grand_livre), daemon=True)
+        self.compactage.start()
+    
+    def copie_figee(self, clients):
+        """Retourne une copie des clients lisible depuis un autre thread, à rendre avec liberer()"""
+        copie = ClientsFiges(clients, self.verrou_figes)
+        with self.verrou_figes:
+            self.figes.append(copie)
+        return copie
+    
+    def figer(self, client):
+        """Garde l'état d'un client sur le point d'être modifié pour les instantanés pas encore écrits"""
+        if not self.figes:
+            return
+        with self.verrou_figes:
+            for copie in self.figes:
+                if id(client) not in copie.etats:
+                    copie.etats[id(client)] = client.__getstate__()
+    
+    def liberer(self, copie):
+        with self.verrou_figes:
+            if copie in self.figes:
+                self.figes.remove(copie)
+    
+    @profileur.instrumenter("stockage.ecrire_instantane")
+    def ecrire_instantane(self, clients, generation, cumuls=None, grand_livre=None):
+        """Écrit l'instantané paginé de façon atomique puis supprime les journaux intégrés
+        
+        Le journal de la génération précédente est gardé pour que les autres
+        instances finissent de le relire.
+        """
+        temporaire = f"{self.filename}.{self.identifiant}.tmp"
+        try:
+            InstantanePagine.ecrire(temporaire, clients, generation, cumuls, grand_livre)
+        finally:
+            self.liberer(clients)
+        with self.verrou:
+            # Une autre instance a pu écrire entre-temps un instantané plus récent
+            if generation_instantane(self.filename) >= generation:
+                os.remove(temporaire)
+                return
+            self.installer(temporaire, generation)
+    
+    def installer(self, temporaire, generation):
+        """Remplace l'instantané par le fichier temporaire et supprime les journaux intégrés (verrou tenu)"""
+        os.replace(temporaire, self.filename)
+        for g in self.generations_journal():
+            if g < generation - 1:
+                os.remove(self.chemin_journal(g))
+    
+    def convertir(self, clients, cumuls=None, grand_livre=None):
+        """Réécrit un fichier d'ancien format en instantané paginé, sous le verrou ; retourne True si c'est fait
+        
+        Une autre instance a pu le convertir depuis qu'il a été lu : le format
+        est vérifié de nouveau, verrou tenu, et la conversion est abandonnée
+        si elle a aussi écrit des opérations qui ne sont pas dans clients.
+        """
+        with self.verrou:
+            if generation_instantane(self.filename) >= 0 or not self.basculer_depuis(self.position_lue):
+                return False
+            temporaire = f"{self.filename}.{self.identifiant}.tmp"
+            InstantanePagine.ecrire(temporaire, clients, self.generation, cumuls, grand_livre)
+            self.installer(temporaire, self.generation)
+        self.instantane_pagine = True
+        return True
+    
+    def demarrer_ecrivain(self):
+        """Démarre le thread d'écriture du mode asynchrone"""
+        self.compactage = threading.Thread(target=self.boucle_ecrivain, daemon=True)
+        self.compactage.start()
+    
+    def boucle_ecrivain(self):
+        """Écrit les opérations en attente, en regroupant les rafales en une seule écriture
+        
+        Les opérations d'une écriture en échec sont réécrites en tête de la
+        suivante, ou après DELAI_REESSAI_ECRITURE s'il n'arrive rien d'autre ;
+        aucun instantané n'est écrit tant qu'elles ne sont pas dans le journal.
+        """
+        while True:
+            try:
+                taches = [self.file.get(timeout=DELAI_REESSAI_ECRITURE if self.non_ecrits else None)]
+            except queue.Empty:
+                taches = []
+            while True:
+                try:
+                    taches.append(self.file.get_nowait())
+                except queue.Empty:
+                    break
+            
+            nb_ecrites = 0
+            tampon = []
+            erreur = None
+            arret = False
+            # Une tâche None termine le lot : les opérations restantes sont écrites
+            for tache in taches + [None]:
+                if tache is not None and tache[0] == "journal":
+                    tampon.append(tache[1])
+                    self.nb_non_ecrits += 1
+                    continue
+                
+                # Les opérations qui précèdent l'instantané ou l'arrêt sont écrites d'abord
+                try:
+                    if tampon or self.non_ecrits:
+                        self.ecrire_journal(b"".join(tampon))
+                        nb_ecrites += self.nb_non_ecrits
+                        self.nb_non_ecrits = 0
+                    if tache is not None and tache[0] == "instantane" and self.basculer_si_a_jour(tache[4]):
+                        self.ecrire_instantane(tache[1], self.generation, tache[2], tache[3])
+                except OSError as e:
+                    erreur = e
+                tampon = []
+                if tache is not None and tache[0] == "instantane":
+                    # Instantané écrit ou abandonné : ses clients n'ont plus à être figés
+                    self.liberer(tache[1])
+                if tache is not None and tache[0] == "attente":
+                    tache[1].set()
+                if tache is not None and tache[0] == "arret":
+                    arret = True
+            self.resultats.put((nb_ecrites, erreur))
+            
+            if arret:
+                return
+    
+    def resultats_ecriture(self):
+        """Retourne les comptes rendus d'écriture disponibles (nb d'opérations, erreur)"""
+        resultats = []
+        while True:
+            try:
+                resultats.append(self.resultats.get_nowait())
+            except queue.Empty:
+                return resultats
+    
+    def attendre_ecritures(self):
+        """Attend que l'écrivain ait écrit les opérations confiées ; retourne False s'il en reste en échec"""
+        if self.asynchrone and self.compactage is not None:
+            ecrites = threading.Event()
+            self.file.put(("attente", ecrites))
+            ecrites.wait()
+        return not self.non_ecrits
+    
+    def fermer(self):
+        """Écrit tout ce qui est en attente puis ferme le journal"""
+        if self.asynchrone and self.compactage is not None:
+            self.file.put(("arret",))
+        if self.compactage is not None:
+            self.compactage.join()
+        if not self.asynchrone and self.non_ecrits:
+            # Dernier essai pour les opérations d'une écriture en échec (l'erreur est remontée)
+            self.ecrire_journal(b"")
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        self.verrou.fermer()
+
+
+# Nombre de modifications locales que l'on peut annuler
+TAILLE_HISTORIQUE = 500
+
+class Historique:
+    """Modifications locales annulables, sous forme de différences compactes
+    
+    Chaque entrée décrit une opération par ce qu'elle a changé, et non par
+    une copie des clients :
+    
+        ("modif", code, {champ: (ancienne valeur, nouvelle valeur)})
+        ("ajout", code)
+        ("suppr", état du client supprimé, ses paiements (GrandLivre.octets))
+        ("paiement", code, date ordinale, montant en centimes)
+        ("groupe", description, [entrées])  (opération en plusieurs étapes, une fusion)
+    
+    Annuler une entrée rejoue l'opération inverse ; celle-ci, notée à son
+    tour, va dans la pile opposée.
+    """
+    
+    def __init__(self, taille=TAILLE_HISTORIQUE):
+        self.a_annuler = collections.deque(maxlen=taille)
+        self.a_retablir = collections.deque(maxlen=taille)
+    
+    def noter(self, entree):
+        """Note une nouvelle modification, ce qui rend l'historique à rétablir caduc"""
+        self.a_annuler.append(entree)
+        self.a_retablir.clear()
+    
+    @staticmethod
+    def decrire(entree):
+        if entree[0] == "groupe":
+            return entree[1]
+        if entree[0] == "modif":
+            return f"modification du client {entree[1]}"
+        if entree[0] == "ajout":
+            return f"ajout du client {entree[1]}"
+        if entree[0] == "paiement":
+            if entree[3] < 0:
+                return f"contre-passation d'un paiement du client {entree[1]}"
+            return f"paiement du client {entree[1]}"
+        return f"suppression du client {entree[1][0]}"
+
+# Attributs d'une fiche client, dans l'ordre de Client.__getstate__
+CHAMPS_ETAT = ("code", "etablissement", "nom", "localisation", "contact", "mensualite_centimes",
+               "montant_paye_centimes", "periode", "agent", "observation", "date_ordinal",
+               "paiements_centimes", "debut_echeancier", "identifiant")
+
+# Champs d'un client complétés par ceux de ses doublons lors d'une fusion
+CHAMPS_FUSION = ("localisation", "contact")
+
+def codes_operation(operation, arguments):
+    """Codes des clients touchés par une opération du journal
+    
+    Les paiements en font partie : ils ne sont jamais signalés en conflit,
+    mais doivent être appliqués dans l'ordre du journal par rapport aux
+    suppressions et rétablissements (voir GestionClients.relire_journal).
+    """
+    if operation == "ajout":
+        return [arguments[0].code]
+    if operation == "modif":
+        return {arguments[0], arguments[1].code}
+    if operation == "suppr":
+        return [arguments[0]]
+    if operation == "lot":
+        return [client.code for client in arguments[0]]
+    if operation == "paiement":
+        return [arguments[0]]
+    return []
+
+def identifiants_operation(operation, arguments):
+    """Identifiants des clients touchés par une opération du journal
+    
+    Ils désignent le client quel que soit son code : une opération écrite
+    avec l'ancien code d'un client renommé ici le touche aussi.
+    """
+    if operation == "ajout":
+        identifiants = [arguments[0].identifiant]
+    elif operation == "modif":
+        identifiants = [arguments[1].identifiant]
+    elif operation == "lot":
+        identifiants = [client.identifiant for client in arguments[0]]
+    elif operation == "suppr":
+        identifiants = arguments[1:]
+    elif operation == "paiement":
+        identifiants = arguments[3:]
+    else:
+        identifiants = []
+    # Journaux antérieurs aux identifiants
+    return [identifiant for identifiant in identifiants if identifiant is not None]
+
+class GestionClients:
+    """Moteur de gestion des clients : modèle, recherche, statistiques et stockage
+    
+    Toutes les modifications passent par ajouter, ajouter_lot, modifier,
+    supprimer et ajouter_paiement, qui tiennent à jour l'index de recherche et les statistiques
+    puis journalisent l'opération ; annuler et retablir repassent par elles. Les erreurs d'écriture (OSError) sont
+    levées après la mise à jour en mémoire.
+    """
+    
+    def __init__(self, filename="burida_clients.pkl", asynchrone=False):
+        self.filename = filename
+        self.clients = ClientStore()
+        self.stockage = StockageJournal(filename, asynchrone=asynchrone)
+        self.index_recherche = IndexRecherche()
+        self.statistiques = AgregatsStatistiques()
+        self.ordres_tri = OrdresTri()
+        self.index_filtres = IndexFiltres()
+        self.grand_livre = GrandLivre()
+        self.codes_renommes = 0
+        self.abonnes = []
+        # code -> [opérations locales pas encore relues dans le journal, position de la dernière relue]
+        self.ecritures_locales = {}
+        self.conflits_differes = []  # Conflits relevés au compactage, pas encore rendus
+        self.recharge_en_attente = False  # Rechargement reporté faute d'avoir pu écrire le journal
+        self.historique = Historique()
+        # Pile où noter l'opération en cours (None hors annulation, rétablissement et opérations groupées)
+        self.pile_rejeu = None
+        self.charge = False
+    
+    # Chargement et enregistrement
+    
+    def charger(self):
+        """Charge toutes les données (instantané puis journaux)"""
+        for page in self.ouvrir():
+            self.integrer_page(page)
+        self.terminer_chargement()
+        return self.clients
+    
+    def ouvrir(self):
+        """Intègre la première page de l'instantané et retourne un itérateur sur les suivantes"""
+        premiere_page, pages_suivantes = self.stockage.ouvrir()
+        self.integrer_page(premiere_page)
+        return pages_suivantes
+    
+    @profileur.instrumenter("moteur.integrer_page")
+    def integrer_page(self, page):
+        # Les ordres de tri sont recalculés à la demande plutôt que fusionnés page après page
+        self.ordres_tri.invalider()
+        for client in page:
+            self.inserer(client)
+    
+    @profileur.instrumenter("moteur.terminer_chargement")
+    def terminer_chargement(self):
+        """Rejoue les journaux puis ouvre les données en écriture"""
+        self.rejouer_journaux()
+        self.stockage.ouvrir_journal()
+        
+        # Convertir un ancien fichier au format paginé (en cas d'échec, il reste lisible tel quel)
+        if not self.stockage.instantane_pagine and len(self.clients):
+            try:
+                self.stockage.convertir(self.clients, self.statistiques.cumuls(), self.grand_livre.etat())
+            except OSError:
+                pass
+        self.charge = True
+    
+    def rejouer_journaux(self):
+        """Reprend le grand livre de l'instantané et applique les opérations des journaux"""
+        self.grand_livre = self.stockage.grand_livre_instantane or GrandLivre()
+        for operation, *arguments in self.stockage.lire_journaux():
+            self.appliquer_operation(operation, *arguments)
+    
+    def sauvegarder(self):
+        """Réécrit l'instantané complet, ce qui vide le journal
+        
+        Les opérations des autres instances sont d'abord relues : l'instantané
+        doit les intégrer (leurs conflits sont rendus par le relire_journal suivant).
+        """
+        try:
+            appliquees, conflits = self.relire_journal()
+        except OSError:
+            # Journal illisible ou supprimé : le compactage attendra
+            return
+        self.conflits_differes.extend(conflits)
+        self.stockage.compacter(self.clients, self.statistiques.cumuls(), self.grand_livre.etat())
+    
+    def fermer(self):
+        """Termine les écritures en attente et ferme le journal"""
+        self.stockage.fermer()
+    
+    # Modifications
+    
+    def abonner(self, fonction):
+        """Fait appeler fonction(evenement, client, ancien) à chaque ajout, modification ou suppression
+        
+        evenement vaut "ajout", "modif" ou "suppr" ; pour une modification,
+        ancien est une copie du client avant modification (None sinon).
+        "recharge" (client None) signale que le modèle a été reconstruit (voir
+        recharger). Le chargement ne produit pas d'événements ; les opérations
+        des autres instances (relire_journal) en produisent comme les
+        modifications locales.
+        """
+        self.abonnes.append(fonction)
+    
+    def notifier(self, evenement, client, ancien=None):
+        for fonction in self.abonnes:
+            fonction(evenement, client, ancien)
+    
+    def client(self, code):
+        """Retourne le client d'un code (None s'il n'existe pas)"""
+        return self.clients.par_code.get(code)
+    
+    def verifier_code(self, code, client=None):
+        """Lève ValueError si le code est déjà celui d'un autre client que client"""
+        existant = self.clients.par_code.get(code)
+        if existant is not None and existant is not client:
+            raise ValueError(f"Le code {code} est déjà utilisé.")
+    
+    @profileur.instrumenter("moteur.ajouter")
+    def ajouter(self, valeurs):
+        """Crée, ajoute et retourne un client à partir de valeurs texte"""
+        valider_valeurs(valeurs)
+        self.verifier_code(valeurs["code"])
+        return self.ajouter_client(creer_client(valeurs))
+    
+    def ajouter_client(self, client, paiements=b""):
+        """Ajoute un client déjà construit (client supprimé que l'on rétablit, avec ses paiements)"""
+        self.inserer(client)
+        self.ordres_tri.ajouter(client)
+        self.grand_livre.restaurer(client.code, paiements)
+        self.notifier("ajout", client)
+        self.noter(("ajout", client.code))
+        if paiements:
+            self.journaliser("ajout", client, paiements)
+        else:
+            self.journaliser("ajout", client)
+        return client
+    
+    @profileur.instrumenter("moteur.ajouter_lot")
+    def ajouter_lot(self, clients):
+        """Ajoute des clients déjà validés en une seule opération journalisée
+        
+        Retourne les clients écartés parce que leur code est déjà utilisé.
+        """
+        acceptes = []
+        doublons = []
+        codes = set()
+        for client in clients:
+            if client.code in self.clients.par_code or client.code in codes:
+                doublons.append(client)
+            else:
+                codes.add(client.code)
+                acceptes.append(client)
+        
+        if acceptes:
+            self.inserer_lot(acceptes)
+            for client in acceptes:
+                self.notifier("ajout", client)
+            self.journaliser("lot", acceptes)
+        return doublons
+    
+    @profileur.instrumenter("moteur.modifier")
+    def modifier(self, code, valeurs):
+        """Modifie les champs du client de ce code"""
+        client = self.clients.par_code[code]
+        champs_verifies = {champ: getattr(client, champ) for champ in CHAMPS_OBLIGATOIRES + CHAMPS_MONTANT}
+        champs_verifies.update(valeurs)
+        valider_valeurs(champs_verifies)
+        self.verifier_code(champs_verifies["code"], client)
+        avant = {champ: getattr(client, champ) for champ in valeurs}
+        ancien = self.mettre_a_jour(client, valeurs)
+        self.notifier("modif", client, ancien)
+        
+        # Seuls les champs dont la valeur a réellement changé sont gardés pour l'annulation
+        difference = {champ: (valeur, getattr(client, champ)) for champ, valeur in avant.items()
+                      if getattr(client, champ) != valeur}
+        if difference:
+            self.noter(("modif", client.code, difference))
+        
+        # Le journal désigne le client par son code avant modification ; ses paiements
+        # servent à le rétablir si une autre instance l'a supprimé entre-temps
+        self.journaliser("modif", code, client, self.grand_livre.octets(client.code))
+        return client
+    
+    @profileur.instrumenter("moteur.supprimer")
+    def supprimer(self, code):
+        """Supprime le client de ce code"""
+        paiements = self.grand_livre.octets(code)
+        client = self.retirer(code)
+        self.notifier("suppr", client)
+        self.noter(("suppr", client.__getstate__(), paiements))
+        self.journaliser("suppr", code, client.identifiant)
+    
+    def enregistrer_paiement(self, code, montant, jour=""):
+        """Enregistre un paiement saisi (montant texte, date AAAA-MM-JJ ou vide pour aujourd'hui)
+        
+        Lève ValueError avec le message à afficher si la saisie est invalide.
+        """
+        try:
+            montant = centimes(montant)
+        except ValueError:
+            raise ValueError("Le montant du paiement doit être un montant.") from None
+        if montant <= 0:
+            raise ValueError("Le montant du paiement doit être positif.")
+        try:
+            ordinal = datetime.strptime(jour, "%Y-%m-%d").toordinal() if jour else date.today().toordinal()
+        except ValueError:
+            raise ValueError("La date du paiement doit être au format AAAA-MM-JJ.") from None
+        return self.ajouter_paiement(code, ordinal, montant)
+    
+    @profileur.instrumenter("moteur.ajouter_paiement")
+    def ajouter_paiement(self, code, ordinal, montant):
+        """Ajoute un paiement (centimes, négatif pour une contre-passation) au grand livre du client de ce code"""
+        client = self.clients.par_code[code]
+        ancien = self.appliquer_paiement(client, ordinal, montant)
+        self.notifier("modif", client, ancien)
+        self.noter(("paiement", code, ordinal, montant))
+        self.journaliser("paiement", code, ordinal, montant, client.identifiant)
+        return client
+    
+    def paiements(self, code):
+        """Paiements du client de ce code : liste de (date AAAA-MM-JJ, montant texte), du plus ancien au plus récent"""
+        return [(date.fromordinal(ordinal).strftime("%Y-%m-%d"), formater_montant(montant))
+                for ordinal, montant in self.grand_livre.lignes(code)]
+    
+    def fusionner(self, code, doublons):
+        """Fusionne des fiches en double dans le client de ce code ; retourne ce client
+        
+        Ses champs vides (CHAMPS_FUSION) sont complétés par ceux des doublons,
+        son observation reprend les leurs et note les codes fusionnés, les
+        paiements des doublons lui sont reportés à leur date, puis les doublons
+        sont supprimés. La fusion s'annule d'un bloc. Lève
+        ValueError si l'un des clients n'existe plus.
+        """
+        doublons = [autre for autre in doublons if autre != code]
+        for autre in [code, *doublons]:
+            if autre not in self.clients.par_code:
+                raise ValueError(f"Le client {autre} n'existe plus.")
+        
+        client = self.clients.par_code[code]
+        valeurs = {}
+        observations = [client.observation]
+        for autre in doublons:
+            doublon = self.clients.par_code[autre]
+            for champ in CHAMPS_FUSION:
+                if not getattr(client, champ) and not valeurs.get(champ):
+                    valeurs[champ] = getattr(doublon, champ)
+            observations.append(doublon.observation)
+        observations.append(f"Fusion de {', '.join(doublons)}")
+        valeurs["observation"] = " / ".join(observation for observation in observations if observation)
+        
+        with self.grouper(f"fusion de {len(doublons) + 1} clients dans {code}"):
+            self.modifier(code, valeurs)
+            for autre in doublons:
+                for ordinal, montant in self.grand_livre.lignes(autre):
+                    self.ajouter_paiement(code, ordinal, montant)
+                self.supprimer(autre)
+        return client
+    
+    # Annulation et rétablissement
+    
+    def noter(self, entree):
+        if self.pile_rejeu is not None:
+            self.pile_rejeu.append(entree)
+        else:
+            self.historique.noter(entree)
+    
+    def annuler(self):
+        """Annule la dernière modification locale ; retourne sa description (None s'il n'y a rien à annuler)"""
+        entree = self.rejouer(self.historique.a_annuler, self.historique.a_retablir)
+        return None if entree is None else Historique.decrire(entree)
+    
+    def retablir(self):
+        """Rétablit la dernière modification annulée ; retourne sa description (None s'il n'y a rien à rétablir)"""
+        entree = self.rejouer(self.historique.a_retablir, self.historique.a_annuler)
+        # L'opération rétablie est l'inverse de l'entrée, qui vient d'être notée à annuler
+        if entree is None or not self.historique.a_annuler:
+            return None if entree is None else Historique.decrire(entree)
+        return Historique.decrire(self.historique.a_annuler[-1])
+    
+    def rejouer(self, source, destination):
+        """Applique l'inverse de la dernière entrée de source, notée à son tour dans destination ; retourne l'entrée
+        
+        L'inverse passe par ajouter_client, modifier et supprimer : il est
+        journalisé et produit les mêmes événements qu'une modification saisie.
+        Lève ValueError si le client a changé depuis au point que l'inverse ne
+        s'applique plus (supprimé, ou code repris, sur un autre poste).
+        """
+        if not source:
+            return None
+        entree = source.pop()
+        self.pile_rejeu = []
+        try:
+            self.appliquer_inverse(entree)
+        finally:
+            inverses, self.pile_rejeu = self.pile_rejeu, None
+            # Une opération groupée s'annule et se rétablit d'un bloc
+            if entree[0] == "groupe" and inverses:
+                destination.append(("groupe", entree[1], inverses))
+            else:
+                destination.extend(inverses)
+        return entree
+    
+    def appliquer_inverse(self, entree):
+        if entree[0] == "groupe":
+            for etape in reversed(entree[2]):
+                self.appliquer_inverse(etape)
+        elif entree[0] == "modif":
+            code, difference = entree[1], entree[2]
+            if code not in self.clients.par_code:
+                raise ValueError(f"Le client {code} n'existe plus.")
+            self.modifier(code, {champ: avant for champ, (avant, apres) in difference.items()})
+        elif entree[0] == "ajout":
+            if entree[1] not in self.clients.par_code:
+                raise ValueError(f"Le client {entree[1]} n'existe plus.")
+            self.supprimer(entree[1])
+        elif entree[0] == "paiement":
+            code, ordinal, montant = entree[1:]
+            if code not in self.clients.par_code:
+                raise ValueError(f"Le client {code} n'existe plus.")
+            # Le grand livre ne perd aucune ligne : le paiement est contre-passé
+            self.ajouter_paiement(code, ordinal, -montant)
+        else:
+            client = Client.__new__(Client)
+            client.__setstate__(entree[1])
+            self.verifier_code(client.code)
+            self.ajouter_client(client, entree[2])
+    
+    @contextlib.contextmanager
+    def grouper(self, description):
+        """Note les modifications du bloc with comme une seule entrée de l'historique"""
+        groupe = []
+        self.pile_rejeu = groupe
+        try:
+            yield
+        finally:
+            self.pile_rejeu = None
+            if groupe:
+                self.historique.noter(("groupe", description, groupe))
+    
+    def journaliser(self, operation, *arguments):
+        self.stockage.journaliser(operation, *arguments)
+        for cle in [*codes_operation(operation, arguments), *identifiants_operation(operation, arguments)]:
+            self.ecritures_locales.setdefault(cle, [0, None])[0] += 1
+        if self.stockage.compactage_necessaire():
+            self.sauvegarder()
+    
+    # Opérations des autres instances
+    
+    def relire_journal(self):
+        """Applique les opérations journalisées par les autres instances depuis la dernière lecture
+        
+        Retourne le nombre d'opérations appliquées et les codes en conflit :
+        clients changés ici et par une autre instance sans que l'une ait vu le
+        changement de l'autre. Le dernier changement du journal l'emporte :
+        une opération d'une autre instance écrite avant une opération locale
+        pas encore relue fait recharger le modèle (voir recharger), pour que
+        toutes les instances aient l'état du journal. Les opérations appliquées
+        produisent des événements comme les modifications locales, mais ne
+        sont pas journalisées à nouveau.
+        """
+        appliquees = 0
+        conflits = self.conflits_differes
+        self.conflits_differes = []
+        recharge = self.recharge_en_attente
+        for position, auteur, vu, (operation, *arguments) in self.stockage.nouvelles_operations():
+            # Un lot est relu client par client, chacun pouvant être en conflit
+            if operation == "lot":
+                sous_operations = [("ajout", client) for client in arguments[0]]
+            else:
+                sous_operations = [(operation, *arguments)]
+            
+            for operation, *arguments in sous_operations:
+                codes = codes_operation(operation, arguments)
+                # Les écritures locales sont suivies par code et par identifiant (clients renommés)
+                cles = [*codes, *identifiants_operation(operation, arguments)]
+                if auteur == self.stockage.identifiant:
+                    for cle in cles:
+                        ecriture = self.ecritures_locales.setdefault(cle, [0, None])
+                        ecriture[0] = max(0, ecriture[0] - 1)
+                        ecriture[1] = position
+                    continue
+                
+                gagnante = True
+                en_conflit = False
+                for cle in cles:
+                    ecriture = self.ecritures_locales.get(cle)
+                    if ecriture is None:
+                        continue
+                    if ecriture[0]:
+                        gagnante = False
+                        en_conflit = True
+                    elif ecriture[1] is not None and (vu is None or vu <= ecriture[1]):
+                        en_conflit = True
+                # Deux paiements ne se contredisent pas : un paiement n'est jamais signalé en
+                # conflit, mais passe dans l'ordre du journal (une suppression emporte le grand livre)
+                if en_conflit and operation != "paiement":
+                    conflits.extend(codes)
+                if not gagnante:
+                    # Elle précède dans le journal une opération locale déjà appliquée : seul
+                    # le rechargement donne ici le même état que sur les autres instances
+                    recharge = True
+                elif not recharge and not self.appliquer_operation(operation, *arguments, notifier=True):
+                    # Paiement d'un client supprimé entre-temps : il n'est porté nulle part
+                    conflits.append(arguments[0])
+                appliquees += 1
+        
+        if recharge:
+            # Les opérations locales doivent être dans le journal pour être rejouées
+            self.recharge_en_attente = not self.stockage.attendre_ecritures()
+            if not self.recharge_en_attente:
+                self.recharger()
+        return appliquees, conflits
+    
+    def recharger(self):
+        """Reconstruit le modèle à partir de l'instantané et des journaux, comme au chargement
+        
+        Les opérations sont rejouées dans l'ordre du journal, le même pour
+        toutes les instances. Produit l'événement "recharge" (client None) :
+        les clients d'avant ne font plus partie du modèle.
+        """
+        jour = self.statistiques.jour
+        self.clients = ClientStore()
+        self.index_recherche = IndexRecherche()
+        self.statistiques = AgregatsStatistiques(jour)
+        self.ordres_tri = OrdresTri(jour)
+        self.index_filtres = IndexFiltres(jour)
+        self.codes_renommes = 0
+        
+        # Le journal ouvert reste celui de sa génération : suivre_generation passera au
+        # plus récent à la prochaine écriture
+        generation = self.stockage.generation
+        for page in self.ouvrir():
+            self.integrer_page(page)
+        self.rejouer_journaux()
+        self.stockage.generation = generation
+        
+        # Toutes les opérations locales sont maintenant dans le modèle
+        for ecriture in self.ecritures_locales.values():
+            ecriture[0] = 0
+        self.notifier("recharge", None)
+    
+    # Mise à jour du modèle, de l'index et des statistiques (sans journalisation)
+    
+    def inserer(self, client):
+        # Les ordres de tri sont mis à jour par l'appelant, client par client ou par lot
+        if client.code in self.clients.par_code:
+            # Code en double hérité d'un fichier antérieur à l'unicité des codes : le
+            # renommage suit l'ordre de chargement, il est donc le même à chaque chargement
+            client.code = self.code_libre(client.code)
+            self.codes_renommes += 1
+        if client.identifiant is None:
+            client.identifiant = identifiant_client(client.code)
+        self.clients.append(client)
+        self.index_recherche.ajouter(client)
+        self.statistiques.ajouter(client)
+        self.index_filtres.ajouter(client)
+    
+    def inserer_lot(self, clients):
+        for client in clients:
+            self.inserer(client)
+        self.ordres_tri.ajouter_lot(clients)
+    
+    def appliquer_paiement(self, client, ordinal, montant):
+        """Ajoute un paiement au grand livre et au total du client ; retourne la copie de mettre_a_jour
+        
+        Le premier paiement fait passer le client à l'échéancier (voir echeancier),
+        qui part du plus ancien paiement quel que soit l'ordre d'enregistrement ;
+        le début est recalculé sur le grand livre, si bien qu'une contre-passation
+        le ramène à la date d'avant et qu'un client dont les paiements sont tous
+        contre-passés revient à la règle de la fiche.
+        """
+        self.grand_livre.ajouter(client.code, ordinal, montant)
+        return self.mettre_a_jour(client, {"paiements_centimes": client.paiements_centimes + montant,
+                                           "debut_echeancier": self.grand_livre.debut(client.code)})
+    
+    def mettre_a_jour(self, client, valeurs):
+        """Change des champs d'un client en tenant à jour index, statistiques, tri et filtres
+        
+        Retourne une copie du client avant modification (None sans abonnés).
+        """
+        code = client.code
+        ancien = copy.copy(client) if self.abonnes else None
+        self.stockage.figer(client)
+        
+        # Retirer le client des ordres de tri et des filtres tant que ses anciennes valeurs permettent de le retrouver
+        self.ordres_tri.retirer(client)
+        self.index_filtres.retirer(client)
+        for champ, valeur in valeurs.items():
+            setattr(client, champ, valeur)
+        self.index_recherche.mettre_a_jour(client)
+        self.statistiques.mettre_a_jour(client)
+        self.ordres_tri.ajouter(client)
+        self.index_filtres.ajouter(client)
+        if client.code != code:
+            self.clients.renommer(client, code)
+            self.grand_livre.renommer(code, client.code)
+        return ancien
+    
+    def code_libre(self, code):
+        numero = 2
+        while f"{code}-{numero}" in self.clients.par_code:
+            numero += 1
+        return f"{code}-{numero}"
+    
+    def position(self, cle):
+        """Position d'un client désigné par son code (ou par sa position, anciens journaux)"""
+        if isinstance(cle, int):
+            return cle
+        return self.clients.position(self.clients.par_code[cle])
+    
+    def retirer(self, cle):
+        index = self.position(cle)
+        client = self.clients[index]
+        self.index_recherche.retirer(client)
+        self.statistiques.retirer(client)
+        self.ordres_tri.retirer(client)
+        self.index_filtres.retirer(client)
+        self.grand_livre.retirer(client.code)
+        del self.clients[index]
+        return client
+    
+    def remplacer(self, cle, client):
+        """Remplace le client d'une position (journaux antérieurs aux codes)"""
+        index = self.position(cle)
+        ancien = self.clients[index]
+        # Les totaux des paiements ne suivent que les opérations "paiement" du journal
+        client.paiements_centimes = ancien.paiements_centimes
+        client.debut_echeancier = ancien.debut_echeancier
+        if client.code != ancien.code:
+            self.grand_livre.renommer(ancien.code, client.code)
+        self.index_recherche.retirer(ancien)
+        self.statistiques.retirer(ancien)
+        self.ordres_tri.retirer(ancien)
+        self.index_filtres.retirer(ancien)
+        self.clients[index] = client
+        self.index_recherche.ajouter(client)
+        self.statistiques.ajouter(client)
+        self.ordres_tri.ajouter(client)
+        self.index_filtres.ajouter(client)
+    
+    def appliquer_operation(self, operation, *arguments, notifier=False):
+        """Applique une opération lue dans le journal, au chargement comme à la relecture des autres instances
+        
+        Les mêmes opérations donnent toujours le même état : une modification
+        d'un client supprimé entre-temps le rétablit, la suppression d'un
+        client absent est ignorée et un code déjà pris reçoit un suffixe
+        (code_libre). Avec notifier, chaque changement produit son événement.
+        Retourne False pour un paiement dont le client n'existe plus.
+        """
+        evenements = []
+        if operation == "ajout":
+            client = arguments[0]
+            self.inserer(client)
+            self.ordres_tri.ajouter(client)
+            self.grand_livre.restaurer(client.code, arguments[1] if len(arguments) > 1 else b"")
+            evenements.append(("ajout", client))
+        elif operation == "lot":
+            self.inserer_lot(arguments[0])
+            for client in arguments[0]:
+                self.grand_livre.restaurer(client.code, b"")
+                evenements.append(("ajout", client))
+        elif operation == "modif":
+            code, nouveau, *paiements = arguments
+            if isinstance(code, int):
+                # Position d'un journal antérieur aux codes, qui n'est relu qu'au chargement
+                self.remplacer(code, nouveau)
+                return True
+            client = self.client_journal(code, nouveau.identifiant)
+            if client is None:
+                # Client supprimé par une autre instance sans qu'elle ait vu cette modification : elle le rétablit
+                return self.appliquer_operation("ajout", nouveau, *paiements, notifier=notifier)
+            valeurs = dict(zip(CHAMPS_ETAT, nouveau.__getstate__()))
+            # Les totaux des paiements ne suivent que le grand livre (l'autre instance a pu ne pas voir les nôtres)
+            del valeurs["paiements_centimes"], valeurs["debut_echeancier"], valeurs["identifiant"]
+            if valeurs["code"] == code:
+                # Le code n'est pas modifié : le client garde le sien, changé entre-temps par une autre instance
+                valeurs["code"] = client.code
+            elif valeurs["code"] in self.clients.par_code:
+                valeurs["code"] = self.code_libre(valeurs["code"])
+            ancien = self.mettre_a_jour(client, valeurs)
+            evenements.append(("modif", client, ancien))
+        elif operation == "suppr":
+            if isinstance(arguments[0], int):
+                evenements.append(("suppr", self.retirer(arguments[0])))
+            else:
+                code, *identifiant = arguments
+                client = self.client_journal(code, identifiant[0] if identifiant else None)
+                if client is not None:
+                    evenements.append(("suppr", self.retirer(client.code)))
+        elif operation == "paiement":
+            code, ordinal, montant, *identifiant = arguments
+            client = self.client_journal(code, identifiant[0] if identifiant else None)
+            # Client supprimé entre-temps par une autre instance : ses paiements sont partis avec lui
+            if client is None:
+                return False
+            ancien = self.appliquer_paiement(client, ordinal, montant)
+            evenements.append(("modif", client, ancien))
+        
+        if notifier:
+            for evenement in evenements:
+                self.notifier(*evenement)
+        return True
+    
+    def client_journal(self, code, identifiant):
+        """Client désigné par une opération du journal : celui du code, ou celui qui en a changé depuis
+        
+        L'auteur de l'opération a pu ne pas voir le changement de code fait
+        par une autre instance ; le client est alors retrouvé par son
+        identifiant. None s'il n'existe plus (identifiant None : journaux antérieurs).
+        """
+        client = self.clients.par_code.get(code)
+        if identifiant is None or (client is not None and client.identifiant == identifiant):
+            return client
+        return next((client for client in self.clients if client.identifiant == identifiant), None)
+    
+    def actualiser_echeances(self, jour=None):
+        """Réévalue les situations (à jour, en retard) si le jour a changé depuis la dernière évaluation
+        
+        Les mensualités de l'échéancier échoient en fin de mois, mais un client
+        sans paiement au grand livre doit la sienne dès son ajout (règle de la
+        fiche) : ceux ajoutés après le jour de référence seraient comptés à
+        jour. Les clés de tri datées ne changent qu'avec le mois, les ordres
+        de tri ne sont donc remplacés qu'au changement de mois. jour vaut
+        aujourd'hui par défaut ; retourne True si les statistiques et les
+        filtres ont été recalculés.
+        """
+        jour = date.today().toordinal() if jour is None else jour
+        if jour == self.statistiques.jour:
+            return False
+        self.statistiques.reconstruire(self.clients, jour)
+        self.index_filtres = IndexFiltres(jour)
+        for client in self.clients:
+            self.index_filtres.ajouter(client)
+        if indice_mois(jour) != indice_mois(self.ordres_tri.jour):
+            self.ordres_tri = OrdresTri(jour)
+        return True
+    
+    # Consultation
+    
+    @profileur.instrumenter("moteur.rechercher")
+    def rechercher(self, recherche, filtre=None):
+        """Retourne les clients correspondant à la recherche et au filtre (tous si les deux sont vides)
+        
+        Le filtre est un dictionnaire de critères produit par analyser_filtre.
+        """
+        if not filtre:
+            if not recherche:
+                return self.clients
+            return self.index_recherche.rechercher(recherche)
+        
+        self.actualiser_echeances()
+        par_rang = self.index_recherche.clients
+        rangs = self.index_filtres.rangs(filtre, self.ordres_tri, self.clients, par_rang)
+        if recherche:
+            rangs = rangs & self.index_recherche.rangs(recherche)
+        return [par_rang[rang] for rang in sorted(rangs)]
+    
+    def valeurs_filtre(self, champ):
+        """Retourne les valeurs présentes d'un champ à valeur exacte (listes du filtre)"""
+        return sorted(self.index_filtres.valeurs[champ], key=cle_naturelle)
+    
+    @profileur.instrumenter("moteur.trier")
+    def trier(self, clients, colonne, decroissant=False):
+        """Retourne les clients (tous, ou un résultat de recherche) dans l'ordre d'une colonne
+        
+        L'ordre de la liste complète est gardé en cache : changer de colonne ou
+        de sens ne retrie rien une fois chaque colonne triée une première fois.
+        """
+        cle = self.ordres_tri.fonction_cle(colonne)
+        if clients is self.clients:
+            entrees = self.ordres_tri.entrees(colonne, self.clients)
+        elif len(clients) * 8 < len(self.clients):
+            entrees = sorted((cle(client), client.rang, client) for client in clients)
+        else:
+            # Résultat volumineux : extraire ses clients de l'ordre complet déjà trié
+            rangs = {client.rang for client in clients}
+            entrees = [entree for entree in self.ordres_tri.entrees(colonne, self.clients) if entree[1] in rangs]
+        return VueTriee(entrees, decroissant, cle)
+    
+    def correspond(self, client, recherche="", filtre=None):
+        """Indique si un client satisfait la recherche et le filtre (mise à jour d'un résultat affiché)"""
+        recherche = recherche.lower()
+        if recherche and not any(recherche in texte for texte in self.index_recherche.textes[client.rang]):
+            return False
+        return not filtre or self.index_filtres.verifier(client, filtre)
+    
+    def resume_statistiques(self):
+        """Retourne les statistiques générales, par agent et par ancienneté de retard (montants en unités)"""
+        self.actualiser_echeances()
+        stats = self.statistiques
+        return resume_agregats(stats.total_clients, stats.total_montant, stats.clients_a_jour, stats.par_agent,
+                               stats.anciennete())
+    
+    def tendance(self, axe, agent=None, nombre=24):
+        """Retourne la série chronologique d'un axe ("periode" ou "mois"), voir serie_tendance
+        
+        Pendant le chargement, les cumuls enregistrés avec l'instantané donnent
+        déjà la tendance complète (hors opérations des journaux).
+        """
+        if not self.charge and self.stockage.cumuls_instantane is not None:
+            return serie_tendance(self.stockage.cumuls_instantane[axe], agent, nombre)
+        return self.statistiques.tendance(axe, agent, nombre)
+    
+    # Import et export
+    
+    def importer(self, chemin, taille_lot=TAILLE_LOT_IMPORT):
+        """Importe un CSV par lots ; retourne le nombre de clients importés et les rejets"""
+        importes = 0
+        tous_rejets = []
+        for lot, rejets, octets_lus, taille in importer_csv(chemin, taille_lot, codes_existants=self.clients.par_code):
+            tous_rejets.extend(rejets)
+            if lot:
+                doublons = self.ajouter_lot(lot)
+                tous_rejets.extend((None, f"Le code {client.code} est déjà utilisé.") for client in doublons)
+                importes += len(lot) - len(doublons)
+        return importes, tous_rejets
+    
+    def exporter(self, chemin, clients=None, format_export="csv"):
+        """Exporte les clients (tous par défaut) ; retourne le nombre de lignes écrites"""
+        return exporter_clients(chemin, self.clients if clients is None else clients, format_export)
+    
+    def copie_figee(self, clients=None):
+        """Copie des clients (tous par défaut) qu'un autre thread peut lire pendant les modifications
+        
+        Seule la liste est copiée ici ; rendre la copie avec liberer() une fois lue.
+        """
+        return self.stockage.copie_figee(self.clients if clients is None else clients)
+    
+    def liberer(self, copie):
+        self.stockage.liberer(copie)
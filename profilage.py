@@ -0,0 +1,152 @@
+"""Instrumentation facultative des opérations de BURIDA
+
+Activée au démarrage par la variable d'environnement BURIDA_PROFIL=1, ou
+depuis le menu Outils de l'application. Chaque opération instrumentée est
+comptée et chronométrée, les blocages de la boucle Tk sont mesurés, et le
+détail peut être exporté au format Chrome trace (chrome://tracing, Perfetto) :
+
+    @profileur.instrumenter("moteur.rechercher")
+    def rechercher(self, recherche): ...
+
+    with profileur.mesurer("pickle.load"):
+        ...
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+import contextlib
+import collections
+
+# Nombre maximal d'événements gardés pour la trace (les plus anciens sont oubliés)
+TAILLE_TRACE = 200000
+
+# Nombre de pulsations de la boucle Tk gardées pour les percentiles de retard
+TAILLE_HISTORIQUE_BOUCLE = 600
+
+# Retard de pulsation au-delà duquel la boucle Tk est considérée bloquée (secondes)
+SEUIL_BLOCAGE_S = 0.1
+
+def percentile(valeurs, p):
+    """Percentile au rang le plus proche (0 si aucune valeur)"""
+    if not valeurs:
+        return 0
+    valeurs = sorted(valeurs)
+    return valeurs[max(0, min(len(valeurs) - 1, round(p / 100 * len(valeurs) + 0.5) - 1))]
+
+class Profileur:
+    """Compteurs et durées des opérations instrumentées, et trace détaillée
+    
+    Désactivé, il ne coûte qu'un test par appel instrumenté. Les mesures
+    peuvent venir de plusieurs threads (chargement, écrivain du journal).
+    """
+    
+    def __init__(self, actif=False):
+        self.actif = actif
+        self.verrou = threading.Lock()
+        self.reinitialiser()
+    
+    def activer(self, actif=True):
+        self.actif = actif
+    
+    def reinitialiser(self):
+        """Oublie toutes les mesures"""
+        with self.verrou:
+            self.operations = {}  # nom -> [appels, durée totale, durée max]
+            self.evenements = collections.deque(maxlen=TAILLE_TRACE)  # (nom, catégorie, début, durée, thread)
+            self.retards = collections.deque(maxlen=TAILLE_HISTORIQUE_BOUCLE)
+            self.blocages = 0
+            self.origine = time.perf_counter()
+    
+    def enregistrer(self, nom, debut, duree, categorie="operation"):
+        """Ajoute une mesure (début en secondes perf_counter, durée en secondes)"""
+        with self.verrou:
+            mesure = self.operations.get(nom)
+            if mesure is None:
+                self.operations[nom] = [1, duree, duree]
+            else:
+                mesure[0] += 1
+                mesure[1] += duree
+                if duree > mesure[2]:
+                    mesure[2] = duree
+            self.evenements.append((nom, categorie, debut, duree, threading.get_ident()))
+    
+    @contextlib.contextmanager
+    def mesurer(self, nom):
+        """Chronomètre le bloc with s'il est actif"""
+        if not self.actif:
+            yield
+            return
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.enregistrer(nom, debut, time.perf_counter() - debut)
+    
+    def instrumenter(self, nom):
+        """Décorateur qui chronomètre chaque appel de la fonction sous ce nom"""
+        def decorateur(fonction):
+            @functools.wraps(fonction)
+            def fonction_instrumentee(*args, **kwargs):
+                if not self.actif:
+                    return fonction(*args, **kwargs)
+                debut = time.perf_counter()
+                try:
+                    return fonction(*args, **kwargs)
+                finally:
+                    self.enregistrer(nom, debut, time.perf_counter() - debut)
+            return fonction_instrumentee
+        return decorateur
+    
+    def pulsation(self, prevue, retard):
+        """Note le retard d'une pulsation de la boucle Tk (temps pendant lequel elle était bloquée)"""
+        with self.verrou:
+            self.retards.append(retard)
+        if retard > SEUIL_BLOCAGE_S:
+            self.blocages += 1
+            self.enregistrer("boucle_tk.blocage", prevue, retard, categorie="boucle")
+    
+    def lignes_resume(self):
+        return [(nom, appels, total, total / appels, maximum)
+                for nom, (appels, total, maximum) in self.operations.items()]
+    
+    def resume(self):
+        """Retourne les mesures par opération, de la plus coûteuse à la moins coûteuse
+        
+        Chaque ligne est un tuple (nom, appels, durée totale, durée moyenne,
+        durée max), durées en secondes.
+        """
+        with self.verrou:
+            lignes = self.lignes_resume()
+        return sorted(lignes, key=lambda ligne: ligne[2], reverse=True)
+    
+    def resume_boucle(self):
+        """Retourne les retards de la boucle Tk : (médiane, p95, max, nombre de blocages), en secondes"""
+        with self.verrou:
+            retards = list(self.retards)
+        return percentile(retards, 50), percentile(retards, 95), max(retards, default=0), self.blocages
+    
+    def exporter_trace(self, chemin):
+        """Écrit la trace au format Chrome trace (JSON) ; retourne le nombre d'événements"""
+        with self.verrou:
+            evenements = list(self.evenements)
+            resume = [list(ligne) for ligne in self.lignes_resume()]
+        
+        pid = os.getpid()
+        trace = {
+            "traceEvents": [
+                {"name": nom, "cat": categorie, "ph": "X", "pid": pid, "tid": thread,
+                 "ts": (debut - self.origine) * 1e6, "dur": duree * 1e6}
+                for nom, categorie, debut, duree, thread in evenements
+            ],
+            "displayTimeUnit": "ms",
+            "otherData": {"resume": resume}
+        }
+        with open(chemin, 'w', encoding="utf-8") as fichier:
+            json.dump(trace, fichier)
+        return len(evenements)
+
+profileur = Profileur(actif=os.environ.get("BURIDA_PROFIL", "") not in ("", "0"))
+
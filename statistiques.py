@@ -0,0 +1,203 @@
+"""Statistiques en colonnes pour les très gros volumes (archives, bilans mensuels)
+
+Les montants et les agents des clients sont rangés dans des tableaux
+contigus (module array, ou numpy s'il est installé) puis agrégés en bloc,
+sans dictionnaire par client. Un instantané paginé est découpé en tranches
+de pages agrégées par un pool de processus : chaque processus ne garde
+qu'une page de clients en mémoire à la fois, le fichier peut donc être plus
+gros que la mémoire. Les situations (à jour, en retard) sont évaluées à la
+date du jour, ou à celle passée en paramètre. Les résultats ont la forme de
+GestionClients.resume_statistiques :
+    
+    resume = statistiques_instantane("archive_2024.pkl")
+    print(resume["par_agent"])
+"""
+
+import os
+import array
+import operator
+import itertools
+import functools
+import collections
+import multiprocessing
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from moteur import (TRANCHES_RETARD, InstantanePagine, charger_pickle, echeancier, indice_mois, 
+                    resume_agregats, tranche_retard)
+
+# En dessous de ce nombre de pages, le calcul reste dans le processus courant
+SEUIL_PAGES_PARALLELES = 64
+
+# Nombre de tranches par processus (des tranches plus petites équilibrent la charge)
+TRANCHES_PAR_PROCESSUS = 4
+
+MONTANT = operator.attrgetter("total_paye_centimes")
+AGENT = operator.attrgetter("agent")
+
+# Échéance des clients sans mensualité, jamais en retard
+SANS_ECHEANCE = 1 << 62
+
+# Limites des tranches de retard bornées (jours), pour numpy.searchsorted
+LIMITES_TRANCHES = [limite for limite, libelle in TRANCHES_RETARD if limite is not None]
+
+def echeancier_colonnes(client):
+    echeance, mensualite, base = echeancier(client)
+    return SANS_ECHEANCE if echeance is None else echeance, mensualite, base
+
+class ColonnesStatistiques:
+    """Champs des clients utiles aux statistiques, en tableaux contigus (montants en centimes)"""
+    
+    def __init__(self, clients=()):
+        self.montants = array.array("q")
+        # Échéancier (voir moteur.echeancier) : date ordinale de la plus ancienne mensualité
+        # impayée, mensualité due par mois et base du solde exigible
+        self.echeances = array.array("q")
+        self.mensualites = array.array("q")
+        self.bases = array.array("q")
+        self.agents = array.array("i")  # Rang de l'agent dans self.noms_agents
+        self.noms_agents = []
+        self.numeros_agents = {}
+        self.ajouter(clients)
+    
+    def __len__(self):
+        return len(self.montants)
+    
+    def numero_agent(self, agent):
+        numero = self.numeros_agents.get(agent)
+        if numero is None:
+            numero = self.numeros_agents[agent] = len(self.noms_agents)
+            self.noms_agents.append(agent)
+        return numero
+    
+    def ajouter(self, clients):
+        """Range les champs utiles des clients à la suite des colonnes"""
+        if not isinstance(clients, list):
+            clients = list(clients)
+        self.montants.extend(map(MONTANT, clients))
+        echeanciers = list(map(echeancier_colonnes, clients))
+        self.echeances.extend(map(operator.itemgetter(0), echeanciers))
+        self.mensualites.extend(map(operator.itemgetter(1), echeanciers))
+        self.bases.extend(map(operator.itemgetter(2), echeanciers))
+        self.agents.extend(map(self.numero_agent, map(AGENT, clients)))
+    
+    def agreger(self, jour=None):
+        """Retourne (clients, montant total, clients à jour, {agent: [clients, montant]}, ancienneté)
+        
+        L'ancienneté est une liste [clients, arriérés] par tranche de
+        TRANCHES_RETARD ; montants en centimes, situations au jour donné.
+        """
+        jour = date.today().toordinal() if jour is None else jour
+        if numpy is not None:
+            return self.agreger_numpy(jour)
+        
+        comptes = collections.Counter(self.agents)
+        sommes = [0] * len(self.noms_agents)
+        for numero, montant in zip(self.agents, self.montants):
+            sommes[numero] += montant
+        
+        # Seuls les clients en retard sont parcourus pour l'ancienneté
+        mois = indice_mois(jour)
+        anciennete = [[0, 0] for tranche in TRANCHES_RETARD]
+        retards = list(itertools.compress(range(len(self.echeances)), 
+                                          map(operator.lt, self.echeances, itertools.repeat(jour))))
+        for rang in retards:
+            tranche = anciennete[tranche_retard(jour - self.echeances[rang])]
+            tranche[0] += 1
+            tranche[1] += self.mensualites[rang] * mois - self.bases[rang]
+        
+        par_agent = {agent: [comptes[numero], sommes[numero]]
+                     for numero, agent in enumerate(self.noms_agents) if comptes[numero]}
+        return len(self.montants), sum(self.montants), len(self.montants) - len(retards), par_agent, anciennete
+    
+    def agreger_numpy(self, jour):
+        montants = numpy.frombuffer(self.montants, dtype=numpy.int64)
+        mensualites = numpy.frombuffer(self.mensualites, dtype=numpy.int64)
+        echeances = numpy.frombuffer(self.echeances, dtype=numpy.int64)
+        bases = numpy.frombuffer(self.bases, dtype=numpy.int64)
+        agents = numpy.frombuffer(self.agents, dtype=numpy.intc)
+        
+        comptes = numpy.bincount(agents, minlength=len(self.noms_agents))
+        # Sommes entières exactes (bincount pondéré passerait par des flottants)
+        sommes = numpy.zeros(len(self.noms_agents), dtype=numpy.int64)
+        numpy.add.at(sommes, agents, montants)
+        
+        retard = echeances < jour
+        tranches = numpy.searchsorted(LIMITES_TRANCHES, jour - echeances[retard])
+        arrieres = mensualites[retard] * indice_mois(jour) - bases[retard]
+        clients_tranches = numpy.bincount(tranches, minlength=len(TRANCHES_RETARD))
+        arrieres_tranches = numpy.zeros(len(TRANCHES_RETARD), dtype=numpy.int64)
+        numpy.add.at(arrieres_tranches, tranches, arrieres)
+        anciennete = [[int(nb_clients), int(montant)] for nb_clients, montant in zip(clients_tranches, arrieres_tranches)]
+        
+        par_agent = {agent: [int(comptes[numero]), int(sommes[numero])]
+                     for numero, agent in enumerate(self.noms_agents) if comptes[numero]}
+        return (len(montants), int(montants.sum()), len(montants) - int(numpy.count_nonzero(retard)), par_agent, 
+                anciennete)
+
+AGREGAT_VIDE = (0, 0, 0, {}, [[0, 0] for tranche in TRANCHES_RETARD])
+
+def fusionner(premier, second):
+    """Additionne deux agrégats partiels"""
+    par_agent = {agent: list(valeurs) for agent, valeurs in premier[3].items()}
+    for agent, (nb_clients, montant) in second[3].items():
+        valeurs = par_agent.setdefault(agent, [0, 0])
+        valeurs[0] += nb_clients
+        valeurs[1] += montant
+    anciennete = [[a[0] + b[0], a[1] + b[1]] for a, b in zip(premier[4], second[4])]
+    return premier[0] + second[0], premier[1] + second[1], premier[2] + second[2], par_agent, anciennete
+
+def statistiques_clients(clients, jour=None):
+    """Statistiques d'une liste de clients en mémoire, calculées en colonnes"""
+    return resume_agregats(*ColonnesStatistiques(clients).agreger(jour))
+
+def agreger_tranche(chemin, debut, fin, jour):
+    """Agrège les pages [debut, fin) d'un instantané paginé, une page à la fois (processus du pool)"""
+    instantane = InstantanePagine(chemin)
+    resultat = AGREGAT_VIDE
+    try:
+        for numero in range(debut, fin):
+            resultat = fusionner(resultat, ColonnesStatistiques(instantane.lire_page(numero)).agreger(jour))
+    finally:
+        instantane.donnees.close()
+    return resultat
+
+def statistiques_instantane(chemin, processus=None, jour=None):
+    """Statistiques d'un fichier de clients (instantané seul : les journaux ne sont pas relus)
+    
+    Les instantanés paginés d'au moins SEUIL_PAGES_PARALLELES pages sont
+    agrégés par processus (processus=1 pour tout calculer sur place) ; les
+    anciens formats sont chargés d'un bloc.
+    """
+    with open(chemin, 'rb') as fichier:
+        pagine = fichier.read(len(InstantanePagine.SIGNATURE)) == InstantanePagine.SIGNATURE
+        if not pagine:
+            fichier.seek(0)
+            donnees = charger_pickle(fichier)
+    if not pagine:
+        clients = donnees["clients"] if isinstance(donnees, dict) else donnees
+        return statistiques_clients(clients, jour)
+    
+    instantane = InstantanePagine(chemin)
+    nb_pages = instantane.nb_pages
+    instantane.donnees.close()
+    
+    # Même jour de référence pour tous les processus
+    jour = date.today().toordinal() if jour is None else jour
+    processus = processus or os.cpu_count() or 1
+    if nb_pages < SEUIL_PAGES_PARALLELES or processus == 1:
+        return resume_agregats(*agreger_tranche(chemin, 0, nb_pages, jour))
+    
+    taille = -(-nb_pages // (processus * TRANCHES_PAR_PROCESSUS))
+    # spawn : pas de fork d'un processus qui a des threads (interface, écrivain du journal)
+    contexte = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(processus, mp_context=contexte) as pool:
+        tranches = [pool.submit(agreger_tranche, chemin, debut, min(debut + taille, nb_pages), jour)
+                    for debut in range(0, nb_pages, taille)]
+        resultat = functools.reduce(fusionner, (tranche.result() for tranche in tranches), AGREGAT_VIDE)
+    return resume_agregats(*resultat)
@@ -0,0 +1,29 @@
+"""Outils communs des tests du moteur (sans interface ni affichage)"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moteur import GestionClients
+
+@pytest.fixture
+def fichier(tmp_path):
+    return str(tmp_path / "clients.pkl")
+
+@pytest.fixture
+def ouvrir(fichier):
+    """Ouvre une instance du moteur sur le fichier partagé (fermée à la fin du test)"""
+    ouvertes = []
+    
+    def ouvrir_instance(asynchrone=False):
+        gestion = GestionClients(fichier, asynchrone=asynchrone)
+        gestion.charger()
+        ouvertes.append(gestion)
+        return gestion
+    
+    yield ouvrir_instance
+    for gestion in ouvertes:
+        gestion.fermer()
@@ -0,0 +1,69 @@
+"""Fonctions communes des tests"""
+
+from datetime import date
+
+from moteur import creer_client
+
+def valeurs_client(code, **champs):
+    """Valeurs texte d'un client valide, complétées par champs"""
+    valeurs = {"code": code, "etablissement": "Maquis", "nom": f"Client {code}", "localisation": "Abidjan",
+               "contact": "07 00 00 00 00", "mensualite": "100", "montant_paye": "100",
+               "periode": "2024-01", "agent": "Koné Ibrahim", "observation": ""}
+    valeurs.update(champs)
+    return valeurs
+
+def etat(gestion):
+    """État comparable d'un moteur : fiches, paiements (dans l'ordre des dates) et statistiques
+    
+    Les rangs et l'ordre d'enregistrement des paiements peuvent différer
+    d'une instance à l'autre sans que les données diffèrent.
+    """
+    fiches = sorted(client.__getstate__() for client in gestion.clients)
+    paiements = {client.code: sorted(gestion.grand_livre.lignes(client.code)) for client in gestion.clients}
+    return fiches, paiements, gestion.resume_statistiques()
+
+AGENTS = ["Koné Ibrahim", "Traoré Awa", "Yao Kouassi"]
+LOCALISATIONS = ["Abidjan", "Bouaké", "Daloa"]
+PERIODES = ["2024-01", "2024-06", "2025-03"]
+MONTANTS = ["0", "50", "100", "250.50"]
+
+def valeurs_au_hasard(hasard, code):
+    """Valeurs d'un client aux champs tirés dans de petits ensembles (pour que filtres et groupes se recoupent)"""
+    jour = date.today().toordinal() - hasard.randint(0, 900)
+    return valeurs_client(code, agent=hasard.choice(AGENTS), localisation=hasard.choice(LOCALISATIONS),
+                          periode=hasard.choice(PERIODES), mensualite=hasard.choice(MONTANTS[1:]),
+                          montant_paye=hasard.choice(MONTANTS), date_ajout=date.fromordinal(jour).isoformat())
+
+def operations_au_hasard(gestion, hasard, nombre, prefixe="C"):
+    """Applique nombre opérations tirées au hasard ; les codes créés commencent par prefixe
+    
+    Ajouts, lots, modifications (code compris), suppressions, paiements
+    antidatés, fusions, annulations et rétablissements.
+    """
+    for numero in range(nombre):
+        codes = sorted(client.code for client in gestion.clients)
+        tirage = hasard.random()
+        code = hasard.choice(codes) if codes else None
+        nouveau = f"{prefixe}{numero}-{hasard.randint(0, 9999)}"
+        try:
+            if code is None or tirage < 0.25:
+                gestion.ajouter(valeurs_au_hasard(hasard, nouveau))
+            elif tirage < 0.3:
+                gestion.ajouter_lot([creer_client(valeurs_au_hasard(hasard, f"{nouveau}-{rang}")) for rang in range(3)])
+            elif tirage < 0.48:
+                champ = hasard.choice(["agent", "localisation", "periode", "mensualite", "montant_paye", "code"])
+                valeur = nouveau if champ == "code" else valeurs_au_hasard(hasard, code)[champ]
+                gestion.modifier(code, {champ: valeur})
+            elif tirage < 0.55:
+                gestion.supprimer(code)
+            elif tirage < 0.75:
+                jour = date.today().toordinal() - hasard.randint(0, 1100)
+                gestion.enregistrer_paiement(code, hasard.choice(MONTANTS[1:]), date.fromordinal(jour).isoformat())
+            elif tirage < 0.78:
+                gestion.fusionner(code, [hasard.choice(codes)])
+            elif tirage < 0.9:
+                gestion.annuler()
+            else:
+                gestion.retablir()
+        except ValueError:
+            pass  # Annulation d'une opération sur un client supprimé ou renommé depuis
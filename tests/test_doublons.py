@@ -0,0 +1,31 @@
+"""Détection des clients en double"""
+
+from doublons import detecter_doublons
+
+def groupes(fiches):
+    return [codes for score, codes in detecter_doublons(fiches)]
+
+def test_noms_identiques_au_meme_lieu():
+    fiches = [("C1", "Pharmacie", "", "07 11 11 11 11", "Bouaké"),
+              ("C2", "PHARMACIE", "", "05 22 22 22 22", "Bouaké"),
+              ("C3", "Pharmacie", "", "01 33 33 33 33", "")]
+    assert detecter_doublons(fiches) == [(1.0, ["C1", "C2", "C3"])]
+
+def test_noms_identiques_dans_deux_villes():
+    fiches = [("C1", "Pharmacie", "", "07 11 11 11 11", "Bouaké"),
+              ("C2", "Pharmacie", "", "05 22 22 22 22", "Yamoussoukro"),
+              ("C3", "Pharmacie", "", "+225 07 11 11 11 11", "Daloa")]
+    # Seul le numéro commun relie deux villes
+    assert groupes(fiches) == [["C1", "C3"]]
+
+def test_variantes_d_un_nom():
+    fiches = [("C1", "Maquis Chez Bamba", "Bamba Mariam", "07 11 11 11 11", "Cocody"),
+              ("C2", "Maquis Bamba", "Mariam Bamba", "05 22 22 22 22", "Cocody"),
+              ("C3", "Maquis Bambaa", "Bamba Mariam", "07 11 11 11 11", "Yopougon"),
+              ("C4", "Boutique Koné", "Koné Ibrahim", "01 33 33 33 33", "Cocody")]
+    assert groupes(fiches) == [["C1", "C2", "C3"]]
+
+def test_fiches_sans_localisation():
+    # Les fiches des versions antérieures (sans localisation) restent comparées sur le nom
+    fiches = [("C1", "Pharmacie", "", "07 11 11 11 11"), ("C2", "Pharmacie", "", "05 22 22 22 22")]
+    assert groupes(fiches) == [["C1", "C2"]]
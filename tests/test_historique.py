@@ -0,0 +1,83 @@
+"""Annulation et rétablissement des modifications locales"""
+
+import random
+
+import pytest
+
+from outils import etat, operations_au_hasard, valeurs_client
+
+def visible(gestion):
+    """Fiches et statistiques : un paiement annulé reste au grand livre, contre-passé"""
+    fiches, paiements, statistiques = etat(gestion)
+    return fiches, statistiques
+
+def test_annuler_puis_retablir(ouvrir):
+    gestion = ouvrir()
+    etats = [visible(gestion)]
+    gestion.ajouter(valeurs_client("C1"))
+    etats.append(visible(gestion))
+    gestion.modifier("C1", {"nom": "Nouveau nom", "mensualite": "150"})
+    etats.append(visible(gestion))
+    gestion.enregistrer_paiement("C1", "75", "2026-02-03")
+    etats.append(visible(gestion))
+    gestion.supprimer("C1")
+    etats.append(visible(gestion))
+    
+    descriptions = [gestion.annuler() for numero in range(4)]
+    assert descriptions == ["suppression du client C1", "paiement du client C1",
+                            "modification du client C1", "ajout du client C1"]
+    assert gestion.annuler() is None
+    assert visible(gestion) == etats[0]
+    
+    for attendu in etats[1:]:
+        gestion.retablir()
+        assert visible(gestion) == attendu
+    assert gestion.retablir() is None
+    assert etat(ouvrir()) == etat(gestion)
+
+def test_suppression_annulee_rend_les_paiements(ouvrir):
+    gestion = ouvrir()
+    gestion.ajouter(valeurs_client("C1", montant_paye="0"))
+    gestion.enregistrer_paiement("C1", "300", "2026-08-01")
+    avant = etat(gestion)
+    gestion.supprimer("C1")
+    assert gestion.paiements("C1") == []
+    
+    gestion.annuler()
+    assert gestion.paiements("C1") == [("2026-08-01", "300")]
+    assert etat(gestion) == avant
+    assert etat(ouvrir()) == avant
+
+def test_nouvelle_modification_vide_les_retablissements(ouvrir):
+    gestion = ouvrir()
+    gestion.ajouter(valeurs_client("C1"))
+    gestion.modifier("C1", {"nom": "A"})
+    gestion.annuler()
+    gestion.modifier("C1", {"agent": "Traoré Awa"})
+    assert gestion.retablir() is None
+    assert gestion.client("C1").nom == "Client C1"
+
+def test_annulation_impossible_apres_suppression_ailleurs(ouvrir):
+    a = ouvrir()
+    a.ajouter(valeurs_client("C1"))
+    b = ouvrir()
+    a.modifier("C1", {"nom": "Modifié"})
+    b.supprimer("C1")
+    a.relire_journal()
+    with pytest.raises(ValueError, match="C1"):
+        a.annuler()
+
+@pytest.mark.parametrize("graine", range(3))
+def test_tout_annuler_puis_tout_retablir(ouvrir, graine):
+    gestion = ouvrir()
+    operations_au_hasard(gestion, random.Random(graine), 120)
+    final = visible(gestion)
+    
+    # Tout ce qui reste dans l'historique s'annule (les lots importés n'y sont pas)
+    nombre = 0
+    while gestion.annuler() is not None:
+        nombre += 1
+    for numero in range(nombre):
+        gestion.retablir()
+    assert visible(gestion) == final
+    assert etat(ouvrir()) == etat(gestion)
@@ -0,0 +1,19 @@
+"""Logique de l'interface qui ne demande pas d'affichage"""
+
+from types import SimpleNamespace
+
+import pytest
+
+gestion = pytest.importorskip("gestion")
+
+# États Tk : Maj, Verr. Maj, Ctrl
+MAJ, VERR_MAJ, CTRL = 0x1, 0x2, 0x4
+
+@pytest.mark.parametrize("etat_clavier, attendu", [(CTRL, "annuler"), (CTRL | VERR_MAJ, "annuler"),
+                                                   (CTRL | MAJ, "retablir"), (CTRL | MAJ | VERR_MAJ, "retablir")])
+def test_raccourci_annuler(etat_clavier, attendu):
+    appels = []
+    application = SimpleNamespace(annuler=lambda: appels.append("annuler"),
+                                  retablir=lambda: appels.append("retablir"))
+    gestion.BuridaApp.raccourci_annuler(application, SimpleNamespace(state=etat_clavier))
+    assert appels == [attendu]
@@ -0,0 +1,161 @@
+"""Plusieurs instances sur le même fichier : relecture des journaux et rechargement"""
+
+import random
+from datetime import date
+
+import pytest
+
+from outils import etat, operations_au_hasard, valeurs_client
+
+def test_modification_d_un_client_supprime_ailleurs_se_recharge(ouvrir):
+    a = ouvrir()
+    a.ajouter(valeurs_client("C1"))
+    a.ajouter(valeurs_client("C2"))
+    b = ouvrir()
+    
+    # Le journal contient "suppr C1" puis "modif C1"
+    a.supprimer("C1")
+    b.modifier("C1", {"nom": "Modifié ailleurs"})
+    a.relire_journal()
+    b.relire_journal()
+    
+    c = ouvrir()
+    assert c.client("C1").nom == "Modifié ailleurs"
+    assert etat(c) == etat(a) == etat(b)
+
+def test_meme_code_ajoute_sur_deux_postes(ouvrir):
+    a = ouvrir()
+    b = ouvrir()
+    evenements = []
+    b.abonner(lambda evenement, client, ancien: evenements.append(evenement))
+    
+    a.ajouter(valeurs_client("C20", nom="Ajouté sur A"))
+    b.ajouter(valeurs_client("C20", nom="Ajouté sur B"))
+    assert a.relire_journal() == (1, ["C20"])
+    assert b.relire_journal() == (1, ["C20"])
+    
+    # Le journal a gardé les deux ajouts, celui de B sous un code libre
+    assert "recharge" in evenements
+    assert b.client("C20").nom == "Ajouté sur A"
+    assert b.client("C20-2").nom == "Ajouté sur B"
+    c = ouvrir()
+    assert etat(c) == etat(a) == etat(b)
+
+def test_rechargement_apres_ecritures_asynchrones(ouvrir):
+    a = ouvrir()
+    b = ouvrir(asynchrone=True)
+    a.ajouter(valeurs_client("C1"))
+    b.ajouter(valeurs_client("C1", nom="Ajouté sur B"))
+    b.modifier("C1", {"agent": "Traoré Awa"})
+    b.relire_journal()
+    a.relire_journal()
+    
+    c = ouvrir()
+    assert etat(c) == etat(a) == etat(b)
+    assert sorted(client.code for client in c.clients) == ["C1", "C1-2"]
+
+def test_paiement_d_un_client_renomme_ailleurs(ouvrir):
+    a = ouvrir()
+    a.ajouter(valeurs_client("C1"))
+    b = ouvrir()
+    
+    a.modifier("C1", {"code": "R1"})
+    b.enregistrer_paiement("C1", "50.00", "2026-10-01")
+    assert a.relire_journal() == (1, [])
+    b.relire_journal()
+    
+    c = ouvrir()
+    for gestion in (a, b, c):
+        assert gestion.paiements("R1") == [("2026-10-01", "50")]
+        assert gestion.client("R1").paiements_centimes == 5000
+    assert etat(c) == etat(a) == etat(b)
+
+def test_paiement_d_un_client_supprime_ailleurs(ouvrir):
+    a = ouvrir()
+    a.ajouter(valeurs_client("C1"))
+    b = ouvrir()
+    
+    a.supprimer("C1")
+    b.enregistrer_paiement("C1", "50.00")
+    assert a.relire_journal() == (1, ["C1"])
+    b.relire_journal()
+    
+    c = ouvrir()
+    assert c.client("C1") is None
+    assert etat(c) == etat(a) == etat(b)
+
+def test_client_modifie_apres_suppression_garde_ses_paiements(ouvrir):
+    a = ouvrir()
+    a.ajouter(valeurs_client("C1"))
+    a.enregistrer_paiement("C1", "250", "2026-09-15")
+    b = ouvrir()
+    
+    a.supprimer("C1")
+    b.modifier("C1", {"nom": "Modifié ailleurs"})
+    a.relire_journal()
+    b.relire_journal()
+    
+    c = ouvrir()
+    for gestion in (a, b, c):
+        client = gestion.client("C1")
+        assert gestion.paiements("C1") == [("2026-09-15", "250")]
+        assert client.paiements_centimes == 25000
+        assert client.debut_echeancier == date(2026, 9, 15).toordinal()
+    assert etat(c) == etat(a) == etat(b)
+
+def test_paiement_avant_le_retablissement_d_un_client_supprime(ouvrir):
+    a = ouvrir()
+    a.ajouter(valeurs_client("C1", montant_paye="0"))
+    a.enregistrer_paiement("C1", "250", "2026-09-01")
+    b = ouvrir()
+    
+    # Le journal contient "suppr C1", le paiement de B, puis le rétablissement de C1 (et de son grand livre)
+    a.supprimer("C1")
+    b.enregistrer_paiement("C1", "100", "2024-01-10")
+    a.annuler()
+    assert a.relire_journal() == (1, [])
+    b.relire_journal()
+    
+    c = ouvrir()
+    for gestion in (a, b, c):
+        assert gestion.paiements("C1") == [("2026-09-01", "250")]
+        assert gestion.client("C1").paiements_centimes == 25000
+    assert etat(c) == etat(a) == etat(b)
+
+def test_paiement_sous_l_ancien_code_avant_le_retablissement(ouvrir):
+    a = ouvrir()
+    a.ajouter(valeurs_client("C1", montant_paye="0"))
+    a.enregistrer_paiement("C1", "50", "2026-09-01")
+    b = ouvrir()
+    a.modifier("C1", {"code": "R1"})
+    a.relire_journal()
+    
+    # B paie sous l'ancien code, avant la suppression et le rétablissement de R1 par A
+    b.enregistrer_paiement("C1", "100", "2024-01-10")
+    a.supprimer("R1")
+    a.annuler()
+    assert a.relire_journal() == (1, [])
+    b.relire_journal()
+    
+    c = ouvrir()
+    for gestion in (a, b, c):
+        assert gestion.paiements("R1") == [("2026-09-01", "50")]
+    assert etat(c) == etat(a) == etat(b)
+
+@pytest.mark.parametrize("graine", range(6))
+def test_trois_postes_au_hasard(ouvrir, graine):
+    hasard = random.Random(graine)
+    postes = [ouvrir(), ouvrir(), ouvrir(asynchrone=True)]
+    for tour in range(40):
+        numero = hasard.randrange(len(postes))
+        operations_au_hasard(postes[numero], hasard, hasard.randint(1, 4), prefixe=f"P{numero}-{tour}-")
+        if hasard.random() < 0.4:
+            hasard.choice(postes).relire_journal()
+    
+    for poste in postes:
+        poste.stockage.attendre_ecritures()
+    for poste in postes:
+        poste.relire_journal()
+    attendu = etat(ouvrir())
+    for poste in postes:
+        assert etat(poste) == attendu
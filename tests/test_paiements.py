@@ -0,0 +1,82 @@
+"""Paiements, grand livre et échéancier"""
+
+from datetime import date
+
+from moteur import jours_retard
+from outils import valeurs_client
+
+JOUR = date(2026, 10, 18).toordinal()
+
+def ordinal(texte):
+    return date.fromisoformat(texte).toordinal()
+
+def test_paiement_au_grand_livre(ouvrir):
+    gestion = ouvrir()
+    gestion.ajouter(valeurs_client("C1", montant_paye="0"))
+    gestion.enregistrer_paiement("C1", "150.50", "2026-10-01")
+    gestion.enregistrer_paiement("C1", "49.50", "2026-09-01")
+    
+    client = gestion.client("C1")
+    assert gestion.paiements("C1") == [("2026-10-01", "150.50"), ("2026-09-01", "49.50")]
+    assert client.paiements_centimes == 20000
+    assert client.debut_echeancier == ordinal("2026-09-01")
+    
+    # Rechargé depuis le journal, puis depuis l'instantané
+    assert ouvrir().paiements("C1") == gestion.paiements("C1")
+    gestion.sauvegarder()
+    gestion.stockage.compactage.join()
+    recharge = ouvrir()
+    assert recharge.paiements("C1") == gestion.paiements("C1")
+    assert recharge.client("C1").debut_echeancier == ordinal("2026-09-01")
+
+def test_annulation_d_un_paiement_antidate(ouvrir):
+    gestion = ouvrir()
+    gestion.ajouter(valeurs_client("C1", montant_paye="0"))
+    gestion.enregistrer_paiement("C1", "300", "2026-10-01")
+    client = gestion.client("C1")
+    assert not jours_retard(client, JOUR)
+    
+    # Une date mal saisie fait partir l'échéancier trois ans plus tôt
+    gestion.enregistrer_paiement("C1", "100", "2023-10-01")
+    assert client.debut_echeancier == ordinal("2023-10-01")
+    assert jours_retard(client, JOUR)
+    
+    gestion.annuler()
+    assert client.paiements_centimes == 30000
+    assert client.debut_echeancier == ordinal("2026-10-01")
+    assert not jours_retard(client, JOUR)
+    assert ouvrir().client("C1").__getstate__() == client.__getstate__()
+
+def test_paiements_tous_contre_passes(ouvrir):
+    gestion = ouvrir()
+    gestion.ajouter(valeurs_client("C1", montant_paye="0"))
+    gestion.enregistrer_paiement("C1", "100", "2026-10-01")
+    gestion.annuler()
+    
+    # Retour à la règle de la fiche, les lignes restent au grand livre
+    client = gestion.client("C1")
+    assert client.paiements_centimes == 0
+    assert client.debut_echeancier == 0
+    assert gestion.paiements("C1") == [("2026-10-01", "100"), ("2026-10-01", "-100")]
+
+def test_annulation_d_une_fusion(ouvrir):
+    gestion = ouvrir()
+    gestion.ajouter(valeurs_client("C1", montant_paye="0", contact=""))
+    gestion.ajouter(valeurs_client("C2", montant_paye="0"))
+    gestion.enregistrer_paiement("C1", "300", "2026-10-01")
+    gestion.enregistrer_paiement("C2", "100", "2024-01-05")
+    
+    client = gestion.fusionner("C1", ["C2"])
+    assert gestion.client("C2") is None
+    assert client.contact == "07 00 00 00 00"
+    assert client.paiements_centimes == 40000
+    assert client.debut_echeancier == ordinal("2024-01-05")
+    
+    gestion.annuler()
+    assert client.contact == ""
+    assert client.paiements_centimes == 30000
+    assert client.debut_echeancier == ordinal("2026-10-01")
+    assert not jours_retard(client, JOUR)
+    doublon = gestion.client("C2")
+    assert gestion.paiements("C2") == [("2024-01-05", "100")]
+    assert doublon.debut_echeancier == ordinal("2024-01-05")
@@ -0,0 +1,68 @@
+"""Statistiques, filtres et tris tenus à jour par deltas"""
+
+import random
+from datetime import date
+
+import pytest
+
+from moteur import AgregatsStatistiques, en_retard, fonction_cle_tri
+from outils import operations_au_hasard, valeurs_client
+from statistiques import statistiques_clients
+
+def test_client_ajoute_apres_le_jour_de_reference(ouvrir):
+    gestion = ouvrir()
+    hier = date.today().toordinal() - 1
+    gestion.actualiser_echeances(hier)
+    ordres_tri = gestion.ordres_tri
+    
+    # Sans paiement au grand livre, la mensualité est due dès l'ajout
+    gestion.ajouter(valeurs_client("C1", montant_paye="50"))
+    gestion.ajouter(valeurs_client("C2", montant_paye="100"))
+    assert gestion.resume_statistiques()["clients_retard"] == 1
+    assert [client.code for client in gestion.rechercher("", {"en_retard": True})] == ["C1"]
+    assert gestion.actualiser_echeances() is False
+    
+    # Les ordres de tri ne changent qu'avec le mois
+    assert (gestion.ordres_tri is ordres_tri) == (date.fromordinal(hier).month == date.today().month)
+
+COLONNES_TRIEES = ["code", "nom", "agent", "mensualite", "montant_paye", "date_ajout", "solde", "retard"]
+
+CRITERES = [{"agent": "Traoré Awa"}, {"localisation": "Daloa", "en_retard": True}, {"en_retard": False},
+            {"mensualite_min": 5000, "mensualite_max": 10000}, {"periode": "2024-06", "montant_paye_max": 0},
+            {"date_ajout_min": date.today().toordinal() - 300, "agent": "Yao Kouassi", "en_retard": False}]
+
+def correspond(client, criteres, jour):
+    """Filtre évalué client par client, sans index"""
+    for champ in ("agent", "localisation", "periode"):
+        if champ in criteres and getattr(client, champ) != criteres[champ]:
+            return False
+    for champ, valeur in (("mensualite", client.mensualite_centimes), ("montant_paye", client.montant_paye_centimes),
+                          ("date_ajout", client.date_ordinal)):
+        if criteres.get(f"{champ}_min", valeur) > valeur or criteres.get(f"{champ}_max", valeur) < valeur:
+            return False
+    return "en_retard" not in criteres or en_retard(client, jour) == criteres["en_retard"]
+
+@pytest.mark.parametrize("graine", range(5))
+def test_agregats_filtres_et_tris_tenus_a_jour(ouvrir, graine):
+    gestion = ouvrir()
+    # Ordres de tri calculés d'abord : ils sont ensuite tenus à jour par deltas comme les agrégats
+    for colonne in COLONNES_TRIEES:
+        gestion.trier(gestion.clients, colonne)
+    operations_au_hasard(gestion, random.Random(graine), 300)
+    jour = gestion.statistiques.jour
+    
+    assert gestion.resume_statistiques() == statistiques_clients(gestion.clients, jour)
+    recalcul = AgregatsStatistiques(jour)
+    recalcul.reconstruire(gestion.clients)
+    assert gestion.statistiques.cumuls() == recalcul.cumuls()
+    assert gestion.statistiques.anciennete() == recalcul.anciennete()
+    
+    for criteres in CRITERES:
+        attendus = sorted(client.code for client in gestion.clients if correspond(client, criteres, jour))
+        assert sorted(client.code for client in gestion.rechercher("", criteres)) == attendus
+    
+    for colonne in COLONNES_TRIEES:
+        cle = fonction_cle_tri(colonne, gestion.ordres_tri.jour)
+        vue = gestion.trier(gestion.clients, colonne)
+        assert [(cle(client), client.rang) for client in vue] == sorted((cle(client), client.rang)
+                                                                       for client in gestion.clients)
@@ -0,0 +1,101 @@
+"""Instantané, journaux et conversion des anciens fichiers"""
+
+import pickle
+import random
+import sys
+
+import pytest
+
+import moteur
+from moteur import GestionClients, InstantanePagine, generation_instantane
+from outils import etat, operations_au_hasard, valeurs_client
+
+def attendre(gestion):
+    """Attend la fin des écritures en arrière-plan (écrivain ou compactage)"""
+    gestion.stockage.attendre_ecritures()
+    if not gestion.stockage.asynchrone and gestion.stockage.compactage is not None:
+        gestion.stockage.compactage.join()
+
+@pytest.mark.parametrize("asynchrone", [False, True])
+@pytest.mark.parametrize("graine", range(3))
+def test_rechargement_identique(ouvrir, asynchrone, graine):
+    gestion = ouvrir(asynchrone=asynchrone)
+    hasard = random.Random(graine)
+    operations_au_hasard(gestion, hasard, 150)
+    attendre(gestion)
+    assert etat(ouvrir()) == etat(gestion)
+    
+    # Instantané puis nouveau journal
+    gestion.sauvegarder()
+    operations_au_hasard(gestion, hasard, 150, prefixe="D")
+    attendre(gestion)
+    assert generation_instantane(gestion.filename) >= 1
+    assert etat(ouvrir()) == etat(gestion)
+
+def test_compactages_successifs(ouvrir, monkeypatch):
+    monkeypatch.setattr(moteur, "SEUIL_COMPACTAGE", 4000)
+    gestion = ouvrir()
+    operations_au_hasard(gestion, random.Random(7), 400)
+    attendre(gestion)
+    assert generation_instantane(gestion.filename) > 3
+    assert len(gestion.stockage.generations_journal()) <= 3
+    assert etat(ouvrir()) == etat(gestion)
+
+def test_enregistrement_incomplet_ecarte(ouvrir):
+    gestion = ouvrir()
+    gestion.ajouter(valeurs_client("C1"))
+    gestion.enregistrer_paiement("C1", "100", "2026-01-10")
+    # Arrêt pendant une écriture : la fin du journal est un enregistrement tronqué
+    with open(gestion.stockage.chemin_journal(gestion.stockage.generation), 'ab') as journal:
+        journal.write(pickle.dumps(("modif", "C1", None))[:-5])
+    
+    recharge = ouvrir()
+    assert etat(recharge) == etat(gestion)
+    recharge.ajouter(valeurs_client("C2"))
+    assert sorted(client.code for client in ouvrir().clients) == ["C1", "C2"]
+
+class AncienClient:
+    """Client tel que l'enregistrait la première version de l'application (attributs texte)"""
+    
+    # Les anciens fichiers référencent __main__.Client
+    __module__ = "__main__"
+    __qualname__ = "Client"
+    
+    def __init__(self, code, **champs):
+        self.__dict__.update(valeurs_client(code, date_ajout="2024-03-01", **champs))
+
+def ecrire_ancien_fichier(fichier, monkeypatch, format_fichier):
+    monkeypatch.setattr(sys.modules["__main__"], "Client", AncienClient, raising=False)
+    clients = [AncienClient("C1"), AncienClient("C2", montant_paye="12,5"), AncienClient("C1", nom="Double")]
+    donnees = clients if format_fichier == "liste" else {"generation": 0, "clients": clients}
+    with open(fichier, 'wb') as sortie:
+        pickle.dump(donnees, sortie)
+
+@pytest.mark.parametrize("format_fichier", ["liste", "dictionnaire"])
+def test_conversion_d_un_ancien_fichier(fichier, ouvrir, monkeypatch, format_fichier):
+    ecrire_ancien_fichier(fichier, monkeypatch, format_fichier)
+    
+    # b lit l'ancien fichier, a le convertit avant que b ait fini de charger
+    b = GestionClients(fichier)
+    pages = b.ouvrir()
+    a = ouvrir()
+    assert generation_instantane(fichier) == 1
+    for page in pages:
+        b.integrer_page(page)
+    b.terminer_chargement()
+    assert generation_instantane(fichier) == 1
+    
+    try:
+        assert [client.code for client in a.clients] == ["C1", "C2", "C1-2"]
+        assert a.client("C2").montant_paye == "12.50"
+        assert a.client("C1").date_ajout == "2024-03-01"
+        a.ajouter(valeurs_client("C3"))
+        b.modifier("C1-2", {"nom": "Renommé"})
+        a.relire_journal()
+        b.relire_journal()
+        c = ouvrir()
+        assert len(InstantanePagine(fichier)) == 3
+        assert c.client("C1-2").nom == "Renommé"
+        assert etat(c) == etat(a) == etat(b)
+    finally:
+        b.fermer()